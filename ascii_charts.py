@@ -18,3 +18,19 @@ def hbar_chart(pairs: List[Tuple[str, Decimal]], width: int = 40) -> List[str]:
         bar = "█" * max(0, n)
         lines.append(f"{label:>12} | {bar} {val}")
     return lines
+
+
+# Bars for values that may go negative (a running balance): length is
+# proportional to the magnitude, "░" marks the negative side.
+def signed_bar_chart(pairs: List[Tuple[str, Decimal]], width: int = 40) -> List[str]:
+    if not pairs:
+        return ["(no data)"]
+    max_abs = max(abs(v) for _, v in pairs)
+    scale = Decimal(width) / max_abs if max_abs > 0 else Decimal("0")
+
+    lines = []
+    for label, val in pairs:
+        n = int((abs(val) * scale).to_integral_value(rounding="ROUND_FLOOR"))
+        bar = ("░" if val < 0 else "█") * n
+        lines.append(f"{label:>12} | {bar} {val}")
+    return lines
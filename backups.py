@@ -118,10 +118,15 @@ def verify_backup(zip_path: Path) -> Tuple[bool, List[str]]:
         LOGGER.error("Backup verification failed for %s: %s", zip_path.name, errors)
     return ok, errors
 
-def restore_backup(zip_path: Path, dest_dir: Path, *, overwrite: bool = False) -> List[Path]:
+# Data files a restore may write; callers with other file names pass their own.
+RESTORE_NAMES = ("users.json", "transaction.csv", "transaction.csv.categories", "pfm.sqlite3")
+
+def restore_backup(
+    zip_path: Path, dest_dir: Path, *, overwrite: bool = False, allowed: Optional[Iterable[str]] = None,
+) -> List[Path]:
     
     restored: List[Path] = []
-    allowed = {"users.json", "transactions.csv"}
+    allowed = set(RESTORE_NAMES if allowed is None else allowed)
 
     dest_dir.mkdir(parents=True, exist_ok=True)
     with ZipFile(zip_path, "r") as zf:
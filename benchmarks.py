@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+# Ad-hoc performance checks on synthetic ledgers. Not part of the sanity tests:
+#   python benchmarks.py import --rows 2000000 --workers 4
+#   python benchmarks.py cents --rows 1000000
+#   python benchmarks.py scan --rows 2000000 --workers 1 2 4 8
+# Numbers go to stdout (and bench_output.txt is git-ignored if you tee there).
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from storage import CSV_FIELDNAMES
+
+CATEGORIES = ["Food", "Rent", "Salary", "Fuel", "Fun", "Health", "Travel", "Books", "Gifts", "Utilities"]
+METHODS = ["Cash", "Debit Card", "Credit Card", "Bank Transfer", "Wallet"]
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def write_source_csv(path: Path, rows: int, *, seed: int = 7) -> None:
+    # Bank-statement style file: no IDs, ~1% invalid rows, a few duplicates.
+    rnd = random.Random(seed)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        f.write("date,amount,description,category,payment_method,type\n")
+        for i in range(rows):
+            y, m, d = 2015 + i % 10, rnd.randint(1, 12), rnd.randint(1, 28)
+            amount = f"{rnd.randint(1, 250000) / 100:.2f}" if rnd.random() > 0.01 else "n/a"
+            f.write(f"{y}-{m:02d}-{d:02d},{amount},item {i % (rows // 2 + 1)},"
+                    f"{rnd.choice(CATEGORIES)},{rnd.choice(METHODS)},"
+                    f"{'income' if rnd.random() < 0.1 else 'expense'}\n")
+
+
+def write_ledger_csv(path: Path, rows: int, *, users: int = 3, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        f.write(",".join(CSV_FIELDNAMES) + "\n")
+        for i in range(rows):
+            y, m, d = 2015 + i % 10, rnd.randint(1, 12), rnd.randint(1, 28)
+            f.write(f"T{i + 1:06d},U{i % users + 1:03d},{'income' if rnd.random() < 0.1 else 'expense'},"
+                    f"{rnd.randint(1, 250000) / 100:.2f},{rnd.choice(CATEGORIES)},"
+                    f"{y}-{m:02d}-{d:02d},item {i},{rnd.choice(METHODS)}\n")
+
+
+def bench_import(rows: int, workers: List[int]) -> None:
+    from import_export import import_transactions_batch
+
+    with tempfile.TemporaryDirectory() as td:
+        src = Path(td) / "source.csv"
+        write_source_csv(src, rows)
+        print(f"import: {rows:,} source rows, {src.stat().st_size / 1e6:.1f} MB")
+        baseline = None
+        for n in workers:
+            ledger = Path(td) / f"ledger-{n}.csv"
+            report = import_transactions_batch(ledger, "U001", src, workers=n)
+            if baseline is None:
+                baseline = report.seconds
+            print(f"  workers={n:<3} {report.seconds:8.2f}s  {report.rows_per_sec:>10,.0f} rows/sec  "
+                  f"x{baseline / report.seconds:.2f}  (added {report.added:,}, skipped {report.skipped:,})")
+
+
+def bench_cents(rows: int) -> None:
+    # Per-category totals as they were (Decimal per row, every call) against
+    # int cents parsed once per row and cached on it.
+    from collections import defaultdict
+    from decimal import Decimal, InvalidOperation
+    from reports import totals_by_category
+    from storage import ledger_row
+
+    rnd = random.Random(7)
+    raw = [{"category": rnd.choice(CATEGORIES), "amount": f"{rnd.randint(1, 250000) / 100:.2f}"}
+           for _ in range(rows)]
+    data: List[Dict[str, str]] = []
+
+    def with_decimal() -> list:
+        agg: Dict[str, Decimal] = defaultdict(lambda: Decimal("0"))
+        for r in raw:
+            cat = r.get("category", "")
+            if not cat:
+                continue
+            try:
+                amt = Decimal(r.get("amount", "0"))
+            except (InvalidOperation, TypeError):
+                continue
+            agg[cat] += amt
+        return sorted(agg.items(), key=lambda kv: kv[1], reverse=True)
+
+    print(f"cents: {rows:,} rows, totals by category")
+    t_dec = _timed(with_decimal)
+    t_load = _timed(lambda: data.extend(ledger_row(r) for r in raw))
+    t_cents = _timed(lambda: totals_by_category(data))
+    assert totals_by_category(data) == with_decimal(), "cent totals differ from Decimal totals"
+    print(f"  Decimal, per report    {t_dec:8.3f}s")
+    print(f"  cents, per report      {t_cents:8.3f}s  x{t_dec / t_cents:.2f}  (totals identical)")
+    print(f"  cents, once at load    {t_load:8.3f}s  (ledger_row() incl. parsing)")
+
+
+def bench_columnar(rows: int) -> None:
+    # Day-filtered category totals: row loop against the NumPy frame.
+    import columnar
+    from datetime import date
+    from reports import ReportFilters, load_user_rows, totals_by_category, user_totals_by_category
+
+    if not columnar.enabled():
+        print("columnar: NumPy is not installed (or PFM_NUMPY=0); nothing to compare")
+        return
+    with tempfile.TemporaryDirectory() as td:
+        ledger = Path(td) / "transaction.csv"
+        write_ledger_csv(ledger, rows, users=1)
+        f = ReportFilters(start=date(2016, 3, 2), end=date(2023, 11, 20), type="expense")
+        load_user_rows(ledger, "U001")  # parse the ledger outside the timings
+        print(f"columnar: {rows:,} rows, category totals with a day-level filter")
+        t_rows = _timed(lambda: totals_by_category(load_user_rows(ledger, "U001", f)))
+        t_build = _timed(lambda: columnar.frame_for(ledger, "U001"))
+        t_np = _timed(lambda: user_totals_by_category(ledger, "U001", f))
+        assert user_totals_by_category(ledger, "U001", f) == totals_by_category(load_user_rows(ledger, "U001", f))
+        print(f"  rows           {t_rows:8.3f}s")
+        print(f"  numpy          {t_np:8.3f}s  x{t_rows / t_np:.1f}  (totals identical)")
+        print(f"  frame build    {t_build:8.3f}s  (once per ledger change)")
+
+
+def bench_scan(rows: int, workers: List[int]) -> None:
+    # All four report kinds for one user straight off the CSV, as a cold
+    # process would compute them, at increasing worker counts.
+    from parallel_scan import scan_report_bundle
+    from reports import REPORT_KINDS, ReportFilters
+
+    with tempfile.TemporaryDirectory() as td:
+        ledger = Path(td) / "transaction.csv"
+        write_ledger_csv(ledger, rows)
+        f = ReportFilters(type="expense")
+        print(f"scan: {rows:,} rows, {ledger.stat().st_size / 1e6:.1f} MB, every report kind for one user")
+        baseline, expected = None, None
+        for n in workers:
+            result: Dict[str, object] = {}
+            t = _timed(lambda: result.update(scan_report_bundle(ledger, "U001", REPORT_KINDS, f, workers=n)))
+            if baseline is None:
+                baseline, expected = t, dict(result)
+            assert result == expected, "parallel scan differs from the single-worker scan"
+            print(f"  workers={n:<3} {t:8.2f}s  {rows / t:>10,.0f} rows/sec  x{baseline / t:.2f}")
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], None]] = {
+    "import": lambda a: bench_import(a.rows, a.workers),
+    "cents": lambda a: bench_cents(a.rows),
+    "columnar": lambda a: bench_columnar(a.rows),
+    "scan": lambda a: bench_scan(a.rows, a.workers),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Personal Finance Manager benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    BENCHMARKS[args.name](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,9 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional, Iterable, Tuple
 from datetime import date
 
-from storage import read_json, write_json
-from transactions import parse_iso_date
-from reports import load_user_rows, ReportFilters
+from storage import LedgerView, _stat_of, file_lock, get_view, read_records, row_cents, write_records, storage_backend
+from transactions import iso_day, parse_iso_date
+from reports import ReportFilters, cents_to_decimal, cube_cells
 
 @dataclass(frozen=True)
 class BudgetItem:
@@ -20,6 +20,59 @@ class BudgetItem:
     amount: Decimal
 
 
+# Expense cents per (user, YYYY-MM, category), kept in step with the ledger
+# through the LedgerView hooks: adding, editing or deleting an expense moves
+# one counter, and a budget check is two dict lookups. Saved as
+# transaction.csv.spend next to the rollup cube.
+class SpendCounters(LedgerView):
+
+    SUFFIX = ".spend"
+
+    def reset(self) -> None:
+        self._users: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+
+    def _bump(self, row: Dict[str, str], sign: int) -> None:
+        if row.get("type") != "expense":
+            return
+        amt = row_cents(row)
+        d = iso_day(row.get("date", ""))
+        if amt is None or d is None:
+            return
+        cats = self._users.setdefault(row.get("user_id", ""), {}).setdefault(d[:7], {})
+        cat = row.get("category", "")
+        counter = cats.get(cat)
+        if counter is None:
+            counter = cats[cat] = [0, 0]
+        counter[0] += amt * sign
+        counter[1] += sign
+        if counter[1] <= 0:
+            del cats[cat]
+
+    def add(self, row: Dict[str, str]) -> None:
+        self._bump(row, 1)
+
+    def remove(self, row: Dict[str, str]) -> None:
+        self._bump(row, -1)
+
+    def spent(self, user_id: str, month: str, category: str) -> int:
+        counter = self._users.get(user_id, {}).get(month, {}).get(category)
+        return counter[0] if counter else 0
+
+    # {category: cents} for one month.
+    def month(self, user_id: str, month: str) -> Dict[str, int]:
+        return {cat: c[0] for cat, c in self._users.get(user_id, {}).get(month, {}).items()}
+
+    def dump(self) -> Any:
+        return self._users
+
+    def load(self, data: Any) -> None:
+        self._users = data
+
+
+def spend_counters(tx_path: Path) -> SpendCounters:
+    return get_view(tx_path, SpendCounters)
+
+
 def _is_valid_month(label: str) -> bool:
    
     if not isinstance(label, str) or len(label) != 7 or label[4] != "-":
@@ -44,16 +97,81 @@ def parse_budget_amount(txt: str) -> Decimal:
 
 def load_budgets(path: Path) -> List[Dict[str, Any]]:
    
-    return read_json(path)
+    return read_records(path)
 
 
 def save_budgets(path: Path, items: List[Dict[str, Any]]) -> None:
     
-    write_json(path, items)
+    write_records(path, items, compact=True)
 
 
-def set_budget(path: Path, user_id: str, month: str, category: str, amount_txt: str) -> BudgetItem:
-   
+class BudgetIndex:
+    # budgets.json as nested dicts user -> month -> category -> amount, so a
+    # lookup by (user_id, month, category) is three dict hits. Loaded on
+    # first use and again only when the file's stat changes (a restore, or
+    # another process); upserts go through the index and write the file once
+    # per batch, compact. Entries that don't parse are kept as they are and
+    # written back untouched.
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._stat: Tuple[int, int, int] | None = None
+        self._loaded = False
+        self._users: Dict[str, Dict[str, Dict[str, Decimal]]] = {}
+        self._malformed: List[Dict[str, Any]] = []
+
+    def _sync(self) -> None:
+        st = _stat_of(self.path)
+        if self._loaded and st == self._stat:
+            return
+        self._users, self._malformed = {}, []
+        for it in load_budgets(self.path):
+            try:
+                amount = Decimal(it["amount"])
+                months = self._users.setdefault(it["user_id"], {})
+                months.setdefault(it["month"], {})[it["category"]] = amount
+            except Exception:
+                self._malformed.append(it)
+        self._stat, self._loaded = st, True
+
+    def get(self, user_id: str, month: str, category: str) -> Optional[Decimal]:
+        self._sync()
+        return self._users.get(user_id, {}).get(month, {}).get(category)
+
+    def items(self, user_id: str, month: Optional[str] = None) -> List[BudgetItem]:
+        self._sync()
+        months = self._users.get(user_id, {})
+        picked = [(month, months.get(month, {}))] if month else list(months.items())
+        return [
+            BudgetItem(user_id=user_id, month=m, category=c, amount=a)
+            for m, cats in picked for c, a in cats.items()
+        ]
+
+    def upsert(self, items: Iterable[BudgetItem]) -> None:
+        with file_lock(self.path):
+            self._sync()
+            for b in items:
+                self._users.setdefault(b.user_id, {}).setdefault(b.month, {})[b.category] = b.amount
+            records = [
+                {"user_id": u, "month": m, "category": c, "amount": str(a)}
+                for u, months in self._users.items() for m, cats in months.items() for c, a in cats.items()
+            ]
+            save_budgets(self.path, records + self._malformed)
+            self._stat = _stat_of(self.path)
+
+
+_INDEXES: Dict[Path, BudgetIndex] = {}
+
+
+def budget_index(path: Path) -> BudgetIndex:
+    key = Path(path).resolve()
+    index = _INDEXES.get(key)
+    if index is None:
+        index = _INDEXES[key] = BudgetIndex(Path(path))
+    return index
+
+
+def _budget_item(user_id: str, month: str, category: str, amount_txt: str) -> BudgetItem:
     if not user_id:
         raise ValueError("Missing user id.")
     if not _is_valid_month(month):
@@ -61,31 +179,56 @@ def set_budget(path: Path, user_id: str, month: str, category: str, amount_txt:
     cat = (category or "").strip()
     if not (1 <= len(cat) <= 40):
         raise ValueError("Category length must be 1..40.")
-    amt = parse_budget_amount(amount_txt)
+    return BudgetItem(user_id=user_id, month=month, category=cat, amount=parse_budget_amount(amount_txt))
+
+
+def set_budget(path: Path, user_id: str, month: str, category: str, amount_txt: str) -> BudgetItem:
+   
+    return set_budgets_bulk(path, user_id, [(month, category, amount_txt)])[0]
+
 
-    items = load_budgets(path)
-    # upsert
-    replaced = False
-    for it in items:
-        if it.get("user_id") == user_id and it.get("month") == month and it.get("category") == cat:
-            it["amount"] = str(amt)
-            replaced = True
-            break
-    if not replaced:
-        items.append({"user_id": user_id, "month": month, "category": cat, "amount": str(amt)})
+# Many upserts, one write: every entry is validated before anything is saved.
+# entries: (month, category, amount text).
+def set_budgets_bulk(path: Path, user_id: str, entries: Iterable[Tuple[str, str, str]]) -> List[BudgetItem]:
+    items = [_budget_item(user_id, month, cat, amt) for month, cat, amt in entries]
+    if not items:
+        return []
+    if storage_backend() == "sqlite":
+        import sqlite_store
+        sqlite_store.upsert_budgets(sqlite_store.db_path_for(path), [
+            {"user_id": b.user_id, "month": b.month, "category": b.category, "amount": str(b.amount)} for b in items
+        ])
+    else:
+        budget_index(path).upsert(items)
+    return items
 
-    save_budgets(path, items)
-    return BudgetItem(user_id=user_id, month=month, category=cat, amount=amt)
+
+# Copy `from_month`'s budgets onto each of the next `months` months,
+# overwriting what those months had for the same categories.
+def copy_budgets_forward(path: Path, user_id: str, from_month: str, months: int = 12) -> List[BudgetItem]:
+    if months < 1:
+        raise ValueError("Number of months must be at least 1.")
+    if not _is_valid_month(from_month):
+        raise ValueError("Month must be 'YYYY-MM' with a valid month 01..12.")
+    o = int(from_month[:4]) * 12 + int(from_month[5:]) - 1 + months
+    targets = _month_span(from_month, f"{o // 12:04d}-{o % 12 + 1:02d}")[1:]
+    source = get_budgets(path, user_id, from_month)
+    return set_budgets_bulk(path, user_id, [(m, b.category, str(b.amount)) for m in targets for b in source])
+
+
+def get_budget(path: Path, user_id: str, month: str, category: str) -> Optional[Decimal]:
+    if storage_backend() == "sqlite":
+        return next((b.amount for b in get_budgets(path, user_id, month) if b.category == category), None)
+    return budget_index(path).get(user_id, month, category)
 
 
 def get_budgets(path: Path, user_id: str, month: Optional[str] = None) -> List[BudgetItem]:
     
+    if storage_backend() != "sqlite":
+        return budget_index(path).items(user_id, month)
+    import sqlite_store
     out: List[BudgetItem] = []
-    for it in load_budgets(path):
-        if it.get("user_id") != user_id:
-            continue
-        if month and it.get("month") != month:
-            continue
+    for it in sqlite_store.select_budgets(sqlite_store.db_path_for(path), user_id, month):
         try:
             out.append(BudgetItem(
                 user_id=it["user_id"],
@@ -107,43 +250,89 @@ def spend_vs_budget(
     *,
     type_filter: Optional[str] = "expense"
 ) -> List[Tuple[str, Decimal, Decimal, Decimal]]:
-   
-    if not _is_valid_month(month):
-        raise ValueError("Month must be 'YYYY-MM' with a valid month 01..12.")
 
-    year = int(month[:4]); mon = int(month[5:])
-    start = date(year, mon, 1)
-    # compute end-of-month
-    if mon == 12:
-        end = date(year + 1, 1, 1).fromordinal(date(year + 1, 1, 1).toordinal() - 1)
+    return spend_vs_budget_range(tx_path, budgets_path, user_id, month, month, type_filter=type_filter)[month]
+
+
+def _month_span(start_month: str, end_month: str) -> List[str]:
+    for label in (start_month, end_month):
+        if not _is_valid_month(label):
+            raise ValueError("Month must be 'YYYY-MM' with a valid month 01..12.")
+    lo = int(start_month[:4]) * 12 + int(start_month[5:]) - 1
+    hi = int(end_month[:4]) * 12 + int(end_month[5:]) - 1
+    if lo > hi:
+        raise ValueError("Start month must not be after end month.")
+    return [f"{o // 12:04d}-{o % 12 + 1:02d}" for o in range(lo, hi + 1)]
+
+
+# Budget vs actual for every month in [start_month, end_month]: one read of
+# the budgets and one pass over the month's spend counters (or the cube's
+# cells for other types). Returns {month: rows} in month order, each list
+# shaped like spend_vs_budget()'s (category, actual, budget, delta).
+def spend_vs_budget_range(
+    tx_path: Path,
+    budgets_path: Path,
+    user_id: str,
+    start_month: str,
+    end_month: str,
+    *,
+    type_filter: Optional[str] = "expense"
+) -> Dict[str, List[Tuple[str, Decimal, Decimal, Decimal]]]:
+
+    months = _month_span(start_month, end_month)
+    wanted = set(months)
+
+    cents: Dict[str, Dict[str, int]] = {m: {} for m in months}
+    if type_filter == "expense":
+        counters = spend_counters(tx_path)
+        for m in months:
+            cents[m] = counters.month(user_id, m)
     else:
-        end = date(year, mon + 1, 1).fromordinal(date(year, mon + 1, 1).toordinal() - 1)
+        first = date(int(months[0][:4]), int(months[0][5:]), 1)
+        y, mo = int(months[-1][:4]), int(months[-1][5:])
+        last = date(y + mo // 12, mo % 12 + 1, 1).fromordinal(date(y + mo // 12, mo % 12 + 1, 1).toordinal() - 1)
+        filters = ReportFilters(start=first, end=last, type=(type_filter or None))
+        for (m, cat, _, _), cell in cube_cells(tx_path, user_id, filters) or []:
+            cents[m][cat] = cents[m].get(cat, 0) + cell[0]
 
-    filters = ReportFilters(start=start, end=end, type=(type_filter or None))
-    rows = load_user_rows(tx_path, user_id, filters)
+    budgets: Dict[str, Dict[str, Decimal]] = {m: {} for m in months}
+    for b in get_budgets(budgets_path, user_id):
+        if b.month in wanted:
+            budgets[b.month][b.category] = b.amount
 
-    # aggregate actual by category
-    from collections import defaultdict
-    actuals: Dict[str, Decimal] = defaultdict(lambda: Decimal("0"))
-    from decimal import Decimal as D
-    for r in rows:
-        cat = r.get("category") or ""
-        try:
-            amt = D(r.get("amount", "0"))
-        except Exception:
-            continue
-        actuals[cat] += amt
-
-    # budgets for the month
-    bmap: Dict[str, Decimal] = {b.category: b.amount for b in get_budgets(budgets_path, user_id, month)}
-
-    # union of categories
-    cats = sorted(set(actuals.keys()) | set(bmap.keys()))
-    results: List[Tuple[str, Decimal, Decimal, Decimal]] = []
-    for c in cats:
-        a = actuals.get(c, Decimal("0"))
-        b = bmap.get(c,  Decimal("0"))
-        results.append((c, a, b, b - a))  # delta = budget - actual
-    # Sort by biggest overspend first (delta ascending), then by category
-    results.sort(key=lambda t: (t[3], t[0]))
-    return results
+    out: Dict[str, List[Tuple[str, Decimal, Decimal, Decimal]]] = {}
+    for m in months:
+        actuals = {cat: cents_to_decimal(c) for cat, c in cents[m].items()}
+        bmap = budgets[m]
+        results: List[Tuple[str, Decimal, Decimal, Decimal]] = []
+        for c in sorted(set(actuals) | set(bmap)):
+            a = actuals.get(c, Decimal("0"))
+            b = bmap.get(c, Decimal("0"))
+            results.append((c, a, b, b - a))  # delta = budget - actual
+        # Sort by biggest overspend first (delta ascending), then by category
+        results.sort(key=lambda t: (t[3], t[0]))
+        out[m] = results
+    return out
+
+
+# Budget vs expenses for one category and month, for the alert after an
+# expense is saved; None when no positive budget is set for it.
+@dataclass(frozen=True)
+class BudgetStatus:
+
+    month: str
+    category: str
+    actual: Decimal
+    budget: Decimal
+
+    @property
+    def delta(self) -> Decimal:
+        return self.budget - self.actual
+
+
+def budget_status(tx_path: Path, budgets_path: Path, user_id: str, month: str, category: str) -> Optional[BudgetStatus]:
+    budget = get_budget(budgets_path, user_id, month, category)
+    if budget is None or budget <= 0:
+        return None
+    actual = cents_to_decimal(spend_counters(tx_path).spent(user_id, month, category))
+    return BudgetStatus(month=month, category=category, actual=actual, budget=budget)
@@ -1,38 +1,147 @@
 from __future__ import annotations
+import sys
+from bisect import bisect_left
+from dataclasses import dataclass
+from decimal import Decimal
 from pathlib import Path
-from typing import List, Dict, Any
-from storage import read_transactions_csv
-from transactions import _rewrite_csv
+from typing import List, Dict, Any, Optional, Tuple
+from storage import LedgerView, get_store, get_view, row_cents
+from transactions import iso_day
+from reports import cents_to_decimal
 
 CATEGORIES_JSON = "categories.json"  # optional file if you want to persist a list
 
+
+@dataclass
+class CategoryStats:
+    category: str
+    count: int
+    total: Decimal  # every row's amount, whatever its type
+    last_used: Optional[str]  # YYYY-MM-DD of the latest dated row
+
+
+# Per-user category catalog kept in step with the ledger and saved as
+# transaction.csv.catalog: rows, summed cents and rows per day for each
+# category, so listing categories or completing a typed prefix never scans
+# the ledger. Renames and merges reach it as row edits like any other write.
+# Blank categories are left out; a row with a bad amount or date still counts
+# but adds nothing to the total or the last-used date.
+class CategoryCatalog(LedgerView):
+
+    SUFFIX = ".catalog"
+
+    def reset(self) -> None:
+        # user -> category -> [rows, cents, {day: rows}]
+        self._users: Dict[str, Dict[str, List[Any]]] = {}
+        # user -> sorted (casefolded name, name), built on first lookup
+        self._sorted: Dict[str, List[Tuple[str, str]]] = {}
+
+    def _bump(self, row: Dict[str, str], sign: int) -> None:
+        cat = row.get("category")
+        if not cat:
+            return
+        user_id = row.get("user_id", "")
+        cats = self._users.setdefault(user_id, {})
+        entry = cats.get(cat)
+        if entry is None:
+            entry = cats[cat] = [0, 0, {}]
+            self._sorted.pop(user_id, None)
+        entry[0] += sign
+        amt = row_cents(row)
+        if amt is not None:
+            entry[1] += amt * sign
+        d = iso_day(row.get("date", ""))
+        if d is not None:
+            days = entry[2]
+            days[d] = days.get(d, 0) + sign
+            if days[d] <= 0:
+                del days[d]
+        if entry[0] <= 0:
+            del cats[cat]
+            self._sorted.pop(user_id, None)
+
+    def add(self, row: Dict[str, str]) -> None:
+        self._bump(row, 1)
+
+    def remove(self, row: Dict[str, str]) -> None:
+        self._bump(row, -1)
+
+    def stats(self, user_id: str) -> List[CategoryStats]:
+        return [
+            CategoryStats(cat, e[0], cents_to_decimal(e[1]), max(e[2], default=None))
+            for cat, e in sorted(self._users.get(user_id, {}).items(), key=lambda kv: kv[0].lower())
+        ]
+
+    # Names starting with `prefix` (case-insensitive), most used first, then
+    # most recently used.
+    def complete(self, user_id: str, prefix: str, limit: int = 10) -> List[str]:
+        names = self._sorted.get(user_id)
+        if names is None:
+            names = self._sorted[user_id] = sorted((c.casefold(), c) for c in self._users.get(user_id, {}))
+        key = prefix.casefold()
+        hits = []
+        i = bisect_left(names, (key, ""))
+        while i < len(names) and names[i][0].startswith(key):
+            hits.append(names[i][1])
+            i += 1
+        cats = self._users.get(user_id, {})
+        hits.sort(key=lambda c: max(cats[c][2], default=""), reverse=True)
+        hits.sort(key=lambda c: cats[c][0], reverse=True)
+        return hits[:limit]
+
+    def dump(self) -> Any:
+        return self._users
+
+    def load(self, data: Any) -> None:
+        self._users = data
+        self._sorted = {}
+
+
+def category_catalog(tx_path: Path) -> CategoryCatalog:
+    return get_view(tx_path, CategoryCatalog)
+
+
+def category_stats(tx_path: Path, user_id: str) -> List[CategoryStats]:
+    return category_catalog(tx_path).stats(user_id)
+
+
+def complete_category(tx_path: Path, user_id: str, prefix: str, limit: int = 10) -> List[str]:
+    return category_catalog(tx_path).complete(user_id, prefix, limit)
+
+
 def list_categories(tx_path: Path, user_id: str) -> List[str]:
 
-    rows = read_transactions_csv(tx_path)
-    s = {r.get("category","") for r in rows if r.get("user_id")==user_id and r.get("category")}
-    return sorted(s, key=str.lower)
+    return [s.category for s in category_stats(tx_path, user_id)]
 
 def rename_category(tx_path: Path, user_id: str, old: str, new: str) -> int:
 
-    rows = read_transactions_csv(tx_path)
-    changed = 0
-    for r in rows:
-        if r.get("user_id")==user_id and r.get("category")==old:
-            r["category"] = new
-            changed += 1
-    if changed:
-        _rewrite_csv(tx_path, rows)
-    return changed
+    return _relabel(tx_path, user_id, {old: new})
 
 def merge_categories(tx_path: Path, user_id: str, sources: List[str], target: str) -> int:
 
-    rows = read_transactions_csv(tx_path)
-    src = set(sources)
-    changed = 0
-    for r in rows:
-        if r.get("user_id")==user_id and r.get("category") in src:
-            r["category"] = target
-            changed += 1
-    if changed:
-        _rewrite_csv(tx_path, rows)
-    return changed
+    return _relabel(tx_path, user_id, {s: target for s in sources})
+
+# A ledger with category IDs only updates its name table; a plain one (or the
+# SQLite store) rewrites each matching row.
+def _relabel(tx_path: Path, user_id: str, mapping: Dict[str, str]) -> int:
+    store = get_store(tx_path)
+    if getattr(store, "uses_category_ids", None) and store.uses_category_ids():
+        return store.rename_categories(user_id, mapping)
+    changes = {
+        r["transaction_id"]: {**r, "category": mapping[r["category"]]}
+        for r in store.rows() if r.get("user_id")==user_id and r.get("category") in mapping
+    }
+    return store.update_many(changes) if changes else 0
+
+# Convert a CSV ledger to category IDs so rename/merge stop touching rows.
+# Returns the number of rows converted (0 if already done).
+def migrate_category_ids(tx_path: Path) -> int:
+    store = get_store(tx_path)
+    if not hasattr(store, "encode_categories"):
+        raise ValueError("Category IDs apply to the CSV ledger only.")
+    return store.encode_categories()
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / "data" / "transaction.csv"
+    print(f"rows converted: {migrate_category_ids(target)}")
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+# Optional NumPy engine for the per-user reports. A user's rows are loaded
+# once into typed columns (date as int32 day ordinals, amount as int64 cents,
+# category / payment method / type as dictionary codes) and every filter and
+# total after that is a vectorized mask plus bincount/add.at. Frames are
+# cached per (ledger, user) until the store's version moves, for the
+# FRAME_CACHE_SIZE most recently used pairs.
+#
+# NumPy is not a requirement: enabled() is False without it (or with
+# PFM_NUMPY=0) and reports.py keeps using its pure-Python loops.
+
+import os
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from storage import get_store, row_cents
+from logutil import get_logger
+
+LOGGER = get_logger(__name__)
+
+NO_DATE = -(2 ** 31)
+CODED_FIELDS = ("category", "payment_method", "type")
+
+
+def enabled() -> bool:
+    return np is not None and os.environ.get("PFM_NUMPY", "1").strip() != "0"
+
+
+class UserFrame:
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        seen_dates: Dict[str, Tuple[int, int]] = {}
+        days: List[int] = []
+        months: List[int] = []
+        cents: List[int] = []
+        valid: List[bool] = []
+        self.codes: Dict[str, Dict[str, int]] = {f: {} for f in CODED_FIELDS}
+        coded: Dict[str, List[int]] = {f: [] for f in CODED_FIELDS}
+
+        for r in rows:
+            ds = r.get("date") or ""
+            dm = seen_dates.get(ds)
+            if dm is None:
+                # Same rule as parse_iso_date: strip, then ISO only.
+                try:
+                    d = date.fromisoformat(ds.strip())
+                    dm = (d.toordinal(), d.year * 12 + d.month - 1)
+                except ValueError:
+                    dm = (NO_DATE, -1)
+                seen_dates[ds] = dm
+            days.append(dm[0])
+            months.append(dm[1])
+            c = row_cents(r)
+            valid.append(c is not None)
+            cents.append(c or 0)
+            for f in CODED_FIELDS:
+                table = self.codes[f]
+                v = r.get(f) or ""
+                code = table.get(v)
+                if code is None:
+                    code = table[v] = len(table)
+                coded[f].append(code)
+
+        self.size = len(days)
+        self.days = np.array(days, dtype=np.int32)
+        self.months = np.array(months, dtype=np.int32)
+        self.cents = np.array(cents, dtype=np.int64)
+        self.valid = np.array(valid, dtype=bool)
+        self.columns = {f: np.array(coded[f], dtype=np.int32) for f in CODED_FIELDS}
+        self.labels = {f: list(self.codes[f]) for f in CODED_FIELDS}
+
+    # Rows matching a ReportFilters-like object, with an amount that parses.
+    def mask(self, filters: Any = None) -> Any:
+        m = self.valid.copy()
+        if filters is None:
+            return m
+        if filters.start is not None or filters.end is not None:
+            m &= self.days != NO_DATE
+            if filters.start is not None:
+                m &= self.days >= filters.start.toordinal()
+            if filters.end is not None:
+                m &= self.days <= filters.end.toordinal()
+        for f in CODED_FIELDS:
+            want = getattr(filters, f)
+            if want is None:
+                continue
+            code = self.codes[f].get(want)
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            m &= self.columns[f] == code
+        return m
+
+    def _code_mask(self, field: str, value: str) -> Any:
+        code = self.codes[field].get(value)
+        if code is None:
+            return np.zeros(self.size, dtype=bool)
+        return self.columns[field] == code
+
+    def balance_cents(self, m: Any) -> Tuple[int, int]:
+        inc = self.cents[m & self._code_mask("type", "income")].sum()
+        exp = self.cents[m & self._code_mask("type", "expense")].sum()
+        return int(inc), int(exp)
+
+    # {category: cents} in first-seen order, like the row-based loop.
+    def category_cents(self, m: Any) -> Dict[str, int]:
+        m = m & ~self._code_mask("category", "")
+        codes = self.columns["category"][m]
+        n = len(self.labels["category"])
+        sums = np.zeros(n, dtype=np.int64)
+        np.add.at(sums, codes, self.cents[m])
+        present = np.bincount(codes, minlength=n) > 0
+        return {self.labels["category"][i]: int(sums[i]) for i in np.flatnonzero(present)}
+
+    def month_cents(self, m: Any) -> Dict[str, int]:
+        m = m & (self.months >= 0)
+        keys, inverse = np.unique(self.months[m], return_inverse=True)
+        sums = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(sums, inverse, self.cents[m])
+        return {f"{k // 12:04d}-{k % 12 + 1:02d}": int(v) for k, v in zip(keys.tolist(), sums.tolist())}
+
+
+# (ledger path, user) -> (store, store version, frame), least recently used
+# first. The store itself is kept and compared by identity: a version number
+# alone could match a different store built for the same path.
+_FRAMES: "OrderedDict[Tuple[Path, str], Tuple[Any, int, UserFrame]]" = OrderedDict()
+FRAME_CACHE_SIZE = int(os.environ.get("PFM_FRAME_CACHE", "16"))
+
+
+def frame_for(tx_path: Path, user_id: str) -> UserFrame:
+    store = get_store(tx_path)
+    store.refresh()
+    key = (Path(tx_path).resolve(), user_id)
+    cached = _FRAMES.get(key)
+    if cached is not None and cached[0] is store and cached[1] == store.version:
+        _FRAMES.move_to_end(key)
+        return cached[2]
+    query = getattr(store, "query", None)
+    rows = query(user_id) if query is not None else [r for r in store.rows() if r.get("user_id") == user_id]
+    frame = UserFrame(rows)
+    if FRAME_CACHE_SIZE > 0:
+        _FRAMES[key] = (store, store.version, frame)
+        _FRAMES.move_to_end(key)
+        while len(_FRAMES) > FRAME_CACHE_SIZE:
+            _FRAMES.popitem(last=False)
+    LOGGER.debug("Built columnar frame for %s: %d row(s)", user_id, frame.size)
+    return frame
@@ -3,8 +3,8 @@ from pathlib import Path
 import sys
 from typing import Optional
 from datetime import date
-from categories import list_categories, merge_categories, rename_category
-from storage import read_json, write_json, append_transactions_csv, read_transactions_csv
+from categories import category_stats, complete_category, merge_categories, migrate_category_ids, rename_category
+from storage import read_json, write_json, append_transactions_csv, read_transactions_csv, get_store, reset_ledger_sidecars, category_table_path
 from users import register_user, authenticate
 from transactions import (
     SUPPORTED_METHODS as TX_SUPPORTED_METHODS,
@@ -13,21 +13,27 @@ from transactions import (
     edit_transaction,
     get_transaction_by_id,
     persist_transaction,
-    list_user_transactions,
+    list_user_transactions_page,
+    transaction_cursor,
 )
 from reports import (
     ReportFilters,
     load_user_rows,
-    balance_summary,
-    totals_by_category,
-    totals_by_month,
+    user_balance_summary,
+    user_totals_by_category,
+    user_totals_by_month,
+    compute_report_bundle,
+    running_balance_by_month,
     fmt_money,
     render_console_table,
 )
 from transactions import parse_iso_date
+from report_query import run_query
+from spend_analytics import user_spend_analytics
+from pivot import render_pivot, user_pivot, write_pivot_csv
 from backups import BackupSpec, create_backup, list_backups, verify_backup, restore_backup
 from logutil import get_logger
-from budgets import set_budget, get_budgets, spend_vs_budget
+from budgets import set_budget, get_budgets, copy_budgets_forward, spend_vs_budget, spend_vs_budget_range, budget_status
 
 
 
@@ -47,12 +53,42 @@ SUPPORTED_METHODS = ("Cash", "Debit Card", "Credit Card", "Bank Transfer", "Wall
 LOGGER = get_logger("pfm", app_root=App_ROOT)
 BUDGETS_JSON = Data_DIR / "budgets.json"
 RECURRENCES_JSON = Data_DIR / "recurrences.json"
+SQLITE_DB = Data_DIR / "pfm.sqlite3"  # only used when PFM_STORAGE=sqlite
 
 def current_currency() -> str:
     if CURRENT_USER and "currency" in CURRENT_USER:
         return CURRENT_USER["currency"]
     return ""
 
+# Category prompt completed from the user's category catalog: Tab completes
+# where readline is available, and "<prefix>?" lists matches anywhere.
+def prompt_category(user_id: str, prompt: str) -> str:
+    try:
+        import readline
+    except ImportError:
+        readline = None
+
+    def complete(text: str, state: int) -> Optional[str]:
+        matches = complete_category(TXNS_CSV, user_id, text)
+        return matches[state] if state < len(matches) else None
+
+    if readline is not None:
+        saved = readline.get_completer(), readline.get_completer_delims()
+        readline.set_completer(complete)
+        readline.set_completer_delims("")  # names may contain spaces
+        readline.parse_and_bind("tab: complete")
+    try:
+        while True:
+            cat = input(prompt).strip()
+            if not cat.endswith("?"):
+                return cat
+            matches = complete_category(TXNS_CSV, user_id, cat[:-1].strip())
+            print("  " + ", ".join(matches) if matches else "  (no matching categories)")
+    finally:
+        if readline is not None:
+            readline.set_completer(saved[0])
+            readline.set_completer_delims(saved[1])
+
 def print_banner()-> None:
     # Lightweight splash to make the CLI feel intentional.
     print("=" * 58)
@@ -139,7 +175,7 @@ def main_menu() -> None:
 
                 amt = input("Amount (e.g., 123.45): ").strip()
 
-                cat = input("Category (e.g., Food, Salary, Rent): ").strip()
+                cat = prompt_category(CURRENT_USER["user_id"], "Category (e.g., Food, Salary, Rent; Fo? lists matches): ")
 
                 d = input("Date (YYYY-MM-DD): ").strip()
 
@@ -160,20 +196,18 @@ def main_menu() -> None:
                 new_id = persist_transaction(TXNS_CSV, tx)
                 if tx.type == "expense":
                     month_label = f"{tx.date.year:04d}-{tx.date.month:02d}"
-                    rows = spend_vs_budget(TXNS_CSV, BUDGETS_JSON, CURRENT_USER["user_id"], month_label, type_filter="expense")
-                    # find this category
-                    for cat, actual, budget, delta in rows:
-                        if cat == tx.category:
-                            if budget > 0 and delta < 0:
-                                # over by abs(delta)
-                                over = (-delta).quantize(Decimal("0.01"))
-                                print(f"🚨 Over budget for {cat} in {month_label} by {over} {current_currency()}.")
-                            elif budget > 0 and delta <= Decimal("0.00"):
-                                print(f"⚠️ You have reached your {cat} budget for {month_label}.")
-                            elif budget > 0:
-                                remaining = delta.quantize(Decimal("0.01"))
-                                print(f"ℹ️ Remaining {cat} budget for {month_label}: {remaining} {current_currency()}.")
-                            break
+                    st = budget_status(TXNS_CSV, BUDGETS_JSON, CURRENT_USER["user_id"], month_label, tx.category)
+                    if st is not None:
+                        cat, delta = st.category, st.delta
+                        if delta < 0:
+                            # over by abs(delta)
+                            over = (-delta).quantize(Decimal("0.01"))
+                            print(f"🚨 Over budget for {cat} in {month_label} by {over} {current_currency()}.")
+                        elif delta <= Decimal("0.00"):
+                            print(f"⚠️ You have reached your {cat} budget for {month_label}.")
+                        else:
+                            remaining = delta.quantize(Decimal("0.01"))
+                            print(f"ℹ️ Remaining {cat} budget for {month_label}: {remaining} {current_currency()}.")
                 print(f"✅ Saved transaction {new_id} for user {CURRENT_USER['name']}.")
             except ValueError as e:
                 print(f"⚠️ {e}")
@@ -182,12 +216,9 @@ def main_menu() -> None:
                 print("🔒 Please login first (Menu → [1] Login / Switch user).")
                 continue
 
-            rows = list_user_transactions(TXNS_CSV, CURRENT_USER["user_id"], newest_first=True)
-            if not rows:
-                print("No transactions yet.")
-                continue
-
-    
+            # One page at a time; `starts` holds the cursor each page began at.
+            starts = [None]
+            page_size = 20
             headers = ("ID", "Type", "Amount", "Category", "Date", "Method", "Description")
             widths = [10, 8, 12, 14, 12, 14, 40]
 
@@ -200,27 +231,47 @@ def main_menu() -> None:
                     cells.append(s.ljust(w))
                 return "  ".join(cells)
 
-            print()
-            print(fmt_row(headers, widths))
-            print("-" * (sum(widths) + 2 * (len(widths) - 1)))
+            while True:
+                rows = list_user_transactions_page(
+                    TXNS_CSV, CURRENT_USER["user_id"], after=starts[-1], limit=page_size + 1)
+                has_more = len(rows) > page_size
+                rows = rows[:page_size]
+                if not rows:
+                    print("No transactions yet.")
+                    break
+
+                print(f"\nPage {len(starts)}")
+                print(fmt_row(headers, widths))
+                print("-" * (sum(widths) + 2 * (len(widths) - 1)))
 
-            for r in rows:
-                amt = r.get("amount", "")
-                if CURRENT_USER and "currency" in CURRENT_USER:
-                    amt = f"{amt} {current_currency()}"
+                for r in rows:
+                    amt = r.get("amount", "")
+                    if CURRENT_USER and "currency" in CURRENT_USER:
+                        amt = f"{amt} {current_currency()}"
+                    else:
+                        amt = str(amt)
+
+                    line = (
+                        r.get("transaction_id", ""),
+                        r.get("type", ""),
+                        amt,
+                        r.get("category", ""),
+                        r.get("date", ""),
+                        r.get("payment_method", ""),
+                        r.get("description", "") or "",
+                    )
+                    print(fmt_row(line, widths))
+
+                options = (["[n] Next"] if has_more else []) + (["[p] Prev"] if len(starts) > 1 else []) + ["[0] Back"]
+                nav = input("  ".join(options) + ": ").strip().lower()
+                if nav == "n" and has_more:
+                    starts.append(transaction_cursor(rows[-1]))
+                elif nav == "p" and len(starts) > 1:
+                    starts.pop()
+                elif nav in ("0", "q", ""):
+                    break
                 else:
-                    amt = str(amt)
-
-                line = (
-            r.get("transaction_id", ""),
-            r.get("type", ""),
-            amt,
-            r.get("category", ""),
-            r.get("date", ""),
-            r.get("payment_method", ""),
-            r.get("description", "") or "",
-        )
-                print(fmt_row(line, widths))
+                    print("⚠️ Invalid choice. Try again.")
         elif choice == "4":
              if CURRENT_USER is None:
                 print("🔒 Please login first (Menu → [1] Login / Switch user).")
@@ -233,6 +284,10 @@ def main_menu() -> None:
                 print("[3] Monthly totals (with optional filters)")
                 print("[4] Filtered listing (show rows)")
                 print("[5] ASCII chart: Totals by category (optionally filtered)")
+                print("[6] Query (e.g. date>=2025-01 and category in (Food,Rent) and amount>100)")
+                print("[7] Running balance over time (month ends)")
+                print("[8] Spend analytics: median/p90/p99 per category, top expenses per month")
+                print("[9] Pivot: category x month totals (print or export CSV)")
 
                 print("[0] Back")
 
@@ -242,8 +297,7 @@ def main_menu() -> None:
                     break
 
                 elif sub == "1":
-                    rows = load_user_rows(TXNS_CSV, CURRENT_USER["user_id"])
-                    s = balance_summary(rows)
+                    s = user_balance_summary(TXNS_CSV, CURRENT_USER["user_id"])
                     data = [
                         ("Total income",  fmt_money(s["income"],  CURRENT_USER["currency"])),
                         ("Total expense", fmt_money(s["expense"], CURRENT_USER["currency"])),
@@ -271,12 +325,11 @@ def main_menu() -> None:
                     filters.category = cat or None
                     filters.type = ttype or None
 
-                    rows = load_user_rows(TXNS_CSV, CURRENT_USER["user_id"], filters)
-                    if not rows:
+                    agg = user_totals_by_category(TXNS_CSV, CURRENT_USER["user_id"], filters)
+                    if not agg:
                         print("No matching transactions.")
                         continue
 
-                    agg = totals_by_category(rows)
                     printable = [(cat, fmt_money(total, CURRENT_USER["currency"])) for cat, total in agg]
                     print()
                     render_console_table(printable, headers=("Category", "Total"), widths=(24, 16))
@@ -300,12 +353,11 @@ def main_menu() -> None:
                     filters.category = cat or None
                     filters.type = ttype or None
 
-                    rows = load_user_rows(TXNS_CSV, CURRENT_USER["user_id"], filters)
-                    if not rows:
+                    agg = user_totals_by_month(TXNS_CSV, CURRENT_USER["user_id"], filters)  # [('2025-09', Decimal(...)), ...]
+                    if not agg:
                         print("No matching transactions.")
                         continue
 
-                    agg = totals_by_month(rows)  # [('2025-09', Decimal(...)), ...]
                     printable = [(label, fmt_money(total, CURRENT_USER["currency"])) for label, total in agg]
                     print()
                     render_console_table(printable, headers=("Month", "Total"), widths=(10, 16))
@@ -390,21 +442,123 @@ def main_menu() -> None:
                         print("No matching transactions.")
                         continue
 
-                    # Build (category, total) pairs with Decimal
-                    from collections import defaultdict
-                    agg = defaultdict(lambda: Decimal("0"))
-                    for r in rows:
-                        try:
-                            amt = Decimal(r.get("amount","0"))
-                        except Exception:
-                            continue
-                        agg[r.get("category","")] += amt
-
                     # Render bars
                     from ascii_charts import hbar_chart
-                    pairs = sorted(agg.items(), key=lambda kv: kv[1], reverse=True)
+                    pairs = compute_report_bundle(rows, ["chart"])["chart"]
                     for line in hbar_chart(pairs, width=40):
                         print(line)
+
+                elif sub == "6":
+                    print("\nFields: date, amount, category, type, method, description, id")
+                    print("Operators: = != < <= > >= ~ (contains), in (a,b); combine with and / or / not, ( )")
+                    expr = input("Query: ").strip()
+                    try:
+                        rows = run_query(TXNS_CSV, CURRENT_USER["user_id"], expr)
+                    except ValueError as e:
+                        print(f"⚠️ {e}")
+                        continue
+                    if not rows:
+                        print("No matching transactions.")
+                        continue
+
+                    bundle = compute_report_bundle(rows, ["balance", "by_category"])
+                    s = bundle["balance"]
+                    data = [
+                        ("Matching rows", str(len(rows))),
+                        ("Total income",  fmt_money(s["income"],  CURRENT_USER["currency"])),
+                        ("Total expense", fmt_money(s["expense"], CURRENT_USER["currency"])),
+                        ("Net",           fmt_money(s["net"],     CURRENT_USER["currency"])),
+                    ]
+                    print()
+                    render_console_table(data, headers=("Metric", "Amount"))
+                    printable = [(cat, fmt_money(total, CURRENT_USER["currency"])) for cat, total in bundle["by_category"]]
+                    if printable:
+                        print()
+                        render_console_table(printable, headers=("Category", "Total"), widths=(24, 16))
+
+                elif sub == "7":
+                    print("\n(Optional) Enter a date range or press Enter to skip.")
+                    start_s = input("Start date (YYYY-MM-DD): ").strip()
+                    end_s   = input("End date   (YYYY-MM-DD): ").strip()
+                    try:
+                        start = parse_iso_date(start_s) if start_s else None
+                        end = parse_iso_date(end_s) if end_s else None
+                    except ValueError as e:
+                        print(f"⚠️ {e}")
+                        continue
+
+                    pairs = running_balance_by_month(TXNS_CSV, CURRENT_USER["user_id"], start, end)
+                    if not pairs:
+                        print("No matching transactions.")
+                        continue
+
+                    from ascii_charts import signed_bar_chart
+                    print()
+                    for line in signed_bar_chart(pairs, width=40):
+                        print(line)
+
+                elif sub == "8":
+                    print("\n(Optional) Enter filters or press Enter to skip.")
+                    start_s = input("Start date (YYYY-MM-DD): ").strip()
+                    end_s   = input("End date   (YYYY-MM-DD): ").strip()
+                    cat     = input("Category (exact): ").strip()
+                    k_s     = input("Top expenses per month [3]: ").strip()
+                    try:
+                        filters = ReportFilters(
+                            start=parse_iso_date(start_s) if start_s else None,
+                            end=parse_iso_date(end_s) if end_s else None,
+                            category=cat or None,
+                        )
+                        k = int(k_s) if k_s else 3
+                        stats = user_spend_analytics(TXNS_CSV, CURRENT_USER["user_id"], filters, k=k)
+                    except ValueError as e:
+                        print(f"⚠️ {e}")
+                        continue
+                    if not stats["quantiles"]:
+                        print("No matching transactions.")
+                        continue
+
+                    cur = CURRENT_USER["currency"]
+                    print(f"\n{'Category':<20}  {'Count':>7}  {'Median':>14}  {'p90':>14}  {'p99':>14}")
+                    print("-" * 77)
+                    for c, n, (p50, p90, p99) in stats["quantiles"]:
+                        print(f"{(c or '(none)')[:20]:<20}  {n:>7}  {fmt_money(p50, cur):>14}  "
+                              f"{fmt_money(p90, cur):>14}  {fmt_money(p99, cur):>14}")
+                    print("(quantiles are estimates within 1%)")
+
+                    for month, top in stats["top_expenses"]:
+                        print(f"\n{month}")
+                        for amt, r in top:
+                            print(f"  {fmt_money(amt, cur):>14}  {r.get('category', ''):<14}  {r.get('description', '') or ''}")
+
+                elif sub == "9":
+                    print("\n(Optional) Enter filters or press Enter to skip.")
+                    start_s = input("Start date (YYYY-MM-DD): ").strip()
+                    end_s   = input("End date   (YYYY-MM-DD): ").strip()
+                    pm      = input("Payment method (exact): ").strip()
+                    ttype   = input("Type (income/expense): ").strip()
+                    try:
+                        filters = ReportFilters(
+                            start=parse_iso_date(start_s) if start_s else None,
+                            end=parse_iso_date(end_s) if end_s else None,
+                            payment_method=pm or None,
+                            type=ttype or None,
+                        )
+                    except ValueError as e:
+                        print(f"⚠️ {e}")
+                        continue
+
+                    pv = user_pivot(TXNS_CSV, CURRENT_USER["user_id"], filters)
+                    if not pv.categories:
+                        print("No matching transactions.")
+                        continue
+                    outp = input("CSV filename to export to (Enter to print here): ").strip()
+                    if outp:
+                        n = write_pivot_csv(pv, App_ROOT / outp)
+                        print(f"✅ Exported {n} categor{'y' if n == 1 else 'ies'} x {len(pv.months)} month(s) to {outp}")
+                    else:
+                        print(f"\nAmounts in {CURRENT_USER['currency']}")
+                        print("\n".join(render_pivot(pv)))
         
 
                 else:
@@ -427,9 +581,11 @@ def main_menu() -> None:
                     # Create a ZIP backup of users.json and transactions.csv
                     spec = BackupSpec(
                         backup_dir=BACKUP_DIR,
-                        files=[USERS_JSON, TXNS_CSV],
+                        files=[USERS_JSON, TXNS_CSV, category_table_path(TXNS_CSV), SQLITE_DB],
                     )
                     try:
+                        # Fold pending edits into transaction.csv so the ZIP is complete.
+                        get_store(TXNS_CSV).compact()
                         zip_path = create_backup(spec)
                         print(f"✅ Backup created: {zip_path.name}")
                     except OSError as e:
@@ -482,7 +638,12 @@ def main_menu() -> None:
                         print("Restore cancelled.")
                         continue
                     try:
-                        restored = restore_backup(target, Data_DIR, overwrite=True)
+                        from sqlite_store import close_all
+                        close_all()
+                        names = (USERS_JSON.name, TXNS_CSV.name, category_table_path(TXNS_CSV).name, SQLITE_DB.name)
+                        restored = restore_backup(target, Data_DIR, overwrite=True, allowed=names)
+                        if any(p.name == TXNS_CSV.name for p in restored):
+                            reset_ledger_sidecars(TXNS_CSV)
                         if restored:
                             print("✅ Restored files:")
                             for p in restored:
@@ -505,6 +666,8 @@ def main_menu() -> None:
                 print("[1] Set/Update monthly category budget")
                 print("[2] List budgets for a month")
                 print("[3] Budget vs Actual (by month)")
+                print("[4] Yearly budget summary")
+                print("[5] Copy a month's budgets forward")
                 print("[0] Back")
                 sub = input("Select an option: ").strip()
 
@@ -566,6 +729,53 @@ def main_menu() -> None:
                             clip(fmt_money_budget(actual), widths[1]).ljust(widths[1]),
                             clip(fmt_money_budget(budget), widths[2]).ljust(widths[2]),
                             clip(fmt_money_budget(delta), widths[3]).ljust(widths[3]))
+
+                elif sub == "4":
+                    year = input("Year (YYYY): ").strip()
+                    try:
+                        grid = spend_vs_budget_range(TXNS_CSV, BUDGETS_JSON, CURRENT_USER["user_id"],
+                                                     f"{year}-01", f"{year}-12", type_filter="expense")
+                    except ValueError as e:
+                        print(f"⚠️ {e}")
+                        continue
+                    if not any(grid.values()):
+                        print("No budgets or transactions for this year.")
+                        continue
+
+                    cur = CURRENT_USER["currency"]
+                    zero = Decimal("0")
+                    line = "{:<18}  {:>16}  {:>16}  {:>16}"
+                    print(f"\nBudget vs Actual for {year}")
+                    print(line.format("Month", "Actual", "Budget", "Delta"))
+                    print("-" * 72)
+                    by_cat: dict = {}
+                    for month, rows in grid.items():
+                        actual = sum((r[1] for r in rows), zero)
+                        budget = sum((r[2] for r in rows), zero)
+                        print(line.format(month, fmt_money(actual, cur), fmt_money(budget, cur), fmt_money(budget - actual, cur)))
+                        for cat, a, b, _ in rows:
+                            acc = by_cat.setdefault(cat, [zero, zero])
+                            acc[0] += a
+                            acc[1] += b
+
+                    print()
+                    print(line.format("Category", "Actual", "Budget", "Delta"))
+                    print("-" * 72)
+                    for cat, (a, b) in sorted(by_cat.items(), key=lambda kv: (kv[1][1] - kv[1][0], kv[0])):
+                        print(line.format(cat[:18], fmt_money(a, cur), fmt_money(b, cur), fmt_money(b - a, cur)))
+
+                elif sub == "5":
+                    month = input("Copy budgets of month (YYYY-MM): ").strip()
+                    n = input("Number of following months [12]: ").strip() or "12"
+                    try:
+                        copied = copy_budgets_forward(BUDGETS_JSON, CURRENT_USER["user_id"], month, int(n))
+                    except ValueError as e:
+                        print(f"⚠️ {e}")
+                        continue
+                    if not copied:
+                        print("No budgets found for that month.")
+                    else:
+                        print(f"✅ Copied {len(copied)} budget(s) into the next {n} month(s).")
                 else:
                     print("⚠️ Invalid choice. Try again.")
         elif choice == "7":
@@ -640,15 +850,20 @@ def main_menu() -> None:
             print("[1] List my categories")
             print("[2] Rename a category")
             print("[3] Merge categories")
+            print("[4] Store categories as IDs (rename/merge without touching rows)")
             print("[0] Back")
             sub = input("Select: ").strip()
 
             if sub == "1":
-                cats = list_categories(TXNS_CSV, CURRENT_USER["user_id"])
-                if not cats: print("No categories yet.")
+                stats = category_stats(TXNS_CSV, CURRENT_USER["user_id"])
+                if not stats: print("No categories yet.")
                 else:
-                    print("Your categories:")
-                    for c in cats: print(" -", c)
+                    cur = CURRENT_USER["currency"]
+                    line = "{:<24}  {:>6}  {:>16}  {:<10}"
+                    print(line.format("Category", "Rows", "Total", "Last used"))
+                    print("-" * 62)
+                    for st in stats:
+                        print(line.format(st.category[:24], st.count, fmt_money(st.total, cur), st.last_used or "-"))
 
             elif sub == "2":
                 old = input("Old category: ").strip()
@@ -662,6 +877,14 @@ def main_menu() -> None:
                 src_list = [s.strip() for s in sources.split(",") if s.strip()]
                 n = merge_categories(TXNS_CSV, CURRENT_USER["user_id"], src_list, target)
                 print(f"✅ Merged {n} row(s).")
+
+            elif sub == "4":
+                try:
+                    n = migrate_category_ids(TXNS_CSV)
+                except ValueError as e:
+                    print(f"⚠️ {e}")
+                    continue
+                print(f"✅ Converted {n} row(s) to category IDs." if n else "Ledger already uses category IDs.")
         elif choice == "9":
             if CURRENT_USER is None:
                 print("🔒 Please login first.")
@@ -680,9 +903,17 @@ def main_menu() -> None:
 
             elif sub == "2":
                 inp = input("Source CSV filename (in project folder): ").strip()
-                from import_export import import_transactions
-                added, skipped = import_transactions(TXNS_CSV, CURRENT_USER["user_id"], App_ROOT / inp)
-                print(f"✅ Imported {added} row(s). Skipped {skipped}.")
+                from import_export import import_transactions_batch
+                try:
+                    report = import_transactions_batch(TXNS_CSV, CURRENT_USER["user_id"], App_ROOT / inp)
+                except OSError as e:
+                    print(f"❌ Import failed: {e}")
+                    continue
+                print(f"✅ Imported {report.added} row(s). Skipped {report.skipped}. ({report.rows_per_sec:.0f} rows/sec)")
+                for line, reason in report.rejections[:10]:
+                    print(f"  - line {line}: {reason}")
+                if len(report.rejections) > 10:
+                    print(f"  … and {len(report.rejections) - 10} more")
         elif choice == "10":
             if CURRENT_USER is None:
                 print("🔒 Please login first.")
@@ -727,12 +958,19 @@ def main_menu() -> None:
 
 if __name__ == "__main__":
     print_banner()
-    try:
-        main_menu()
-    except KeyboardInterrupt:
-        print("\nInterrupted. Exiting…")
-        LOGGER.warning("Interrupted by user (Ctrl+C)")
-    except Exception as e:
-        print("\nUnexpected error. See logs/app.log for details.")
-        LOGGER.exception("Fatal error: %s", e)
-        sys.exit(1)
+    while True:
+        try:
+            main_menu()
+        except TimeoutError as e:
+            # Another process held the ledger lock too long; nothing was written.
+            print(f"⚠️ {e}. Please try again in a moment.")
+            LOGGER.warning("Action aborted: %s", e)
+            continue
+        except KeyboardInterrupt:
+            print("\nInterrupted. Exiting…")
+            LOGGER.warning("Interrupted by user (Ctrl+C)")
+        except Exception as e:
+            print("\nUnexpected error. See logs/app.log for details.")
+            LOGGER.exception("Fatal error: %s", e)
+            sys.exit(1)
+        break
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+# Multi-core report scan straight off transaction.csv. The file is split into
+# record-aligned byte ranges (storage.split_csv_ranges); each worker parses
+# its range, applies the journal's edits/deletes, keeps the user's rows that
+# pass the filters and returns partial cent sums. Partials are merged in file
+# order, so totals - and the order of tied categories - match the serial
+# reports exactly.
+#
+# Worth it for a cold process over a very large ledger: once the store holds
+# the rows in memory, the serial loop over them is cheaper than re-parsing.
+# Workers come from the argument, else PFM_SCAN_WORKERS (default 1 = off).
+
+import json
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from storage import (
+    TransactionStore,
+    _parse_csv_bytes,
+    decode_categories,
+    get_store,
+    journal_path_for,
+    split_csv_ranges,
+)
+from reports import (
+    ReportFilters,
+    compile_filters,
+    compute_report_bundle,
+    finish_report_bundle,
+    load_user_rows,
+    merge_report_bundles,
+    partial_report_bundle,
+    report_kinds,
+)
+from logutil import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+def scan_workers() -> int:
+    try:
+        return max(1, int(os.environ.get("PFM_SCAN_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+# Final journal outcome per transaction ID: the last "put" row, or None once
+# deleted (a put after a delete finds nothing to replace, as in the store).
+def _journal_outcomes(path: Path) -> Dict[str, Optional[Dict[str, str]]]:
+    out: Dict[str, Optional[Dict[str, str]]] = {}
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return out
+    for line in data[: data.rfind(b"\n") + 1].splitlines():
+        if not line.strip():
+            continue
+        rec = json.loads(line)
+        tid = rec.get("tid", "")
+        if rec.get("op") == "del":
+            out[tid] = None
+        elif rec.get("op") == "put" and out.get(tid, {}) is not None:
+            out[tid] = rec["row"]
+    return out
+
+
+# Worker entry point: partial bundle of one byte range, plus the journaled
+# IDs it met (the parent checks none of them is a duplicate). `names` is the
+# user's category table when the ledger stores category IDs.
+def _scan_range(
+    job: Tuple[str, int, int, int, List[str], str, Optional[ReportFilters], frozenset, Dict[str, Any],
+               Optional[Dict[str, Dict[str, str]]]],
+) -> Tuple[Dict[str, Any], List[str]]:
+    path, ino, start, end, fieldnames, user_id, filters, want, journal, names = job
+    with open(path, "rb") as f:
+        # A replaced CSV has other offsets; read nothing, the parent rescans.
+        if os.fstat(f.fileno()).st_ino != ino:
+            return partial_report_bundle([], want), []
+        f.seek(start)
+        data = f.read(end - start)
+    _, rows = _parse_csv_bytes(data, fieldnames)
+    if names is not None:
+        decode_categories(rows, names)
+    matches = compile_filters(filters) if filters is not None else None
+    touched: List[str] = []
+
+    def mine() -> Iterator[Dict[str, str]]:
+        for r in rows:
+            if journal:
+                tid = r.get("transaction_id") or ""
+                if tid in journal:
+                    touched.append(tid)
+                    r = journal[tid]
+                    if r is None:
+                        continue
+            if r.get("user_id") != user_id:
+                continue
+            if matches is not None and not matches(r):
+                continue
+            yield r
+
+    return partial_report_bundle(mine(), want), touched
+
+
+# compute_report_bundle() over the user's filtered rows, computed by
+# `workers` processes reading the CSV directly. Other backends, and ledgers
+# whose journal touches a duplicated ID, take the serial path.
+def scan_report_bundle(
+    tx_path: Path,
+    user_id: str,
+    specs: Iterable[str],
+    filters: Optional[ReportFilters] = None,
+    *,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    want = report_kinds(specs)
+    workers = workers or scan_workers()
+    store = get_store(tx_path)
+    if not isinstance(store, TransactionStore) or not tx_path.exists():
+        return compute_report_bundle(load_user_rows(tx_path, user_id, filters), want)
+
+    # No writer lock: a read-only scan must not block writers. Workers read
+    # only up to the CSV's current end, so later appends are simply not seen;
+    # if the CSV was replaced or the journal moved meanwhile (an edit, delete
+    # or compaction), the snapshot may be torn and the serial path runs.
+    before = store.ledger_state()
+    journal = _journal_outcomes(journal_path_for(tx_path))
+    fieldnames, ranges = split_csv_ranges(tx_path, workers * 4)
+    names = None
+    if "category_id" in fieldnames:
+        store.categories.sync()
+        names = {user_id: dict(store.categories.users.get(user_id, {}))}
+        journal = {tid: dict(store._from_journal(r)) if r is not None else None for tid, r in journal.items()}
+    ino = before[0][0] if before[0] else 0
+    jobs = [(str(tx_path), ino, s, e, fieldnames, user_id, filters, want, journal, names) for s, e, _ in ranges]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_range, jobs))
+    else:
+        results = [_scan_range(job) for job in jobs]
+
+    after = store.ledger_state()
+    if before[0] is None or after[0] is None or after[0][0] != before[0][0] or after[1] != before[1]:
+        LOGGER.info("%s changed during the scan; scanning serially", tx_path.name)
+        return compute_report_bundle(load_user_rows(tx_path, user_id, filters), want)
+    seen = Counter(tid for _, touched in results for tid in touched)
+    if any(n > 1 for n in seen.values()):
+        LOGGER.info("Journal edits a duplicated transaction ID; scanning %s serially", tx_path.name)
+        return compute_report_bundle(load_user_rows(tx_path, user_id, filters), want)
+    LOGGER.debug("Scanned %s in %d range(s) on %d worker(s)", tx_path.name, len(jobs), workers)
+    parts = [partial_report_bundle([], want)] + [part for part, _ in results]
+    return finish_report_bundle(merge_report_bundles(parts))
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+# Category x month pivot: rows are categories, columns every month from the
+# first to the last with activity, cells the summed amounts, plus row and
+# column totals. Aggregation interns each category and month to an index the
+# first time it is seen and adds int cents into per-category array('q')
+# rows, so a pass costs one dict lookup per key instead of nested dicts of
+# Decimal. Month-grained filters are answered from the rollup cube's cells
+# without touching rows. Like totals_by_category, rows with a blank
+# category, a bad date or a bad amount are left out.
+
+import csv
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from storage import LedgerRow, row_cents
+from transactions import iso_day
+from reports import ReportFilters, cube_cells, load_user_rows
+
+
+@dataclass
+class Pivot:
+    categories: List[str]  # by row total, largest first
+    months: List[str]  # YYYY-MM, contiguous
+    cells: array  # cents, row-major: cells[i * len(months) + j]
+    row_totals: array
+    col_totals: array
+    total: int
+
+    def cell(self, category: str, month: str) -> int:
+        i, j = self.categories.index(category), self.months.index(month)
+        return self.cells[i * len(self.months) + j]
+
+    def rows(self) -> Iterator[Tuple[str, array, int]]:
+        m = len(self.months)
+        for i, cat in enumerate(self.categories):
+            yield cat, self.cells[i * m:(i + 1) * m], self.row_totals[i]
+
+
+def _month_ordinal(month: str) -> int:
+    return int(month[:4]) * 12 + int(month[5:7]) - 1
+
+
+def build_pivot(entries: Iterable[Tuple[str, str, int]]) -> Pivot:
+    # entries: (category, YYYY-MM, cents)
+    cat_index: dict[str, int] = {}
+    month_index: dict[str, int] = {}
+    grid: List[array] = []
+    for cat, month, cents in entries:
+        i = cat_index.get(cat)
+        if i is None:
+            i = cat_index[cat] = len(grid)
+            grid.append(array("q"))
+        j = month_index.get(month)
+        if j is None:
+            j = month_index[month] = len(month_index)
+        row = grid[i]
+        if len(row) <= j:
+            row.frombytes(bytes(row.itemsize * (len(month_index) - len(row))))
+        row[j] += cents
+
+    if not month_index:
+        return Pivot([], [], array("q"), array("q"), array("q"), 0)
+    ordinals = {month: _month_ordinal(month) for month in month_index}
+    lo, hi = min(ordinals.values()), max(ordinals.values())
+    months = [f"{o // 12:04d}-{o % 12 + 1:02d}" for o in range(lo, hi + 1)]
+    col_of = [0] * len(month_index)
+    for month, j in month_index.items():
+        col_of[j] = ordinals[month] - lo
+
+    row_sums = [sum(row) for row in grid]
+    # Stable sort: equal totals keep first-seen order, as _ranked does.
+    order = sorted(range(len(grid)), key=lambda i: row_sums[i], reverse=True)
+    names = list(cat_index)
+    m = len(months)
+    cells = array("q", bytes(8 * m * len(grid)))
+    col_totals = array("q", bytes(8 * m))
+    for out_i, i in enumerate(order):
+        base = out_i * m
+        for j, cents in enumerate(grid[i]):
+            if cents:
+                c = col_of[j]
+                cells[base + c] += cents
+                col_totals[c] += cents
+    return Pivot(
+        categories=[names[i] for i in order],
+        months=months,
+        cells=cells,
+        row_totals=array("q", (row_sums[i] for i in order)),
+        col_totals=col_totals,
+        total=sum(row_sums),
+    )
+
+
+def _row_entries(rows: Iterable[dict]) -> Iterator[Tuple[str, str, int]]:
+    for r in rows:
+        cat = r.get("category")
+        if not cat:
+            continue
+        amt = r.cents if r.__class__ is LedgerRow else row_cents(r)
+        if amt is None:
+            continue
+        d = iso_day(r.get("date", ""))
+        if d is not None:
+            yield cat, d[:7], amt
+
+
+def pivot_from_rows(rows: Iterable[dict]) -> Pivot:
+    return build_pivot(_row_entries(rows))
+
+
+def user_pivot(tx_path: Path, user_id: str, filters: Optional[ReportFilters] = None) -> Pivot:
+    cells = cube_cells(tx_path, user_id, filters)
+    if cells is None:
+        return pivot_from_rows(load_user_rows(tx_path, user_id, filters))
+    return build_pivot((cat, month, c[0]) for (month, cat, _, _), c in cells if cat and month)
+
+
+def _fmt_cents(c: int) -> str:
+    sign = "-" if c < 0 else ""
+    c = abs(c)
+    return f"{sign}{c // 100}.{c % 100:02d}"
+
+
+# Fixed-width lines: one per category plus header, rule and totals. Column
+# widths come from the widest value, so every line has the same length.
+def render_pivot(p: Pivot, *, label_width: int = 20) -> Iterator[str]:
+    if not p.categories:
+        yield "(no data)"
+        return
+    amounts = [_fmt_cents(c) for c in p.cells]
+    totals = [_fmt_cents(c) for c in p.col_totals]
+    width = max(7, max(map(len, amounts)), max(map(len, totals)))
+    total_w = max(len("Total"), len(_fmt_cents(p.total)), max(len(_fmt_cents(c)) for c in p.row_totals))
+    label_width = min(label_width, max(len("Category"), max(map(len, p.categories))))
+
+    def line(label: str, values: Iterable[str], total: str) -> str:
+        if len(label) > label_width:
+            label = label[:label_width - 1] + "…"
+        return f"{label:<{label_width}} " + " ".join(v.rjust(width) for v in values) + f" {total.rjust(total_w)}"
+
+    header = line("Category", p.months, "Total")
+    yield header
+    yield "-" * len(header)
+    m = len(p.months)
+    for i, cat in enumerate(p.categories):
+        yield line(cat, amounts[i * m:(i + 1) * m], _fmt_cents(p.row_totals[i]))
+    yield "-" * len(header)
+    yield line("Total", totals, _fmt_cents(p.total))
+
+
+def write_pivot_csv(p: Pivot, dest: Path) -> int:
+    with dest.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["Category", *p.months, "Total"])
+        w.writerows([cat, *map(_fmt_cents, cells), _fmt_cents(total)] for cat, cells, total in p.rows())
+        w.writerow(["Total", *map(_fmt_cents, p.col_totals), _fmt_cents(p.total)])
+    return len(p.categories)
@@ -2,10 +2,9 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
-from decimal import Decimal
 from datetime import date
 
-from storage import read_json, write_json
+from storage import read_records, write_records
 from transactions import create_transaction, persist_transaction
 from reports import ReportFilters, load_user_rows
 
@@ -15,10 +14,10 @@ def _file(path: Path) -> Path:
     return path
 
 def load_recurrences(path: Path) -> List[Dict[str, Any]]:
-    return read_json(path)
+    return read_records(path)
 
 def save_recurrences(path: Path, items: List[Dict[str, Any]]) -> None:
-    write_json(path, items)
+    write_records(path, items)
 
 def add_recurrence(
     path: Path,
@@ -74,25 +73,20 @@ def post_due_recurrences(
     month: str
 ) -> Tuple[int, int]:
   
-    from transactions import parse_iso_date
+    from transactions import dedupe_index, parse_money
     y, m = int(month[:4]), int(month[5:])
     posted, present = 0, 0
 
     items = list_recurrences(recurrences_path, user_id)
 
-    # Build quick lookup of existing (date, amount, desc, category, type)
-    from storage import read_transactions_csv
-    rows = read_transactions_csv(tx_path)
-    have = set(
-        (r["date"], r["amount"], r.get("description",""), r.get("category",""), r.get("type",""))
-        for r in rows if r.get("user_id")==user_id
-    )
+    # Persistent lookup of existing (date, amount, desc, category, type)
+    have = dedupe_index(tx_path, ("date", "amount", "description", "category", "type"))
 
     for r in items:
         run_date = date(y, m, int(r["day_of_month"]))
         dstr = run_date.isoformat()
-        key = (dstr, str(Decimal(r["amount"])), r.get("description",""), r["category"], r["type"])
-        if key in have:
+        key = (dstr, str(parse_money(r["amount"])), r.get("description",""), r["category"], r["type"])
+        if have.contains(user_id, key):
             present += 1
             continue
 
@@ -107,6 +101,5 @@ def post_due_recurrences(
         )
         persist_transaction(tx_path, tx)
         posted += 1
-        have.add(key)
 
     return posted, present
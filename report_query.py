@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+# Filter expressions for the Reports menu, e.g.
+#   date>=2025-01 and category in (Food, Rent) and amount>100
+#   (type=income or description~refund) and not method=Cash
+#
+# compile_query() parses the text once into a closure over plain compares:
+# dates as ISO text (a partial date like 2025-01 matches by prefix), amounts
+# as int cents, everything else as exact strings ("~" = case-insensitive
+# substring). plan_query() pulls the AND-ed date range and category out of the
+# tree so a store with indexes can narrow the rows before the predicate runs.
+
+import operator
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from storage import amount_cents, get_store, row_cents
+from transactions import date_index, iso_day
+from logutil import get_logger
+
+LOGGER = get_logger(__name__)
+
+FIELDS = {
+    "date": "date",
+    "amount": "amount",
+    "category": "category",
+    "cat": "category",
+    "type": "type",
+    "method": "payment_method",
+    "payment_method": "payment_method",
+    "description": "description",
+    "desc": "description",
+    "id": "transaction_id",
+}
+KEYWORDS = ("and", "or", "not", "in")
+
+_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq, "==": operator.eq, "!=": operator.ne,
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+_TOKEN = re.compile(r"""\s*(?:("[^"]*"|'[^']*')|(<=|>=|!=|==|=|<|>|~|\(|\)|,)|([^\s()<>=!~,"']+))""")
+_DATE_PREFIX = re.compile(r"\d{4}(-\d{2}(-\d{2})?)?")
+
+Node = Tuple[Any, ...]
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    out, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f"Unexpected character at {pos + 1}: {text[pos:pos + 10]!r}")
+        quoted, op, word = m.groups()
+        if quoted is not None:
+            out.append(("value", quoted[1:-1]))
+        elif op is not None:
+            out.append(("op", op))
+        elif word.lower() in KEYWORDS:
+            out.append(("kw", word.lower()))
+        else:
+            out.append(("value", word))
+        pos = m.end()
+    return out
+
+
+class _Parser:
+    # or_expr := and_expr ("or" and_expr)*     and_expr := not_expr ("and" not_expr)*
+    # not_expr := "not" not_expr | "(" or_expr ")" | FIELD OP VALUE | FIELD "in" "(" VALUE, ... ")"
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self) -> Tuple[str, str] | None:
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def take(self, kind: str, text: str | None = None) -> str:
+        tok = self.peek()
+        if tok is None or tok[0] != kind or (text is not None and tok[1] != text):
+            want = text or kind
+            got = "end of input" if tok is None else repr(tok[1])
+            raise ValueError(f"Expected {want}, got {got}.")
+        self.i += 1
+        return tok[1]
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise ValueError("Empty filter expression.")
+        node = self.or_expr()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected {self.peek()[1]!r}.")
+        return node
+
+    def or_expr(self) -> Node:
+        node = self.and_expr()
+        while self.peek() == ("kw", "or"):
+            self.i += 1
+            node = ("or", node, self.and_expr())
+        return node
+
+    def and_expr(self) -> Node:
+        node = self.not_expr()
+        while self.peek() == ("kw", "and"):
+            self.i += 1
+            node = ("and", node, self.not_expr())
+        return node
+
+    def not_expr(self) -> Node:
+        tok = self.peek()
+        if tok == ("kw", "not"):
+            self.i += 1
+            return ("not", self.not_expr())
+        if tok == ("op", "("):
+            self.i += 1
+            node = self.or_expr()
+            self.take("op", ")")
+            return node
+        name = self.take("value")
+        field = FIELDS.get(name.lower())
+        if field is None:
+            raise ValueError(f"Unknown field {name!r}; use one of {sorted(set(FIELDS))}.")
+        if self.peek() == ("kw", "in"):
+            self.i += 1
+            self.take("op", "(")
+            values = [self.take("value")]
+            while self.peek() == ("op", ","):
+                self.i += 1
+                values.append(self.take("value"))
+            self.take("op", ")")
+            return ("in", field, [_check_value(field, "=", v) for v in values])
+        op = self.take("op")
+        if op not in _OPS and op != "~":
+            raise ValueError(f"Expected a comparison after {name!r}, got {op!r}.")
+        return ("cmp", field, op, _check_value(field, op, self.take("value")))
+
+
+def _check_value(field: str, op: str, value: str) -> Any:
+    if field == "date" and op != "~":
+        if not _DATE_PREFIX.fullmatch(value):
+            raise ValueError(f"Dates are YYYY, YYYY-MM or YYYY-MM-DD, got {value!r}.")
+        return value
+    if field == "amount" and op != "~":
+        cents = amount_cents(value)
+        if cents is None:
+            raise ValueError(f"Not an amount: {value!r}.")
+        return cents
+    return value
+
+
+def parse_query(text: str) -> Node:
+    return _Parser(_tokenize(text)).parse()
+
+
+def _compile(node: Node) -> Callable[[Dict[str, str]], bool]:
+    kind = node[0]
+    if kind == "and":
+        left, right = _compile(node[1]), _compile(node[2])
+        return lambda row: left(row) and right(row)
+    if kind == "or":
+        left, right = _compile(node[1]), _compile(node[2])
+        return lambda row: left(row) or right(row)
+    if kind == "not":
+        inner = _compile(node[1])
+        return lambda row: not inner(row)
+
+    field = node[1]
+    if kind == "in":
+        values = node[2]
+        if field == "date":
+            prefixes = tuple(values)
+            return lambda row: (d := iso_day(row.get("date", ""))) is not None and d.startswith(prefixes)
+        if field == "amount":
+            allowed = frozenset(values)
+            return lambda row: row_cents(row) in allowed
+        allowed = frozenset(values)
+        return lambda row: row.get(field) in allowed
+
+    op, value = node[2], node[3]
+    if op == "~":
+        needle = value.casefold()
+        return lambda row: needle in (row.get(field) or "").casefold()
+    cmp = _OPS[op]
+    if field == "date":
+        # Compare only as many characters as the value has: date<=2025-01
+        # keeps all of January, date=2025 the whole year.
+        n = len(value)
+        return lambda row: (d := iso_day(row.get("date", ""))) is not None and cmp(d[:n], value)
+    if field == "amount":
+        return lambda row: (c := row_cents(row)) is not None and cmp(c, value)
+    return lambda row: (v := row.get(field)) is not None and cmp(v, value)
+
+
+def compile_query(text: str) -> Callable[[Dict[str, str]], bool]:
+    return _compile(parse_query(text))
+
+
+# What the top-level AND chain guarantees; any row outside it cannot match.
+@dataclass
+class QueryPlan:
+    date_lo: Optional[str] = None
+    date_hi: Optional[str] = None
+    category: Optional[str] = None
+
+
+def _conjuncts(node: Node) -> List[Node]:
+    if node[0] == "and":
+        return _conjuncts(node[1]) + _conjuncts(node[2])
+    return [node]
+
+
+def plan_query(node: Node) -> QueryPlan:
+    plan = QueryPlan()
+    for c in _conjuncts(node):
+        if c[0] == "cmp" and c[1] == "date" and c[2] in ("=", "==", ">", ">=", "<", "<="):
+            # Both bounds compare by prefix, so the tightest lower bound is the
+            # largest value and the upper bound the smallest: still a superset.
+            if c[2] in ("=", "==", ">", ">="):
+                plan.date_lo = max(plan.date_lo or c[3], c[3])
+            if c[2] in ("=", "==", "<", "<="):
+                plan.date_hi = min(plan.date_hi or c[3], c[3])
+        elif c[1:2] == ("category",) and (c[0] == "cmp" and c[2] in ("=", "==") or c[0] == "in" and len(c[2]) == 1):
+            plan.category = c[3] if c[0] == "cmp" else c[2][0]
+    return plan
+
+
+def _first_day(prefix: str) -> Optional[date]:
+    try:
+        return date.fromisoformat((prefix + "-01-01")[:10])
+    except ValueError:
+        return None
+
+
+def _last_day(prefix: str) -> Optional[date]:
+    try:
+        if len(prefix) == 10:
+            return date.fromisoformat(prefix)
+        if len(prefix) == 4:
+            return date(int(prefix), 12, 31)
+        first = date.fromisoformat(prefix + "-01")
+        return (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    except ValueError:
+        return None
+
+
+# Rows of `user_id` matching the expression. Stores that can filter by
+# user/date/category (SQLite) get the plan's bounds, a date range on the CSV
+# store is a slice of the date index; the predicate then runs over that.
+def run_query(tx_path: Path, user_id: str, text: str) -> List[Dict[str, str]]:
+    tree = parse_query(text)
+    matches = _compile(tree)
+    plan = plan_query(tree)
+    store = get_store(tx_path)
+    query = getattr(store, "query", None)
+    if query is not None:
+        start = _first_day(plan.date_lo) if plan.date_lo else None
+        end = _last_day(plan.date_hi) if plan.date_hi else None
+        candidates = query(user_id, start=start, end=end, category=plan.category)
+    elif plan.date_lo or plan.date_hi:
+        candidates = date_index(tx_path).between(user_id, plan.date_lo, plan.date_hi)
+    else:
+        candidates = [r for r in store.rows() if r.get("user_id") == user_id]
+    LOGGER.debug("Query %r: %s, %d candidate row(s)", text, plan, len(candidates))
+    return [r for r in candidates if matches(r)]
@@ -1,20 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from datetime import date
-from typing import Iterable, Dict, Any, List, Optional, Tuple
+import copy
+import functools
+import inspect
+import os
+from collections import OrderedDict
+from dataclasses import astuple, dataclass, is_dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import date, timedelta
+from typing import Callable, Iterable, Dict, Any, List, Optional, Tuple
 from collections import defaultdict
 
+from bisect import bisect_left, bisect_right
 from pathlib import Path
-from storage import read_transactions_csv
-from transactions import parse_iso_date
-
-def _parse_amount_str(s: str) -> Decimal:
-    try:
-        return Decimal(s)
-    except (InvalidOperation, TypeError):
-        raise ValueError(f"Invalid amount string in csv: {s!r}")
+from storage import LedgerRow, LedgerView, get_store, get_view, ledger_version, row_cents
+from transactions import date_index, iso_day, parse_iso_date
+
+# Aggregations sum int cents (LedgerRow.cents, parsed once at load) and only
+# turn the totals back into Decimal for display.
+def cents_to_decimal(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
     
 # Container for optional CLI filters; default None values mean "no filter".
 @dataclass
@@ -26,88 +31,504 @@ class ReportFilters:
     type: Optional[str] = None
 
 
+# Bounded LRU of per-user report results, keyed by (user, report kind,
+# arguments, ledger version): re-running a report in the menu loop is a dict
+# hit until something writes to the ledger. Entries for older versions are
+# never hit again and simply age out. PFM_REPORT_CACHE=0 turns it off.
+class ReportCache:
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[Any, ...], Any] = OrderedDict()
+
+    def get_or_compute(self, key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            if self.maxsize > 0:
+                self._entries[key] = value
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        # Callers get their own list/dict; the cached one stays pristine.
+        return copy.copy(value)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+REPORT_CACHE = ReportCache(int(os.environ.get("PFM_REPORT_CACHE", "128")))
+
+
+def report_cache_stats() -> Dict[str, int]:
+    return REPORT_CACHE.stats()
+
+
+def _cache_arg(a: Any) -> Any:
+    return (type(a).__name__, astuple(a)) if is_dataclass(a) else a
+
+
+# For the user_* entry points: fn(tx_path, user_id, ...) -> list or dict.
+def cached_report(kind: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    def wrap(fn: Callable[..., Any]) -> Callable[..., Any]:
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def run(tx_path: Path, user_id: str, *args: Any, **kwargs: Any) -> Any:
+            bound = sig.bind(tx_path, user_id, *args, **kwargs)
+            bound.apply_defaults()
+            rest = tuple(_cache_arg(v) for v in list(bound.arguments.values())[2:])
+            key = (user_id, kind, rest, ledger_version(tx_path))
+            return REPORT_CACHE.get_or_compute(key, lambda: fn(tx_path, user_id, *args, **kwargs))
+        return run
+    return wrap
+
+
 # Centralized predicate so every report enforces filters consistently.
+# Built once per query; see iso_day for how dates are compared.
+def compile_filters(f: ReportFilters) -> Callable[[Dict[str, str]], bool]:
+    lo = f.start.isoformat() if f.start is not None else None
+    hi = f.end.isoformat() if f.end is not None else None
+    exact = [(k, v) for k, v in (("payment_method", f.payment_method), ("category", f.category), ("type", f.type))
+             if v is not None]
+
+    def matches(row: Dict[str, str]) -> bool:
+        if lo is not None or hi is not None:
+            d = iso_day(row.get("date", ""))
+            if d is None or (lo is not None and d < lo) or (hi is not None and d > hi):
+                return False
+        for k, v in exact:
+            if row.get(k) != v:
+                return False
+        return True
+
+    return matches
+
+
 def _row_matches_filters(row: Dict[str, str],f:ReportFilters)->bool:
-    if f.start is not None or f.end is not None:
-        try:
-            d= parse_iso_date(row.get("date", ""))
-        except ValueError:
-            return False
-        if f.start is not None and d < f.start:
-            return False
-        if f.end is not None and d > f.end:
-            return False
-    
-    if f.payment_method is not None:
-        if row.get("payment_method") != f.payment_method:
-            return False
-        
-    if f.category is not None:
-        if row.get("category") != f.category:
-            return False
-        
-    if f.type is not None:
-        if row.get("type") != f.type:
-            return False
-    return True
+    return compile_filters(f)(row)
 
 # Pull every row for the user, then optionally trim via the reusable filter helper.
 def load_user_rows(tx_path: Path, user_id: str, filters: Optional[ReportFilters] = None) -> List[Dict[str,str]]:
-    rows = read_transactions_csv(tx_path)
-    mine = [r for r in rows if r.get("user_id") == user_id]
+    store = get_store(tx_path)
+    query = getattr(store, "query", None)
+    if query is not None:
+        f = filters or ReportFilters()
+        return query(user_id, start=f.start, end=f.end, payment_method=f.payment_method,
+                     category=f.category, type=f.type)
+    if filters is not None and (filters.start is not None or filters.end is not None):
+        # Date-scoped: only the slice of the user's date index is looked at
+        # (rows come back in date order).
+        lo = filters.start.isoformat() if filters.start is not None else None
+        hi = filters.end.isoformat() if filters.end is not None else None
+        mine = date_index(tx_path).between(user_id, lo, hi)
+    else:
+        mine = [r for r in store.rows() if r.get("user_id") == user_id]
     if filters is None:
         return mine
-    return [r for r in mine if _row_matches_filters(r,filters)]
+    matches = compile_filters(filters)
+    return [r for r in mine if matches(r)]
 
-# Aggregate totals into a friendly dict for the balance summary card.
-def balance_summary(rows: Iterable[Dict[str,str]]) -> Dict[str,Decimal]:
-    inc = Decimal("0")
-    exp = Decimal("0")
-    for r in rows:
+# Materialized (user, YYYY-MM, category, type, method) -> [cents, count] over
+# the whole ledger. Kept in step on every write through the LedgerView hooks
+# and saved as transaction.csv.rollup, so month-grained reports cost
+# O(months x categories) instead of a pass over the rows. Rows whose amount
+# doesn't parse are left out, as the row-based reports skip them too; rows
+# with a bad date sit under month "" and only count when no date filter is set.
+class RollupCube(LedgerView):
+
+    SUFFIX = ".rollup"
+    FORMAT = 2
+
+    def reset(self) -> None:
+        self._users: Dict[str, Dict[Tuple[str, str, str, str], List[Any]]] = {}
+
+    @staticmethod
+    def _cell_key(row: Dict[str, str]) -> Tuple[str, str, str, str]:
         try:
-            amt = _parse_amount_str(r.get("amount","0"))
+            d = parse_iso_date(row.get("date", ""))
+            month = f"{d.year:04d}-{d.month:02d}"
         except ValueError:
+            month = ""
+        return month, row.get("category", ""), row.get("type", ""), row.get("payment_method", "")
+
+    def _bump(self, row: Dict[str, str], sign: int) -> None:
+        amt = row_cents(row)
+        if amt is None:
+            return
+        cells = self._users.setdefault(row.get("user_id", ""), {})
+        key = self._cell_key(row)
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = [0, 0]
+        cell[0] += amt * sign
+        cell[1] += sign
+        if cell[1] <= 0:
+            del cells[key]
+
+    def add(self, row: Dict[str, str]) -> None:
+        self._bump(row, 1)
+
+    def remove(self, row: Dict[str, str]) -> None:
+        self._bump(row, -1)
+
+    def cells(self, user_id: str) -> Dict[Tuple[str, str, str, str], List[Any]]:
+        return self._users.get(user_id, {})
+
+    def dump(self) -> Any:
+        return {u: [[*k, *v] for k, v in cells.items()] for u, cells in self._users.items()}
+
+    def load(self, data: Any) -> None:
+        self._users = {
+            u: {(m, c, t, pm): [total, n] for m, c, t, pm, total, n in cells}
+            for u, cells in data.items()
+        }
+
+
+def rollup_cube(tx_path: Path) -> RollupCube:
+    return get_view(tx_path, RollupCube)
+
+
+def _last_day(d: date) -> bool:
+    return (d + timedelta(days=1)).day == 1
+
+
+# The cube cells matching `filters`, or None when a filter is finer than a
+# month (day-level dates) and the caller has to scan rows instead.
+def cube_cells(tx_path: Path, user_id: str, filters: Optional[ReportFilters]) -> Optional[List[Tuple[Tuple[str, str, str, str], List[Any]]]]:
+    f = filters or ReportFilters()
+    if (f.start is not None and f.start.day != 1) or (f.end is not None and not _last_day(f.end)):
+        return None
+    lo = f"{f.start.year:04d}-{f.start.month:02d}" if f.start is not None else None
+    hi = f"{f.end.year:04d}-{f.end.month:02d}" if f.end is not None else None
+    out = []
+    for key, cell in rollup_cube(tx_path).cells(user_id).items():
+        month, cat, t, pm = key
+        if lo is not None or hi is not None:
+            if not month or (lo is not None and month < lo) or (hi is not None and month > hi):
+                continue
+        if f.payment_method is not None and pm != f.payment_method:
+            continue
+        if f.category is not None and cat != f.category:
             continue
-        t = r.get("type")
-        if t == "income":
-            inc+= amt
-        elif t == "expense":
-            exp+= amt 
+        if f.type is not None and t != f.type:
+            continue
+        out.append((key, cell))
+    return out
 
-    return {"income": inc, "expense": exp, "net":inc - exp}
+# Per-user daily flows [income, expense, rows] in date order, with running
+# (income, expense) prefix sums over them, so the balance as of a day or
+# between two days is a bisect and one subtraction. A write only truncates
+# the prefix list from the day it touched and the next query extends it
+# again: appends at the tail (the usual case) cost O(1). Rows with a bad date
+# or amount, or a type other than income/expense, are not in the series.
+class RunningBalance(LedgerView):
 
-# Roll up validated rows per category so we can rank top spend/earn buckets.
-def totals_by_category(rows: Iterable[Dict[str,str]]) -> List[Tuple[str,Decimal]]:
-        agg: dict[str, Decimal] = defaultdict(lambda: Decimal("0"))
+    SUFFIX = ".running"
+
+    def reset(self) -> None:
+        self._days: Dict[str, List[str]] = {}
+        self._flows: Dict[str, List[List[int]]] = {}
+        self._cum: Dict[str, List[Tuple[int, int]]] = {}
+
+    @staticmethod
+    def _entry(row: Dict[str, str]) -> Optional[Tuple[str, str, int]]:
+        amt = row_cents(row)
+        t = row.get("type")
+        d = iso_day(row.get("date", ""))
+        if amt is None or d is None or t not in ("income", "expense"):
+            return None
+        return d, t, amt
+
+    def rebuild(self, rows: List[Dict[str, str]]) -> None:
+        self.reset()
+        by_user: Dict[str, Dict[str, List[int]]] = {}
         for r in rows:
-            cat = r.get("category", "")
-            if not cat:
+            e = self._entry(r)
+            if e is None:
                 continue
-            try:
-                amt = _parse_amount_str(r.get("amount", "0"))
-            except ValueError:
-                continue
-            agg[cat] += amt
- 
-        return sorted(agg.items(), key=lambda kv: kv[1], reverse=True)
+            d, t, amt = e
+            flow = by_user.setdefault(r.get("user_id", ""), {}).setdefault(d, [0, 0, 0])
+            flow[0 if t == "income" else 1] += amt
+            flow[2] += 1
+        for user_id, flows in by_user.items():
+            days = sorted(flows)
+            self._days[user_id] = days
+            self._flows[user_id] = [flows[d] for d in days]
 
-# Format YYYY-MM labels so the CLI can render chronological monthly totals.
-def totals_by_month(rows: Iterable[Dict[str,  str]]) -> List[Tuple[str,Decimal]]:
-    agg: dict[str, Decimal] = defaultdict(lambda: Decimal("0"))
+    def _bump(self, row: Dict[str, str], sign: int) -> None:
+        e = self._entry(row)
+        if e is None:
+            return
+        d, t, amt = e
+        user_id = row.get("user_id", "")
+        days = self._days.setdefault(user_id, [])
+        flows = self._flows.setdefault(user_id, [])
+        i = bisect_left(days, d)
+        if i == len(days) or days[i] != d:
+            days.insert(i, d)
+            flows.insert(i, [0, 0, 0])
+        flow = flows[i]
+        flow[0 if t == "income" else 1] += amt * sign
+        flow[2] += sign
+        if flow[2] <= 0:
+            del days[i], flows[i]
+        cum = self._cum.get(user_id)
+        if cum is not None and len(cum) > i:
+            del cum[i:]
+
+    def add(self, row: Dict[str, str]) -> None:
+        self._bump(row, 1)
+
+    def remove(self, row: Dict[str, str]) -> None:
+        self._bump(row, -1)
+
+    def _prefix(self, user_id: str) -> List[Tuple[int, int]]:
+        flows = self._flows.get(user_id, [])
+        cum = self._cum.setdefault(user_id, [])
+        if len(cum) < len(flows):
+            inc, exp = cum[-1] if cum else (0, 0)
+            for f in flows[len(cum):]:
+                inc += f[0]
+                exp += f[1]
+                cum.append((inc, exp))
+        return cum
+
+    # Cumulative (income, expense) cents over the user's first `n` days.
+    def _through(self, user_id: str, n: int) -> Tuple[int, int]:
+        return self._prefix(user_id)[n - 1] if n > 0 else (0, 0)
+
+    # Through `day` (ISO, inclusive).
+    def as_of(self, user_id: str, day: str) -> Tuple[int, int]:
+        return self._through(user_id, bisect_right(self._days.get(user_id, []), day))
+
+    # From `lo` to `hi` (ISO, both inclusive).
+    def between(self, user_id: str, lo: str, hi: str) -> Tuple[int, int]:
+        days = self._days.get(user_id, [])
+        inc_hi, exp_hi = self._through(user_id, bisect_right(days, hi))
+        inc_lo, exp_lo = self._through(user_id, bisect_left(days, lo))
+        return inc_hi - inc_lo, exp_hi - exp_lo
+
+    # (day, cumulative income, cumulative expense) for every day with activity.
+    def series(self, user_id: str) -> List[Tuple[str, int, int]]:
+        return [(d, inc, exp) for d, (inc, exp) in zip(self._days.get(user_id, []), self._prefix(user_id))]
+
+    def dump(self) -> Any:
+        return {u: [[d, *f] for d, f in zip(days, self._flows[u])] for u, days in self._days.items()}
+
+    def load(self, data: Any) -> None:
+        self.reset()
+        for u, entries in data.items():
+            self._days[u] = [e[0] for e in entries]
+            self._flows[u] = [list(e[1:]) for e in entries]
+
+
+def running_balance(tx_path: Path) -> RunningBalance:
+    return get_view(tx_path, RunningBalance)
+
+
+# Income, expense and net of everything dated on or before `day`.
+def balance_as_of(tx_path: Path, user_id: str, day: date) -> Dict[str, Decimal]:
+    return _summary(*running_balance(tx_path).as_of(user_id, day.isoformat()))
+
+
+def balance_between(tx_path: Path, user_id: str, start: date, end: date) -> Dict[str, Decimal]:
+    if start > end:
+        raise ValueError("Start date must not be after end date.")
+    return _summary(*running_balance(tx_path).between(user_id, start.isoformat(), end.isoformat()))
+
+
+# Net balance at the end of each month with activity, carried over from
+# everything before `start`; the "running balance over time" report.
+@cached_report("running_balance")
+def running_balance_by_month(tx_path: Path, user_id: str, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[str, Decimal]]:
+    lo = start.isoformat() if start is not None else ""
+    hi = end.isoformat() if end is not None else "\U0010ffff"
+    months: Dict[str, int] = {}
+    for d, inc, exp in running_balance(tx_path).series(user_id):
+        if lo <= d <= hi:
+            months[d[:7]] = inc - exp
+    return [(m, cents_to_decimal(v)) for m, v in months.items()]
+
+REPORT_KINDS = ("balance", "by_category", "by_month", "chart")
+
+# Any mix of REPORT_KINDS from one scan over `rows`, so a dashboard costs one
+# pass instead of one per report. Results have the same shape as the single
+# functions below; "chart" is category totals keeping the blank category,
+# as the ASCII chart always has.
+def compute_report_bundle(rows: Iterable[Dict[str, str]], specs: Iterable[str]) -> Dict[str, Any]:
+    return finish_report_bundle(partial_report_bundle(rows, report_kinds(specs)))
+
+
+def report_kinds(specs: Iterable[str]) -> frozenset[str]:
+    want = frozenset(specs)
+    unknown = want.difference(REPORT_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown report kind(s): {sorted(unknown)}; use {REPORT_KINDS}.")
+    return want
+
+
+# The bundle as raw cent sums ({"balance": [inc, exp], "by_category": {...},
+# ...}); partials of consecutive row ranges merge in order into the partial
+# of the whole, first-seen key order included.
+def partial_report_bundle(rows: Iterable[Dict[str, str]], want: frozenset[str]) -> Dict[str, Any]:
+    do_balance, do_cat = "balance" in want, "by_category" in want
+    do_month, do_chart = "by_month" in want, "chart" in want
+
+    inc = exp = 0
+    cats: dict[str, int] = defaultdict(int)
+    chart: dict[str, int] = defaultdict(int)
+    months: dict[str, int] = defaultdict(int)
     for r in rows:
-        try:
-            d = parse_iso_date(r.get("date", ""))
-            month_label = f"{d.year:04d}-{d.month:02d}"
-        except ValueError:
+        amt = r.cents if r.__class__ is LedgerRow else row_cents(r)
+        if amt is None:
             continue
-        try:
-            amt = _parse_amount_str(r.get("amount", "0"))
-        except ValueError:
-            continue
-        agg[month_label] += amt
+        if do_balance:
+            t = r.get("type")
+            if t == "income":
+                inc += amt
+            elif t == "expense":
+                exp += amt
+        if do_cat or do_chart:
+            cat = r.get("category", "")
+            if do_chart:
+                chart[cat or ""] += amt
+            if do_cat and cat:
+                cats[cat] += amt
+        if do_month:
+            d = iso_day(r.get("date", ""))
+            if d is not None:
+                months[d[:7]] += amt
 
-    
-    return sorted(agg.items(), key=lambda kv: kv[0])
+    out: Dict[str, Any] = {}
+    if do_balance:
+        out["balance"] = [inc, exp]
+    if do_cat:
+        out["by_category"] = dict(cats)
+    if do_month:
+        out["by_month"] = dict(months)
+    if do_chart:
+        out["chart"] = dict(chart)
+    return out
+
+
+def merge_report_bundles(parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for part in parts:
+        for kind, value in part.items():
+            if kind == "balance":
+                acc = out.setdefault(kind, [0, 0])
+                acc[0] += value[0]
+                acc[1] += value[1]
+            else:
+                acc = out.setdefault(kind, {})
+                for k, v in value.items():
+                    acc[k] = acc.get(k, 0) + v
+    return out
+
+
+def finish_report_bundle(partial: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    if "balance" in partial:
+        out["balance"] = _summary(*partial["balance"])
+    if "by_category" in partial:
+        out["by_category"] = _ranked(partial["by_category"])
+    if "by_month" in partial:
+        out["by_month"] = [(k, cents_to_decimal(v)) for k, v in sorted(partial["by_month"].items())]
+    if "chart" in partial:
+        out["chart"] = _ranked(partial["chart"])
+    return out
+
+
+def _summary(inc: int, exp: int) -> Dict[str, Decimal]:
+    return {"income": cents_to_decimal(inc), "expense": cents_to_decimal(exp), "net": cents_to_decimal(inc - exp)}
+
+
+def _ranked(agg: Dict[str, int]) -> List[Tuple[str, Decimal]]:
+    return [(k, cents_to_decimal(v)) for k, v in sorted(agg.items(), key=lambda kv: kv[1], reverse=True)]
+
+# Aggregate totals into a friendly dict for the balance summary card.
+def balance_summary(rows: Iterable[Dict[str,str]]) -> Dict[str,Decimal]:
+    return compute_report_bundle(rows, ("balance",))["balance"]
+
+# Roll up validated rows per category so we can rank top spend/earn buckets.
+def totals_by_category(rows: Iterable[Dict[str,str]]) -> List[Tuple[str,Decimal]]:
+    return compute_report_bundle(rows, ("by_category",))["by_category"]
+
+# Format YYYY-MM labels so the CLI can render chronological monthly totals.
+def totals_by_month(rows: Iterable[Dict[str,  str]]) -> List[Tuple[str,Decimal]]:
+    return compute_report_bundle(rows, ("by_month",))["by_month"]
+
+# Last resort for the user_* reports: one pass over the user's filtered rows,
+# or a parallel scan of the CSV when PFM_SCAN_WORKERS asks for one.
+def _scanned(tx_path: Path, user_id: str, filters: Optional[ReportFilters], kind: str) -> Any:
+    from parallel_scan import scan_report_bundle, scan_workers
+    if scan_workers() > 1:
+        return scan_report_bundle(tx_path, user_id, [kind], filters)[kind]
+    return compute_report_bundle(load_user_rows(tx_path, user_id, filters), [kind])[kind]
+
+
+# The NumPy engine, or None without it. Imported on first use so starting the
+# CLI doesn't load NumPy.
+def _columnar() -> Any:
+    import columnar
+    return columnar if columnar.enabled() else None
+
+
+# Per-user report entry points: answered from the rollup cube when the filters
+# are month-grained, otherwise by the NumPy engine when it is available, and
+# by scanning rows as the last resort.
+@cached_report("balance_summary")
+def user_balance_summary(tx_path: Path, user_id: str, filters: Optional[ReportFilters] = None) -> Dict[str, Decimal]:
+    cells = cube_cells(tx_path, user_id, filters)
+    if cells is None and (engine := _columnar()) is not None:
+        frame = engine.frame_for(tx_path, user_id)
+        return _summary(*frame.balance_cents(frame.mask(filters)))
+    if cells is None:
+        return _scanned(tx_path, user_id, filters, "balance")
+    inc = sum(c[0] for (_, _, t, _), c in cells if t == "income")
+    exp = sum(c[0] for (_, _, t, _), c in cells if t == "expense")
+    return _summary(inc, exp)
+
+
+@cached_report("totals_by_category")
+def user_totals_by_category(tx_path: Path, user_id: str, filters: Optional[ReportFilters] = None) -> List[Tuple[str, Decimal]]:
+    cells = cube_cells(tx_path, user_id, filters)
+    if cells is None and (engine := _columnar()) is not None:
+        frame = engine.frame_for(tx_path, user_id)
+        return _ranked(frame.category_cents(frame.mask(filters)))
+    if cells is None:
+        return _scanned(tx_path, user_id, filters, "by_category")
+    agg: dict[str, int] = defaultdict(int)
+    for (_, cat, _, _), c in cells:
+        if cat:
+            agg[cat] += c[0]
+    return _ranked(agg)
+
+
+@cached_report("totals_by_month")
+def user_totals_by_month(tx_path: Path, user_id: str, filters: Optional[ReportFilters] = None) -> List[Tuple[str, Decimal]]:
+    cells = cube_cells(tx_path, user_id, filters)
+    if cells is None and (engine := _columnar()) is not None:
+        frame = engine.frame_for(tx_path, user_id)
+        return [(k, cents_to_decimal(v)) for k, v in sorted(frame.month_cents(frame.mask(filters)).items())]
+    if cells is None:
+        return _scanned(tx_path, user_id, filters, "by_month")
+    agg: dict[str, int] = defaultdict(int)
+    for (month, _, _, _), c in cells:
+        if month:
+            agg[month] += c[0]
+    return [(k, cents_to_decimal(v)) for k, v in sorted(agg.items(), key=lambda kv: kv[0])]
 
 # Shared money formatter so every report prints totals consistently.
 def fmt_money(d: Decimal, currency: str, *, places: int = 2) -> str:
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+# Distribution reports over a user's filtered rows: median / p90 / p99
+# transaction size per category and the largest expenses of each month, in
+# one pass with bounded memory. Quantiles come from a log-bucketed sketch
+# (each bucket spans a fixed ratio, so any quantile is within
+# RELATIVE_ACCURACY of a true order statistic and a category needs at most a
+# few hundred buckets whatever its row count); top-K is a size-K min-heap
+# per month. Nothing is sorted per category.
+
+import heapq
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from storage import LedgerRow, row_cents
+from transactions import iso_day
+from reports import ReportFilters, cents_to_decimal, load_user_rows
+
+RELATIVE_ACCURACY = 0.01
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    # Positive cents go to bucket ceil(log_gamma(v)); zero and negative
+    # amounts share one bucket below them. min/max are exact.
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1.")
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inv_log_gamma = 1 / math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.non_positive = 0
+        self.count = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def add(self, cents: int) -> None:
+        self.count += 1
+        if self.min is None or cents < self.min:
+            self.min = cents
+        if self.max is None or cents > self.max:
+            self.max = cents
+        if cents <= 0:
+            self.non_positive += 1
+            return
+        i = math.ceil(math.log(cents) * self._inv_log_gamma)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy.")
+        for i, n in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.non_positive += other.non_positive
+        self.count += other.count
+        for v in (other.min, other.max):
+            if v is not None:
+                self.min = v if self.min is None else min(self.min, v)
+                self.max = v if self.max is None else max(self.max, v)
+
+    # Estimated value (cents) at quantile q in [0, 1]; None when empty.
+    def quantile(self, q: float) -> Optional[int]:
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1.")
+        if self.count == 0:
+            return None
+        # Nearest rank: the smallest value with at least q of the data at or
+        # below it (so p99 of two amounts is the larger one).
+        rank = max(0, math.ceil(q * self.count) - 1)
+        if rank < self.non_positive:
+            return self.min
+        seen = self.non_positive
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen > rank:
+                # Midpoint (in ratio terms) of (gamma^(i-1), gamma^i].
+                est = round(2 * self.gamma ** i / (self.gamma + 1))
+                return max(self.min, min(self.max, est))
+        return self.max
+
+
+class TopK:
+    # The k largest (cents, row) pairs seen; ties keep the earlier row.
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[int, int, Dict[str, str]]] = []
+        self._seq = 0
+
+    def push(self, cents: int, row: Dict[str, str]) -> None:
+        self._seq += 1
+        item = (cents, -self._seq, row)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def items(self) -> List[Tuple[int, Dict[str, str]]]:
+        return [(c, r) for c, _, r in sorted(self._heap, key=lambda t: t[:2], reverse=True)]
+
+
+# One pass over `rows`: a sketch per category (blank category as "") and the
+# top `k` expenses per YYYY-MM. Returns
+#   {"quantiles": [(category, count, [Decimal per q]), ...] by count desc,
+#    "top_expenses": [(month, [(Decimal, row), ...]), ...] by month}
+def spend_analytics(
+    rows: Iterable[Dict[str, str]],
+    *,
+    k: int = 5,
+    quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+    relative_accuracy: float = RELATIVE_ACCURACY,
+) -> Dict[str, Any]:
+    if k <= 0:
+        raise ValueError("k must be positive.")
+    sketches: Dict[str, QuantileSketch] = {}
+    tops: Dict[str, TopK] = {}
+    for r in rows:
+        amt = r.cents if r.__class__ is LedgerRow else row_cents(r)
+        if amt is None:
+            continue
+        cat = r.get("category") or ""
+        sketch = sketches.get(cat)
+        if sketch is None:
+            sketch = sketches[cat] = QuantileSketch(relative_accuracy)
+        sketch.add(amt)
+        if r.get("type") == "expense":
+            d = iso_day(r.get("date", ""))
+            if d is not None:
+                top = tops.get(d[:7])
+                if top is None:
+                    top = tops[d[:7]] = TopK(k)
+                top.push(amt, r)
+
+    per_cat = [
+        (cat, s.count, [cents_to_decimal(s.quantile(q)) for q in quantiles])
+        for cat, s in sketches.items()
+    ]
+    per_cat.sort(key=lambda t: t[1], reverse=True)
+    return {
+        "quantiles": per_cat,
+        "top_expenses": [
+            (month, [(cents_to_decimal(c), r) for c, r in tops[month].items()]) for month in sorted(tops)
+        ],
+    }
+
+
+def user_spend_analytics(
+    tx_path: Path, user_id: str, filters: Optional[ReportFilters] = None, *, k: int = 5,
+    quantiles: Tuple[float, ...] = DEFAULT_QUANTILES,
+) -> Dict[str, Any]:
+    return spend_analytics(load_user_rows(tx_path, user_id, filters), k=k, quantiles=quantiles)
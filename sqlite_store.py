@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Iterable, Dict, Any, List, Optional, Tuple
+
+from storage import CSV_FIELDNAMES, TransactionStore, ledger_row, _normalize_row, _notify_views, _stat_of, read_json
+from logutil import get_logger
+
+LOGGER = get_logger(__name__)
+
+DB_FILENAME = "pfm.sqlite3"
+
+# Record kinds kept in SQLite instead of <kind>.json when the backend is enabled.
+RECORD_KINDS = ("users", "budgets", "recurrences")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', '0');
+
+CREATE TABLE IF NOT EXISTS transactions (
+    rowid          INTEGER PRIMARY KEY,
+    transaction_id TEXT NOT NULL,
+    user_id        TEXT NOT NULL,
+    type           TEXT NOT NULL,
+    amount         TEXT NOT NULL,
+    category       TEXT NOT NULL,
+    date           TEXT NOT NULL,
+    description    TEXT NOT NULL,
+    payment_method TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_tx_id            ON transactions (transaction_id);
+CREATE INDEX IF NOT EXISTS ix_tx_user_date     ON transactions (user_id, date);
+CREATE INDEX IF NOT EXISTS ix_tx_user_category ON transactions (user_id, category);
+
+CREATE TABLE IF NOT EXISTS users (
+    pos     INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL UNIQUE,
+    name    TEXT NOT NULL,
+    body    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS budgets (
+    pos      INTEGER PRIMARY KEY,
+    user_id  TEXT NOT NULL,
+    month    TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount   TEXT NOT NULL,
+    UNIQUE (user_id, month, category)
+);
+CREATE TABLE IF NOT EXISTS recurrences (
+    pos     INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    body    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_rec_user ON recurrences (user_id);
+"""
+
+_COLS = ", ".join(CSV_FIELDNAMES)
+_CONNECTIONS: Dict[Path, sqlite3.Connection] = {}
+
+
+def db_path_for(path: Path) -> Path:
+    # All data files in one directory share a single database.
+    return Path(path).parent / DB_FILENAME
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    key = Path(db_path).resolve()
+    conn = _CONNECTIONS.get(key)
+    if conn is None:
+        key.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(key)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        _CONNECTIONS[key] = conn
+    return conn
+
+
+def close_all() -> None:
+    for conn in _CONNECTIONS.values():
+        conn.close()
+    _CONNECTIONS.clear()
+
+
+# `data_version` counts writes to the transactions table only: it is the
+# ledger's version for views and the report cache, which users, budgets and
+# recurrences don't feed.
+def _bump_version(conn: sqlite3.Connection) -> None:
+    conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'data_version'")
+
+
+def _data_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0])
+
+
+class SqliteTransactionStore:
+    # Same surface as storage.TransactionStore, backed by an indexed table.
+    # `query` lets callers push user/date/category/method/type filters into SQL.
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.db_path = db_path_for(path)
+        self.version = 0
+        self.writes = 0
+        self._seen: int | None = None
+        self._cache: List[Dict[str, str]] | None = None
+        self.views: Dict[Any, Any] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return connect(self.db_path)
+
+    def refresh(self) -> None:
+        v = _data_version(self.conn)
+        if v != self._seen:
+            self._seen = v
+            self._cache = None
+            self.version += 1
+
+    def _state(self, version: int) -> List[Any]:
+        st = _stat_of(self.db_path)
+        return [["sqlite", st[0] if st else 0, version]]
+
+    def ledger_state(self) -> List[Any]:
+        return self._state(_data_version(self.conn))
+
+    def loaded_position(self) -> Tuple[List[Any], None]:
+        self.refresh()
+        return self._state(self._seen or 0), None
+
+    def _commit(self, *, added=(), changed=(), removed=()) -> None:
+        # Still inside the write transaction, so nobody else can bump the
+        # version between reading it here and committing.
+        v = _data_version(self.conn)
+        _bump_version(self.conn)
+        self.conn.commit()
+        self.writes += 1
+        _notify_views(self, self._state(v), self._state(v + 1), added=added, changed=changed, removed=removed)
+        self.refresh()
+
+    def rows(self) -> List[Dict[str, str]]:
+        self.refresh()
+        if self._cache is None:
+            cur = self.conn.execute(f"SELECT {_COLS} FROM transactions ORDER BY rowid")
+            self._cache = [ledger_row(zip(r.keys(), r)) for r in cur]
+        return list(self._cache)
+
+    def get(self, tid: str) -> Dict[str, str] | None:
+        cur = self.conn.execute(
+            f"SELECT {_COLS} FROM transactions WHERE transaction_id = ? ORDER BY rowid LIMIT 1", (tid,)
+        )
+        r = cur.fetchone()
+        return dict(r) if r is not None else None
+
+    def query(
+        self,
+        user_id: str,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        payment_method: Optional[str] = None,
+        category: Optional[str] = None,
+        type: Optional[str] = None,
+    ) -> List[Dict[str, str]]:
+        # ISO dates order lexically, so range filters can use the (user_id, date) index.
+        where, args = ["user_id = ?"], [user_id]
+        if start is not None:
+            where.append("date >= ?"); args.append(start.isoformat())
+        if end is not None:
+            where.append("date <= ?"); args.append(end.isoformat())
+        if payment_method is not None:
+            where.append("payment_method = ?"); args.append(payment_method)
+        if category is not None:
+            where.append("category = ?"); args.append(category)
+        if type is not None:
+            where.append("type = ?"); args.append(type)
+        sql = f"SELECT {_COLS} FROM transactions WHERE {' AND '.join(where)} ORDER BY rowid"
+        return [ledger_row(zip(r.keys(), r)) for r in self.conn.execute(sql, args)]
+
+    def _insert(self, rows: List[Dict[str, str]]) -> None:
+        self.conn.executemany(
+            f"INSERT INTO transactions ({_COLS}) VALUES ({', '.join('?' * len(CSV_FIELDNAMES))})",
+            [tuple(r[k] for k in CSV_FIELDNAMES) for r in rows],
+        )
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+        new_rows = [_normalize_row(r) for r in rows]
+        if new_rows:
+            self._insert(new_rows)
+            self._commit(added=new_rows)
+        return new_rows
+
+    def rewrite(self, rows: Iterable[Dict[str, Any]]) -> None:
+        new_rows = [_normalize_row(r) for r in rows]
+        self.conn.execute("DELETE FROM transactions")
+        self._insert(new_rows)
+        # No delta to hand views: they see the version jump and rebuild.
+        _bump_version(self.conn)
+        self.conn.commit()
+        self.writes += 1
+        self.refresh()
+
+    def update(self, tid: str, row: Dict[str, Any]) -> bool:
+        return self.update_many({tid: row}) == 1
+
+    def update_many(self, changes: Dict[str, Dict[str, Any]]) -> int:
+        sets = ", ".join(f"{k} = ?" for k in CSV_FIELDNAMES)
+        sql = (f"UPDATE transactions SET {sets} WHERE rowid = "
+               "(SELECT rowid FROM transactions WHERE transaction_id = ? ORDER BY rowid LIMIT 1)")
+        pairs = []
+        for tid, row in changes.items():
+            old = self.get(tid)
+            if old is None:
+                continue
+            r = _normalize_row(row)
+            self.conn.execute(sql, [r[k] for k in CSV_FIELDNAMES] + [tid])
+            pairs.append((old, r))
+        if pairs:
+            self._commit(changed=pairs)
+        return len(pairs)
+
+    def allocate_ids(self, count: int = 1) -> range:
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        conn = self.conn
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes
+        # can't both read the same counter value.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'next_tid'").fetchone()
+            if row is not None:
+                start = int(row[0])
+            else:
+                top = conn.execute(
+                    "SELECT MAX(CAST(SUBSTR(transaction_id, 2) AS INTEGER)) FROM transactions "
+                    "WHERE transaction_id GLOB 'T[0-9]*'"
+                ).fetchone()[0]
+                start = (top or 0) + 1
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_tid', ?)", (str(start + count),))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return range(start, start + count)
+
+    def compact(self) -> None:
+        # Nothing to fold: SQLite updates rows in place.
+        return None
+
+    def delete(self, tid: str) -> bool:
+        removed = [dict(r) for r in self.conn.execute(
+            f"SELECT {_COLS} FROM transactions WHERE transaction_id = ?", (tid,))]
+        if not removed:
+            return False
+        self.conn.execute("DELETE FROM transactions WHERE transaction_id = ?", (tid,))
+        self._commit(removed=removed)
+        return True
+
+
+# ---------- users / budgets / recurrences ----------
+
+def read_records(db_path: Path, kind: str) -> List[Dict[str, Any]]:
+    conn = connect(db_path)
+    if kind == "budgets":
+        cur = conn.execute("SELECT user_id, month, category, amount FROM budgets ORDER BY pos")
+        return [dict(r) for r in cur]
+    cur = conn.execute(f"SELECT body FROM {kind} ORDER BY pos")
+    return [json.loads(r["body"]) for r in cur]
+
+
+def write_records(db_path: Path, kind: str, items: List[Dict[str, Any]]) -> None:
+    conn = connect(db_path)
+    conn.execute(f"DELETE FROM {kind}")
+    if kind == "users":
+        conn.executemany(
+            "INSERT INTO users (user_id, name, body) VALUES (?, ?, ?)",
+            [(u["user_id"], u.get("name", ""), json.dumps(u, ensure_ascii=False)) for u in items],
+        )
+    elif kind == "budgets":
+        conn.executemany(
+            "INSERT INTO budgets (user_id, month, category, amount) VALUES (?, ?, ?, ?)",
+            [(b["user_id"], b["month"], b["category"], str(b["amount"])) for b in items],
+        )
+    else:
+        conn.executemany(
+            "INSERT INTO recurrences (user_id, body) VALUES (?, ?)",
+            [(r["user_id"], json.dumps(r, ensure_ascii=False)) for r in items],
+        )
+    conn.commit()
+
+
+def upsert_budgets(db_path: Path, items: List[Dict[str, Any]]) -> None:
+    conn = connect(db_path)
+    conn.executemany(
+        "INSERT INTO budgets (user_id, month, category, amount) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (user_id, month, category) DO UPDATE SET amount = excluded.amount",
+        [(b["user_id"], b["month"], b["category"], str(b["amount"])) for b in items],
+    )
+    conn.commit()
+
+
+def select_budgets(db_path: Path, user_id: str, month: Optional[str] = None) -> List[Dict[str, Any]]:
+    sql = "SELECT user_id, month, category, amount FROM budgets WHERE user_id = ?"
+    args: List[Any] = [user_id]
+    if month:
+        sql += " AND month = ?"
+        args.append(month)
+    return [dict(r) for r in connect(db_path).execute(sql + " ORDER BY pos", args)]
+
+
+# ---------- one-shot migration ----------
+
+def migrate_from_files(data_dir: Path, *, tx_filename: str = "transaction.csv", overwrite: bool = False) -> Dict[str, int]:
+    db_path = data_dir / DB_FILENAME
+    conn = connect(db_path)
+    done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+    if done is not None and not overwrite:
+        raise ValueError(f"{db_path.name} was already migrated from {done[0]}.")
+
+    counts: Dict[str, int] = {}
+    tx_path = data_dir / tx_filename
+    SqliteTransactionStore(tx_path).rewrite(TransactionStore(tx_path).rows())
+    counts["transactions"] = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    for kind in RECORD_KINDS:
+        items = read_json(data_dir / f"{kind}.json")
+        write_records(db_path, kind, items)
+        counts[kind] = len(items)
+
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (str(data_dir),)
+    )
+    conn.commit()
+    LOGGER.info("Migrated %s into %s: %s", data_dir, db_path, counts)
+    return counts
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / "data"
+    for name, n in migrate_from_files(target).items():
+        print(f"{name}: {n}")
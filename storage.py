@@ -1,9 +1,21 @@
 from __future__ import annotations
+import atexit
+import base64
+import hashlib
+import io
+import os
 import json
 import csv
-from decimal import Decimal
+import struct
+import time
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from pathlib import Path
-from typing import Iterable, Dict, Any, List
+from typing import Iterable, Iterator, Dict, Any, List, Tuple
+
+from logutil import get_logger
+
+LOGGER = get_logger(__name__)
 
 def read_json(path:Path) -> list[dict]:
 
@@ -14,9 +26,15 @@ def read_json(path:Path) -> list[dict]:
         return []
     return json.loads(text)
 
-def write_json(path:Path , data:list[dict]) -> None:
+# compact=True drops the indentation and spaces (budgets.json, which can
+# hold a row per user, month and category).
+def write_json(path:Path , data:list[dict], *, compact: bool = False) -> None:
     tmp = path.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2),encoding="utf-8")
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+    tmp.write_text(text, encoding="utf-8")
     tmp.replace(path)
 
 CSV_FIELDNAMES = [
@@ -49,4 +67,1246 @@ def read_transactions_csv(path: Path) -> list[dict]:
         return []
     with path.open(mode="r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f)
-        return list(reader)
\ No newline at end of file
+        return list(reader)
+
+
+# Amount string -> int cents. Ledger amounts are written with two decimals, so
+# this is exact for them; finer values round half-up. None = not a number.
+def amount_cents(s: str) -> int | None:
+    try:
+        if s[-3:-2] == "." and "_" not in s:
+            return int(s.replace(".", "", 1))
+    except (TypeError, ValueError):
+        pass
+    try:
+        d = Decimal(s)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return int((d * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)) if d.is_finite() else None
+
+
+# A ledger row as stores hand it out: a plain field -> str dict that also
+# carries its amount in int cents, parsed once when the row is loaded, so
+# aggregations never re-parse amount strings. Rows are shared read-only.
+# Build them with ledger_row() (the CSV parser sets `cents` inline).
+class LedgerRow(dict):
+    __slots__ = ("cents",)
+
+
+def ledger_row(fields: Any) -> LedgerRow:
+    row = LedgerRow(fields)
+    row.cents = amount_cents(row.get("amount", "0"))
+    return row
+
+
+def row_cents(row: Dict[str, str]) -> int | None:
+    if row.__class__ is LedgerRow:
+        return row.cents  # type: ignore[attr-defined]
+    return amount_cents(row.get("amount", "0"))
+
+
+def _normalize_row(row: Dict[str, Any]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for k in CSV_FIELDNAMES:
+        if k not in row:
+            raise ValueError(f"Missing required field: {k}")
+        v = row[k]
+        if v is None:
+            v = ""
+        elif not isinstance(v, str):
+            # Convert Decimal/date -> string; leave strings as-is
+            v = str(v)
+        out[k] = v
+    return ledger_row(out)
+
+
+# Length of the prefix of `data` that ends on a complete CSV record. A newline
+# only terminates a record when it sits outside quotes, i.e. after an even
+# number of '"' characters (escaped quotes come in pairs).
+def _complete_prefix(data: bytes) -> int:
+    end = len(data)
+    while True:
+        nl = data.rfind(b"\n", 0, end)
+        if nl < 0:
+            return 0
+        if data.count(b'"', 0, nl) % 2 == 0:
+            return nl + 1
+        end = nl
+
+
+# Same rows csv.DictReader would give (short records padded with None, extras
+# under the None key), built straight into LedgerRows. A "category_id" column
+# is keyed "category" (still holding the ID); the header is returned as is.
+def _parse_csv_bytes(data: bytes, fieldnames: List[str] | None = None) -> Tuple[List[str], List[Dict[str, str]]]:
+    reader = csv.reader(io.StringIO(data.decode("utf-8"), newline=""))
+    if fieldnames is None:
+        fieldnames = next(reader, None) or list(CSV_FIELDNAMES)
+    keys = _logical_fields(fieldnames)
+    n = len(keys)
+    ai = keys.index("amount") if "amount" in keys else n
+    rows: List[Dict[str, str]] = []
+    for rec in reader:
+        if not rec:
+            continue
+        row = LedgerRow(zip(keys, rec))
+        row.cents = amount_cents(rec[ai]) if ai < len(rec) else None
+        if len(rec) < n:
+            row.update(dict.fromkeys(keys[len(rec):]))
+        elif len(rec) > n:
+            row[None] = rec[n:]
+        rows.append(row)
+    return list(fieldnames), rows
+
+
+def _encode_csv_rows(rows: Iterable[Dict[str, str]]) -> List[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    out = []
+    for row in rows:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow([row[k] for k in CSV_FIELDNAMES])
+        out.append(buf.getvalue().encode("utf-8"))
+    return out
+
+
+# Walk `data` record by record, yielding (offset, raw_bytes) with newlines
+# inside quoted fields kept in their record.
+def _iter_raw_records(data: bytes, base: int = 0) -> Iterator[Tuple[int, bytes]]:
+    pos, start, n = 0, 0, len(data)
+    while pos < n:
+        nl = data.find(b"\n", pos)
+        if nl < 0:
+            return
+        pos = nl + 1
+        if data.count(b'"', start, pos) % 2:
+            continue
+        yield base + start, data[start:pos]
+        start = pos
+
+
+def _raw_tid(raw: bytes) -> str:
+    if not raw.startswith(b'"'):
+        return raw.split(b",", 1)[0].decode("utf-8", "replace").strip()
+    first = next(csv.reader([raw.decode("utf-8", "replace")]), [""])
+    return first[0] if first else ""
+
+
+# Split a CSV into about `parts` byte ranges that start and end on record
+# boundaries (a newline outside quotes), for parallel scans. Returns the
+# header's field names and (start, end, lines_before_start) per range.
+def split_csv_ranges(path: Path, parts: int) -> Tuple[List[str], List[Tuple[int, int, int]]]:
+    size = os.path.getsize(path)
+    block = 1 << 20
+    with path.open("rb") as f:
+        head = b""
+        header_end = 0
+        while True:
+            more = f.read(65536)
+            head += more
+            first = next(_iter_raw_records(head), None)
+            if first is not None:
+                header_end = len(first[1])
+                break
+            if not more:
+                header_end = len(head)
+                break
+        if not header_end:
+            return list(CSV_FIELDNAMES), []
+        fieldnames = next(csv.reader([head[:header_end].decode("utf-8")]), [])
+        lines = head.count(b"\n", 0, header_end)
+
+        bounds = [(header_end, lines)]
+        pos, quotes = header_end, 0
+        for i in range(1, max(1, parts)):
+            target = header_end + (size - header_end) * i // parts
+            if target <= pos:
+                continue
+            f.seek(pos)
+            while pos < target:
+                data = f.read(min(block, target - pos))
+                quotes += data.count(b'"')
+                lines += data.count(b"\n")
+                pos += len(data)
+            # Walk forward to the next newline that ends a record.
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                quotes += line.count(b'"')
+                lines += line.count(b"\n")
+                pos += len(line)
+                if line.endswith(b"\n") and quotes % 2 == 0:
+                    break
+            if pos >= size:
+                break
+            bounds.append((pos, lines))
+
+    ranges = []
+    for i, (start, before) in enumerate(bounds):
+        end = bounds[i + 1][0] if i + 1 < len(bounds) else size
+        if end > start:
+            ranges.append((start, end, before))
+    return fieldnames, ranges
+
+
+def _tid_number(tid: str) -> int | None:
+    if tid.startswith("T") and tid[1:].isdigit() and int(tid[1:]) > 0:
+        return int(tid[1:])
+    return None
+
+
+class OffsetIndex:
+    # "<csv>.idx": transaction_id -> (byte offset, length) of its CSV record.
+    # IDs are dense "T<number>", so the slot for T000123 sits at a fixed
+    # position and a lookup is one seek here plus one seek in the CSV. The
+    # header records which CSV (inode) and how many of its bytes are covered;
+    # anything appended past that is indexed on the next lookup.
+
+    MAGIC = b"PFMIDX1\0"
+    HEADER = struct.Struct("<8sQQ")
+    SLOT = struct.Struct("<QI")
+    # Highest slot number (~50 MB of index). IDs above it, e.g. from an import
+    # or a hand-edited CSV, are left to the full load like non-"T" IDs.
+    MAX_SLOT = 1 << 22
+
+    def __init__(self, csv_path: Path):
+        self.csv_path = csv_path
+        self.path = csv_path.with_name(csv_path.name + ".idx")
+
+    def _slot(self, tid: str) -> int | None:
+        num = _tid_number(tid)
+        return num if num is not None and num <= self.MAX_SLOT else None
+
+    def _header(self) -> Tuple[int, int] | None:
+        try:
+            with self.path.open("rb") as f:
+                raw = f.read(self.HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(raw) != self.HEADER.size:
+            return None
+        magic, covered, ino = self.HEADER.unpack(raw)
+        return (covered, ino) if magic == self.MAGIC else None
+
+    def _write(self, entries: Iterable[Tuple[str, int, int]], covered: int, ino: int, *, fresh: bool) -> None:
+        mode = "wb" if fresh or not self.path.exists() else "r+b"
+        with self.path.open(mode) as f:
+            for tid, off, length in entries:
+                num = self._slot(tid)
+                if num is not None:
+                    f.seek(self.HEADER.size + (num - 1) * self.SLOT.size)
+                    f.write(self.SLOT.pack(off, length))
+            f.seek(0)
+            f.write(self.HEADER.pack(self.MAGIC, covered, ino))
+
+    def record_append(self, entries: List[Tuple[str, int, int]], old_size: int, new_size: int) -> None:
+        # Only extend an index that already covers exactly the pre-append file.
+        st = _stat_of(self.csv_path)
+        hdr = self._header()
+        if st is not None and hdr == (old_size, st[0]):
+            self._write(entries, new_size, st[0], fresh=False)
+
+    def sync(self) -> None:
+        st = _stat_of(self.csv_path)
+        if st is None:
+            self.path.unlink(missing_ok=True)
+            return
+        hdr = self._header()
+        start = hdr[0] if hdr is not None and hdr[1] == st[0] and hdr[0] <= st[1] else 0
+        if hdr is not None and start == st[1]:
+            return
+        with self.csv_path.open("rb") as f:
+            f.seek(start)
+            data = f.read(st[1] - start)
+        entries, covered = [], start
+        for off, raw in _iter_raw_records(data, start):
+            covered = off + len(raw)
+            if off:  # offset 0 is the header line
+                entries.append((_raw_tid(raw), off, len(raw)))
+        self._write(entries, covered, st[0], fresh=(start == 0))
+
+    def lookup(self, tid: str) -> Tuple[int, int] | None:
+        num = self._slot(tid)
+        if num is None:
+            return None
+        try:
+            with self.path.open("rb") as f:
+                f.seek(self.HEADER.size + (num - 1) * self.SLOT.size)
+                raw = f.read(self.SLOT.size)
+        except FileNotFoundError:
+            return None
+        if len(raw) != self.SLOT.size:
+            return None
+        off, length = self.SLOT.unpack(raw)
+        return (off, length) if length else None
+
+    # Seek + parse a single record; None if the slot is empty or points at
+    # bytes that no longer hold this transaction (the caller then rebuilds).
+    def read_row(self, tid: str, fieldnames: List[str]) -> Dict[str, str] | None:
+        loc = self.lookup(tid)
+        if loc is None:
+            return None
+        with self.csv_path.open("rb") as f:
+            f.seek(loc[0])
+            raw = f.read(loc[1])
+        if not raw.endswith(b"\n") or _raw_tid(raw) != tid:
+            return None
+        _, rows = _parse_csv_bytes(raw, fieldnames)
+        return rows[0] if rows else None
+
+
+def _stat_of(path: Path) -> Tuple[int, int, int] | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+# Files kept next to a ledger CSV ("transaction.csv.journal", ...). They only
+# describe that exact CSV, so they are dropped when the CSV is replaced wholesale.
+LEDGER_SIDECARS = (".journal", ".seq", ".idx")
+
+LOCK_STALE_SECONDS = 30.0
+_HELD_LOCKS: Dict[Path, int] = {}
+
+
+# Whether a lock file was left by a writer that is gone: the pid in it no
+# longer runs. Where that can't be asked (Windows, where os.kill would end the
+# process, or a lock whose pid isn't written yet) it is stale once older than
+# LOCK_STALE_SECONDS.
+def _lock_is_stale(lock: Path) -> bool:
+    age = time.time() - lock.stat().st_mtime
+    try:
+        pid = int(lock.read_text(encoding="ascii"))
+    except (OSError, ValueError):
+        pid = 0
+    if pid > 0 and os.name != "nt":
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+    return age > LOCK_STALE_SECONDS
+
+
+# Remove a lock _lock_is_stale() flagged. Two waiters may flag the same dead
+# lock, and by the time the slower one acts the faster may already hold a new
+# one, so the lock is first renamed away atomically (only one waiter gets a
+# given file) and checked again under its new name; a live lock taken by
+# mistake is linked back, which fails rather than replacing a newer lock.
+def _break_stale_lock(lock: Path) -> None:
+    taken = lock.with_name(f"{lock.name}.{os.getpid()}-{time.monotonic_ns()}.stale")
+    try:
+        os.rename(lock, taken)
+    except FileNotFoundError:
+        return
+    if _lock_is_stale(taken):
+        LOGGER.warning("Broke stale ledger lock %s", lock)
+    else:
+        try:
+            os.link(taken, lock)
+        except OSError:
+            LOGGER.error("Could not put back ledger lock %s", lock)
+    taken.unlink(missing_ok=True)
+
+
+# Cross-process mutex for one ledger: an O_EXCL "<file>.lock" holding the
+# owner's pid works on every platform. Re-entrant within a process; a lock
+# whose owner died (see _lock_is_stale) is broken.
+@contextmanager
+def file_lock(path: Path, *, timeout: float = 10.0) -> Iterator[None]:
+    lock = path.with_name(path.name + ".lock")
+    if _HELD_LOCKS.get(lock):
+        _HELD_LOCKS[lock] += 1
+        try:
+            yield
+        finally:
+            _HELD_LOCKS[lock] -= 1
+        return
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if _lock_is_stale(lock):
+                    _break_stale_lock(lock)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Ledger is locked by another process: {lock}")
+            time.sleep(0.01)
+    try:
+        os.write(fd, str(os.getpid()).encode("ascii"))
+        os.close(fd)
+        _HELD_LOCKS[lock] = 1
+        yield
+    finally:
+        _HELD_LOCKS.pop(lock, None)
+        lock.unlink(missing_ok=True)
+
+
+def journal_path_for(path: Path) -> Path:
+    return path.with_name(path.name + ".journal")
+
+
+def reset_ledger_sidecars(path: Path) -> None:
+    for suffix in LEDGER_SIDECARS:
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+# Dictionary-encoded categories. A ledger whose header has "category_id" where
+# "category" would be stores a short per-user ID ("c12") in that column, and
+# the names live in "<csv>.categories". Stores decode the IDs while parsing,
+# so the rows they hand out still carry "category" names. Renaming or merging
+# only edits the table (after a merge several IDs share one name). Unlike the
+# sidecars above the table is data: it goes into backups and is never reset.
+CATEGORY_TABLE_SUFFIX = ".categories"
+
+
+def category_table_path(path: Path) -> Path:
+    return path.with_name(path.name + CATEGORY_TABLE_SUFFIX)
+
+
+def _logical_fields(fieldnames: List[str]) -> List[str]:
+    return ["category" if f == "category_id" else f for f in fieldnames]
+
+
+# Replace category IDs by names in place; returns the rows whose ID is not in
+# `users` ({user_id: {id: name}}), left untouched.
+def decode_categories(rows: Iterable[Dict[str, str]], users: Dict[str, Dict[str, str]]) -> List[Dict[str, str]]:
+    missing = []
+    for r in rows:
+        cid = r.get("category")
+        if cid:
+            name = users.get(r.get("user_id"), {}).get(cid)
+            if name is None:
+                missing.append(r)
+            else:
+                r["category"] = name
+    return missing
+
+
+class CategoryTable:
+    # {"format": 1, "rev": n, "next": n, "users": {user_id: {id: name}}}.
+    # `rev` moves only when an existing ID changes name; adding IDs doesn't.
+
+    FORMAT = 1
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.rev = 0
+        self.next = 1
+        self.users: Dict[str, Dict[str, str]] = {}
+        self._ids: Dict[str, Dict[str, str]] = {}
+        self._stat: Tuple[int, int, int] | None = None
+
+    def sync(self) -> None:
+        st = _stat_of(self.path)
+        if st == self._stat:
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8")) if st else {}
+        self.rev = data.get("rev", 0)
+        self.next = data.get("next", 1)
+        self.users = {u: dict(names) for u, names in data.get("users", {}).items()}
+        self._reindex()
+        self._stat = st
+
+    def _reindex(self) -> None:
+        # name -> ID for encoding; merged names keep their oldest ID.
+        self._ids = {}
+        for user_id, names in self.users.items():
+            ids = self._ids[user_id] = {}
+            for cid, name in names.items():
+                ids.setdefault(name, cid)
+
+    def save(self) -> None:
+        data = {"format": self.FORMAT, "rev": self.rev, "next": self.next, "users": self.users}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(self.path)
+        self._stat = _stat_of(self.path)
+
+    # ID for a name, allocating one if needed; (id, created). Blank stays blank.
+    def id_for(self, user_id: str, name: str) -> Tuple[str, bool]:
+        if not name:
+            return "", False
+        ids = self._ids.setdefault(user_id, {})
+        cid = ids.get(name)
+        if cid is not None:
+            return cid, False
+        cid = ids[name] = f"c{self.next}"
+        self.next += 1
+        self.users.setdefault(user_id, {})[cid] = name
+        return cid, True
+
+    # Point every ID of the user named like a key of `mapping` at its value.
+    def rename(self, user_id: str, mapping: Dict[str, str]) -> bool:
+        names = self.users.get(user_id, {})
+        hit = [cid for cid, name in names.items() if name in mapping]
+        for cid in hit:
+            names[cid] = mapping[names[cid]]
+        if hit:
+            self.rev += 1
+            self._reindex()
+        return bool(hit)
+
+
+class TransactionStore:
+    # Process-wide cache of one transaction CSV. Rows are parsed once and kept
+    # keyed by transaction_id; `refresh()` stats the file and either does
+    # nothing, parses only the bytes appended since the last look, or reloads.
+    # Rows handed out are shared with the cache: treat them as read-only.
+    #
+    # Edits and deletes never rewrite the CSV. They are appended to a JSON-lines
+    # journal next to it ({"op": "put", "tid", "row"} / {"op": "del", "tid"}),
+    # merged over the base rows on load, and folded back into the CSV by
+    # `compact()` once the journal passes JOURNAL_COMPACT_BYTES. Every journal
+    # record states the final value, so replaying one twice is harmless.
+
+    GUARD_BYTES = 64
+    JOURNAL_COMPACT_BYTES = 256 * 1024
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.journal_path = journal_path_for(path)
+        self.version = 0
+        # Writes made through this object; see ledger_version().
+        self.writes = 0
+        self._rows: Dict[str, Dict[str, str]] = {}
+        self._dups: Dict[str, List[str]] = {}
+        self._fieldnames: List[str] = list(CSV_FIELDNAMES)
+        self._stat: Tuple[int, int, int] | None = None
+        self._offset = 0
+        self._guard = b""
+        self._jstat: Tuple[int, int, int] | None = None
+        self._joffset = 0
+        self.seq_path = path.with_name(path.name + ".seq")
+        self.max_id_number = 0
+        self.index = OffsetIndex(path)
+        self._journaled: set[str] = set()
+        self._loaded = False
+        self.views: Dict[Any, "LedgerView"] = {}
+        self.categories = CategoryTable(category_table_path(path))
+        # Table revision the decoded rows reflect; a newer one in the journal
+        # means another process renamed categories.
+        self._names_rev = 0
+        self._names_stale = False
+
+    def _key_for(self, row: Dict[str, str]) -> str:
+        tid = row.get("transaction_id") or ""
+        if tid and tid not in self._rows:
+            return tid
+        # Legacy files may hold duplicate or blank IDs; keep every row anyway.
+        n = len(self._rows)
+        while f"{tid}#{n}" in self._rows:
+            n += 1
+        key = f"{tid}#{n}"
+        self._dups.setdefault(tid, []).append(key)
+        return key
+
+    def _add_rows(self, rows: Iterable[Dict[str, str]]) -> None:
+        for r in rows:
+            self._rows[self._key_for(r)] = r
+            tid = r.get("transaction_id") or ""
+            if tid[1:].isdigit() and tid.startswith("T"):
+                self.max_id_number = max(self.max_id_number, int(tid[1:]))
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        if rec.get("op") == "names":
+            self._names_stale |= rec.get("rev", 0) > self._names_rev
+            return
+        tid = rec.get("tid", "")
+        self._journaled.add(tid)
+        if rec.get("op") == "put":
+            if tid in self._rows:
+                self._rows[tid] = self._from_journal(rec["row"])
+        elif rec.get("op") == "del":
+            self._rows.pop(tid, None)
+            for key in self._dups.pop(tid, []):
+                self._rows.pop(key, None)
+
+    def _mark_clean(self, offset: int) -> None:
+        self._stat = _stat_of(self.path)
+        self._offset = offset
+        if offset:
+            with self.path.open("rb") as f:
+                start = max(0, offset - self.GUARD_BYTES)
+                f.seek(start)
+                self._guard = f.read(offset - start)
+        else:
+            self._guard = b""
+
+    def _reload(self) -> None:
+        data = self.path.read_bytes() if self.path.exists() else b""
+        self._rows, self._dups = {}, {}
+        self._journaled = set()
+        self.max_id_number = 0
+        self.categories.sync()
+        self._names_rev, self._names_stale = self.categories.rev, False
+        if data:
+            self._fieldnames, rows = _parse_csv_bytes(data)
+            self._add_rows(self._decoded(rows, self._fieldnames))
+        self._mark_clean(len(data))
+        if data and _complete_prefix(data) != len(data):
+            # Unterminated last record: appends can't be tailed safely from here.
+            self._offset = 0
+
+    def _read_tail(self) -> bool:
+        # Only valid if the bytes just before our offset are still the ones we
+        # parsed; a truncate-and-rewrite of the same inode fails this check.
+        # In-place patches further back are covered by their journal records,
+        # which refresh() replays after the tail.
+        start = self._offset - len(self._guard)
+        with self.path.open("rb") as f:
+            f.seek(start)
+            data = f.read()
+        if not data.startswith(self._guard):
+            return False
+        tail = data[len(self._guard):]
+        end = _complete_prefix(tail)
+        if end:
+            _, rows = _parse_csv_bytes(tail[:end], self._fieldnames)
+            self._add_rows(self._decoded(rows, self._fieldnames))
+        self._mark_clean(self._offset + end)
+        return True
+
+    def _read_journal(self, start: int, jst: Tuple[int, int, int] | None) -> None:
+        if jst is None:
+            self._jstat, self._joffset = None, 0
+            return
+        with self.journal_path.open("rb") as f:
+            f.seek(start)
+            data = f.read(jst[1] - start)
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._jstat, self._joffset = jst, start + end
+
+    def refresh(self) -> None:
+        # Stat the journal first: any record in it was written after the CSV
+        # row it touches, so reading the CSV afterwards always sees that row.
+        self._loaded = True
+        jst = _stat_of(self.journal_path)
+        st = _stat_of(self.path)
+        if st == self._stat and jst == self._jstat:
+            return
+        journal_ok = jst == self._jstat or jst is not None and (
+            self._jstat is None and self._joffset == 0
+            or self._jstat is not None and jst[0] == self._jstat[0] and jst[1] >= self._joffset
+        )
+        if journal_ok and st == self._stat:
+            pass
+        elif (journal_ok and st is not None and self._stat is not None and self._offset
+              and st[0] == self._stat[0] and st[1] > self._offset and self._read_tail()):
+            pass
+        else:
+            self._reload()
+            self._joffset = 0
+        self._read_journal(self._joffset, jst)
+        if self._names_stale:
+            self._reload()
+            self._read_journal(0, jst)
+            self._names_stale = False
+        self.version += 1
+
+    def rows(self) -> List[Dict[str, str]]:
+        self.refresh()
+        return list(self._rows.values())
+
+    # On-disk state as [csv stat, journal stat]; LedgerViews record the state
+    # they reflect in these terms.
+    def ledger_state(self) -> List[Any]:
+        st, jst = _stat_of(self.path), _stat_of(self.journal_path)
+        return [list(st) if st else None, list(jst) if jst else None]
+
+    # The state the cached rows reflect, plus the guard bytes needed to tail
+    # from it (None when tailing from there is not safe).
+    def loaded_position(self) -> Tuple[List[Any], bytes | None]:
+        self.refresh()
+        if self._stat is None:
+            csv_part = None
+        elif self._offset == 0 and self._rows:
+            return [list(self._stat), list(self._jstat) if self._jstat else None], None
+        else:
+            csv_part = [self._stat[0], self._offset, self._stat[2]]
+        jpart = [self._jstat[0], self._joffset, self._jstat[2]] if self._jstat else None
+        return [csv_part, jpart], self._guard
+
+    def guard_at(self, offset: int) -> bytes:
+        with self.path.open("rb") as f:
+            start = max(0, offset - self.GUARD_BYTES)
+            f.seek(start)
+            return f.read(offset - start)
+
+    # Rows appended after `offset`, if the bytes before it still match `guard`.
+    # Returns (rows, end of the last complete record, guard at that end).
+    def read_appended(self, offset: int, guard: bytes) -> Tuple[List[Dict[str, str]], int, bytes] | None:
+        with self.path.open("rb") as f:
+            header = f.readline()
+            f.seek(offset - len(guard))
+            data = f.read()
+        if not data.startswith(guard) or not header:
+            return None
+        tail = data[len(guard):]
+        end = _complete_prefix(tail)
+        fieldnames = next(csv.reader([header.decode("utf-8")]), CSV_FIELDNAMES)
+        rows = self._decoded(_parse_csv_bytes(tail[:end], fieldnames)[1], fieldnames) if end else []
+        return rows, offset + end, (guard + tail[:end])[-self.GUARD_BYTES:]
+
+    def get(self, tid: str) -> Dict[str, str] | None:
+        if not self._loaded and self.path.exists():
+            # Nothing parsed yet: answer from the offset index + journal
+            # instead of loading the whole ledger for one row.
+            found, row = self._get_cold(tid)
+            if found:
+                return row
+        self.refresh()
+        return self._rows.get(tid)
+
+    def _journal_lookup(self, tid: str) -> Dict[str, Any] | None:
+        last = None
+        if self.journal_path.exists():
+            data = self.journal_path.read_bytes()
+            # A line still being appended by another process is not a record yet.
+            for line in data[: data.rfind(b"\n") + 1].splitlines():
+                if line.strip():
+                    rec = json.loads(line)
+                    if rec.get("tid") == tid:
+                        last = rec
+        return last
+
+    def _get_cold(self, tid: str) -> Tuple[bool, Dict[str, str] | None]:
+        rec = self._journal_lookup(tid)
+        if rec is not None:
+            return True, self._from_journal(rec["row"]) if rec.get("op") == "put" else None
+        fieldnames = self._file_fields()
+        row = self.index.read_row(tid, fieldnames)
+        if row is None:
+            self.index.sync()
+            row = self.index.read_row(tid, fieldnames)
+        if row is not None:
+            return True, self._decoded([row], fieldnames)[0]
+        # Not in the index: legacy IDs, IDs above MAX_SLOT, or records the
+        # index split differently from csv (a bare '"' in an unquoted field).
+        # Only the full load can tell whether the row exists.
+        return False, None
+
+    def _file_fields(self) -> List[str]:
+        try:
+            with self.path.open("r", encoding="utf-8", newline="") as f:
+                return next(csv.reader(f), None) or list(CSV_FIELDNAMES)
+        except FileNotFoundError:
+            return list(CSV_FIELDNAMES)
+
+    # Whether the ledger stores category IDs (see CategoryTable).
+    def uses_category_ids(self) -> bool:
+        if self._loaded:
+            self.refresh()
+            return "category_id" in self._fieldnames
+        return "category_id" in self._file_fields()
+
+    # Parsed rows of a file with header `fieldnames`, IDs replaced by names.
+    def _decoded(self, rows: List[Dict[str, str]], fieldnames: List[str]) -> List[Dict[str, str]]:
+        if "category_id" in fieldnames:
+            missing = decode_categories(rows, self.categories.users)
+            if missing:
+                # IDs another process added since the table was read.
+                self.categories.sync()
+                decode_categories(missing, self.categories.users)
+        return rows
+
+    def _from_journal(self, row: Dict[str, str]) -> LedgerRow:
+        if "category_id" not in row:
+            return ledger_row(row)
+        out = ledger_row({("category" if k == "category_id" else k): v for k, v in row.items()})
+        return self._decoded([out], ["category_id"])[0]
+
+    # On-disk form of normalized rows of a category-ID ledger: the category
+    # field holds the ID. Callers hold the lock; new IDs are saved before any
+    # row refers to them.
+    def _encode(self, rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        table = self.categories
+        table.sync()
+        out, created = [], False
+        for r in rows:
+            cid, new = table.id_for(r["user_id"], r["category"])
+            created |= new
+            out.append({**r, "category": cid})
+        if created:
+            table.save()
+        return out
+
+    def _journal_row(self, row: Dict[str, str]) -> Dict[str, str]:
+        if "category_id" not in self._fieldnames:
+            return row
+        enc = self._encode([row])[0]
+        return {("category_id" if k == "category" else k): v for k, v in enc.items()}
+
+    def append(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+        new_rows = [_normalize_row(r) for r in rows]
+        if new_rows:
+            with file_lock(self.path):
+                # A store nobody has read from yet stays unloaded: appending
+                # does not need the existing rows.
+                if self._loaded:
+                    self.refresh()
+                pre = self.ledger_state()
+                with self.path.open("ab") as f:
+                    old_size = f.seek(0, os.SEEK_END)
+                    if old_size == 0:
+                        f.write(",".join(CSV_FIELDNAMES).encode("utf-8") + b"\r\n")
+                        ids = False
+                    else:
+                        ids = "category_id" in (self._fieldnames if self._loaded else self._file_fields())
+                    encoded = _encode_csv_rows(self._encode(new_rows) if ids else new_rows)
+                    entries, pos = [], f.tell()
+                    for r, raw in zip(new_rows, encoded):
+                        entries.append((r["transaction_id"], pos, len(raw)))
+                        pos += len(raw)
+                    f.write(b"".join(encoded))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.index.record_append(entries, old_size, pos)
+                if self._loaded and self._offset == old_size and (old_size or not self._rows):
+                    # We hold the lock and were current before writing, so the
+                    # new tail is exactly these rows: no need to parse it back.
+                    self._add_rows(new_rows)
+                    self._mark_clean(pos)
+                    self.version += 1
+                elif self._loaded:
+                    self.refresh()
+                self.writes += 1
+                _notify_views(self, pre, self.ledger_state(), added=new_rows)
+        return new_rows
+
+    def _read_seq(self) -> int | None:
+        try:
+            n = json.loads(self.seq_path.read_text(encoding="utf-8"))["next"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return n if isinstance(n, int) and n > 0 else None
+
+    # Hand out `count` consecutive ID numbers from the "<csv>.seq" counter.
+    # The ledger is only scanned when the counter is missing or unreadable.
+    def allocate_ids(self, count: int = 1) -> range:
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        with file_lock(self.path):
+            start = self._read_seq()
+            if start is None:
+                self.refresh()
+                start = self.max_id_number + 1
+                LOGGER.info("Rebuilt ID counter for %s from a ledger scan", self.path.name)
+            elif self._loaded:
+                # Cheap guard against a counter left behind by a replaced ledger.
+                start = max(start, self.max_id_number + 1)
+            tmp = self.seq_path.with_name(self.seq_path.name + ".tmp")
+            tmp.write_text(json.dumps({"next": start + count}), encoding="utf-8")
+            tmp.replace(self.seq_path)
+        return range(start, start + count)
+
+    def _write_journal(self, records: List[Dict[str, Any]]) -> None:
+        payload = "".join(json.dumps(r, ensure_ascii=True) + "\n" for r in records)
+        with file_lock(self.path):
+            with self.journal_path.open("ab") as f:
+                f.write(payload.encode("ascii"))
+                f.flush()
+                os.fsync(f.fileno())
+            self.refresh()
+
+    def _maybe_compact(self) -> None:
+        if self._jstat is not None and self._jstat[1] >= self.JOURNAL_COMPACT_BYTES:
+            self.compact()
+
+    def update(self, tid: str, row: Dict[str, Any]) -> bool:
+        return self.update_many({tid: row}) == 1
+
+    def update_many(self, changes: Dict[str, Dict[str, Any]]) -> int:
+        with file_lock(self.path):
+            self.refresh()
+            self.index.sync()
+            pre = self.ledger_state()
+            records, pairs, patches = [], [], []
+            for tid, row in changes.items():
+                if tid not in self._rows:
+                    continue
+                old, new = self._rows[tid], _normalize_row(row)
+                pairs.append((old, new))
+                patch = self._in_place_patch(tid, new)
+                if patch is not None:
+                    patches.append(patch)
+                records.append({"op": "put", "tid": tid, "row": self._journal_row(new)})
+            # Journal first, patch second. The journal stat is what tells readers
+            # that bytes before the CSV's end may have moved, so it has to change
+            # before any of them can see a patched byte (also across a crash).
+            if records:
+                self._write_journal(records)
+            if patches:
+                with self.path.open("r+b") as f:
+                    for offset, encoded in patches:
+                        f.seek(offset)
+                        f.write(encoded)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._mark_clean(self._offset)
+                self.version += 1
+            if pairs:
+                self.writes += 1
+            _notify_views(self, pre, self.ledger_state(), changed=pairs)
+            self._maybe_compact()
+        return len(records)
+
+    # (offset, bytes) overwriting a record inside the CSV when its new encoding
+    # has exactly the old length (e.g. 12.50 -> 13.75), so the file itself stays
+    # current for raw readers (offset index, parallel scan); None otherwise.
+    # The edit is journaled either way. Rows with journal history or duplicate
+    # IDs are never patched.
+    def _in_place_patch(self, tid: str, new: Dict[str, str]) -> Tuple[int, bytes] | None:
+        if tid in self._journaled or tid in self._dups:
+            return None
+        loc = self.index.lookup(tid)
+        if loc is None or loc[0] + loc[1] > self._offset:
+            return None
+        if _logical_fields(self._fieldnames) != CSV_FIELDNAMES:
+            return None
+        with self.path.open("rb") as f:
+            f.seek(loc[0])
+            raw = f.read(loc[1])
+        if _raw_tid(raw) != tid or self._decoded(_parse_csv_bytes(raw, self._fieldnames)[1],
+                                                 self._fieldnames) != [self._rows[tid]]:
+            return None
+        on_disk = self._encode([new]) if "category_id" in self._fieldnames else [new]
+        eol = b"\r\n" if raw.endswith(b"\r\n") else b"\n"
+        encoded = _encode_csv_rows(on_disk)[0].rstrip(b"\r\n") + eol
+        if len(encoded) != len(raw):
+            return None
+        return loc[0], encoded
+
+    def delete(self, tid: str) -> bool:
+        with file_lock(self.path):
+            self.refresh()
+            keys = ([tid] if tid in self._rows else []) + self._dups.get(tid, [])
+            if not keys:
+                return False
+            pre = self.ledger_state()
+            removed = [self._rows[k] for k in keys]
+            self._write_journal([{"op": "del", "tid": tid}])
+            self.writes += 1
+            _notify_views(self, pre, self.ledger_state(), removed=removed)
+            self._maybe_compact()
+        return True
+
+    def compact(self) -> None:
+        # Fold the journal into the base file: atomic replace first, then drop
+        # the journal. A crash in between just replays already-applied records.
+        with file_lock(self.path):
+            self.refresh()
+            if self._jstat is None:
+                return
+            pre = self.ledger_state()
+            self.rewrite(list(self._rows.values()))
+            # Same rows, new files: views only need to move their position.
+            _notify_views(self, pre, self.ledger_state())
+
+    # category_ids=None keeps the file's current category column.
+    def rewrite(self, rows: Iterable[Dict[str, Any]], *, category_ids: bool | None = None) -> None:
+        new_rows = [_normalize_row(r) for r in rows]
+        tmp = self.path.with_suffix(".tmp")
+        with file_lock(self.path):
+            if category_ids is None:
+                category_ids = "category_id" in self._file_fields()
+            header = [("category_id" if k == "category" else k) for k in CSV_FIELDNAMES] if category_ids else CSV_FIELDNAMES
+            on_disk = self._encode(new_rows) if category_ids else new_rows
+            with tmp.open("w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(header)
+                w.writerows([r[k] for k in CSV_FIELDNAMES] for r in on_disk)
+                f.flush()
+                os.fsync(f.fileno())
+            tmp.replace(self.path)
+            self.journal_path.unlink(missing_ok=True)
+            self.index.path.unlink(missing_ok=True)
+        self._fieldnames = list(header)
+        self._rows, self._dups = {}, {}
+        self._journaled = set()
+        self.max_id_number = 0
+        self._add_rows(new_rows)
+        self._mark_clean(self._stat_size())
+        self._loaded = True
+        self._jstat, self._joffset = None, 0
+        self.version += 1
+        self.writes += 1
+
+    # One-off conversion of a plain ledger to category IDs: a single rewrite.
+    # Returns the number of rows converted (0 if it already uses IDs).
+    def encode_categories(self) -> int:
+        with file_lock(self.path):
+            self.refresh()
+            if "category_id" in self._fieldnames:
+                return 0
+            pre = self.ledger_state()
+            rows = list(self._rows.values())
+            self.rewrite(rows, category_ids=True)
+            self._names_rev = self.categories.rev
+            _notify_views(self, pre, self.ledger_state())
+        LOGGER.info("Converted %s to category IDs (%d row(s))", self.path.name, len(rows))
+        return len(rows)
+
+    # Rename categories of one user ({old name: new name}; several old names
+    # with one new name is a merge). Only the name table is rewritten, plus a
+    # one-line journal marker so other processes and views see the change;
+    # the rows cached here are relabelled in memory. Returns rows relabelled.
+    def rename_categories(self, user_id: str, mapping: Dict[str, str]) -> int:
+        with file_lock(self.path):
+            self.refresh()
+            if "category_id" not in self._fieldnames:
+                raise ValueError(f"{self.path.name} does not use category IDs.")
+            table = self.categories
+            table.sync()
+            if not table.rename(user_id, mapping):
+                return 0
+            table.save()
+            pre = self.ledger_state()
+            pairs = []
+            for key, r in self._rows.items():
+                if r.get("user_id") == user_id and r.get("category") in mapping:
+                    new = ledger_row({**r, "category": mapping[r["category"]]})
+                    self._rows[key] = new
+                    pairs.append((r, new))
+            self._names_rev = table.rev
+            self._write_journal([{"op": "names", "rev": table.rev}])
+            self.writes += 1
+            _notify_views(self, pre, self.ledger_state(), changed=pairs)
+            self._maybe_compact()
+        return len(pairs)
+
+    def _stat_size(self) -> int:
+        st = _stat_of(self.path)
+        return st[1] if st else 0
+
+
+def _notify_views(store: Any, pre: List[Any], post: List[Any], *, added: Iterable[Dict[str, str]] = (),
+                  changed: Iterable[Tuple[Dict[str, str], Dict[str, str]]] = (),
+                  removed: Iterable[Dict[str, str]] = ()) -> None:
+    if not store.views:
+        return
+    added, changed, removed = list(added), list(changed), list(removed)
+    for view in store.views.values():
+        view.on_write(pre, post, added, changed, removed)
+
+
+class LedgerView:
+    # Derived data kept in step with one ledger (dedupe keys, rollups, ...).
+    # Subclasses implement reset/add/remove over single rows and dump/load for
+    # the snapshot; this class decides when to apply a write, tail the file,
+    # or rebuild from scratch. A view remembers the ledger state it reflects
+    # (`position`, see TransactionStore.ledger_state) and is persisted next to
+    # the ledger as <csv><SUFFIX>[-<params digest>], so a fresh process only
+    # reads what was appended since the snapshot.
+
+    SUFFIX = ".view"
+    FORMAT = 1
+    BINARY = False
+
+    def __init__(self, store: Any, params: Tuple[Any, ...] = ()):
+        self.store = store
+        self.params = tuple(params)
+        name = store.path.name + self.SUFFIX
+        if self.params:
+            digest = hashlib.blake2b(json.dumps(list(self.params)).encode("utf-8"), digest_size=4).hexdigest()
+            name += f"-{digest}"
+        self.snapshot_path = store.path.with_name(name)
+        self.position: List[Any] | None = None
+        self._guard: bytes | None = None
+        self.dirty = False
+        self.reset()
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+    def add(self, row: Dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def remove(self, row: Dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def dump(self) -> Any:
+        raise NotImplementedError
+
+    def load(self, data: Any) -> None:
+        raise NotImplementedError
+
+    def on_write(self, pre: List[Any], post: List[Any], added: List[Dict[str, str]],
+                 changed: List[Tuple[Dict[str, str], Dict[str, str]]], removed: List[Dict[str, str]]) -> None:
+        # Only a view that reflected exactly the pre-write state can apply the
+        # delta; anything else catches up on its next sync().
+        if self.position != pre:
+            return
+        for row in removed:
+            self.remove(row)
+        for old, new in changed:
+            self.remove(old)
+            self.add(new)
+        for row in added:
+            self.add(row)
+        self.position = post
+        csv_part = post[0] if post else None
+        self._guard = (self.store.guard_at(csv_part[1]) if csv_part and csv_part[0] != "sqlite"
+                       and hasattr(self.store, "guard_at") else None)
+        self.dirty = True
+
+    def sync(self) -> None:
+        state = self.store.ledger_state()
+        if self.position == state or self._catch_up(state):
+            return
+        self.rebuild(self.store.rows())
+        self.position, self._guard = self.store.loaded_position()
+        self.dirty = True
+
+    # From-scratch build; views with a cheaper bulk path override this.
+    def rebuild(self, rows: List[Dict[str, str]]) -> None:
+        self.reset()
+        for row in rows:
+            self.add(row)
+
+    # Tail appended rows instead of rebuilding. Only safe while the bytes before
+    # the old end are unchanged: the store rewrites a CSV by replacing it (new
+    # inode) and journals every in-place patch before writing it, so the same
+    # inode plus the same journal stat is the "nothing but appends" check; the
+    # guard bytes only catch outside editors.
+    def _catch_up(self, state: List[Any]) -> bool:
+        pos = self.position
+        if (pos is None or self._guard is None or len(pos) != 2 or pos[1] != state[1]
+                or pos[0] is None or state[0] is None
+                or pos[0][0] != state[0][0] or state[0][1] <= pos[0][1]):
+            return False
+        got = self.store.read_appended(pos[0][1], self._guard)
+        if got is None:
+            return False
+        rows, covered, guard = got
+        for row in rows:
+            self.add(row)
+        self.position = [[state[0][0], covered, state[0][2]], state[1]]
+        self._guard = guard
+        self.dirty = True
+        return True
+
+    def load_snapshot(self) -> None:
+        try:
+            with self.snapshot_path.open("rb") as f:
+                header = json.loads(f.readline())
+                if header.get("format") != self.FORMAT or header.get("params") != list(self.params):
+                    return
+                payload = f.read()
+            self.load(payload if self.BINARY else json.loads(payload))
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            self.reset()
+            return
+        guard = header.get("guard")
+        self.position = header.get("position")
+        self._guard = base64.b64decode(guard) if guard is not None else None
+
+    def save_snapshot(self) -> None:
+        header = {
+            "format": self.FORMAT,
+            "params": list(self.params),
+            "position": self.position,
+            "guard": base64.b64encode(self._guard).decode("ascii") if self._guard is not None else None,
+        }
+        payload = self.dump()
+        if not self.BINARY:
+            payload = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        tmp = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        with tmp.open("wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(payload)
+        os.replace(tmp, self.snapshot_path)
+        self.dirty = False
+
+
+def flush_views() -> None:
+    for store in list(_STORES.values()):
+        for view in store.views.values():
+            # Skip ledgers whose directory is gone (temporary test trees).
+            if view.dirty and view.position is not None and view.snapshot_path.parent.is_dir():
+                try:
+                    view.save_snapshot()
+                except OSError as exc:
+                    LOGGER.warning("Could not save %s: %s", view.snapshot_path.name, exc)
+
+
+atexit.register(flush_views)
+
+
+# Attach (once per process) and sync a view of the ledger at `path`.
+def get_view(path: Path, cls: type, params: Tuple[Any, ...] = ()) -> Any:
+    store = get_store(path)
+    key = (cls, tuple(params))
+    view = store.views.get(key)
+    if view is None:
+        view = cls(store, tuple(params))
+        view.load_snapshot()
+        store.views[key] = view
+    view.sync()
+    return view
+
+
+# Backend is picked with PFM_STORAGE=csv|sqlite (default csv, the flat files).
+def storage_backend() -> str:
+    name = os.environ.get("PFM_STORAGE", "csv").strip().lower()
+    return name if name in ("csv", "sqlite") else "csv"
+
+
+_STORES: Dict[Tuple[str, Path], Any] = {}
+
+# One store per ledger file for the whole process; every module reads through it.
+def get_store(path: Path) -> TransactionStore:
+    backend = storage_backend()
+    key = (backend, Path(path).resolve())
+    store = _STORES.get(key)
+    if store is None:
+        if backend == "sqlite":
+            from sqlite_store import SqliteTransactionStore
+            store = SqliteTransactionStore(Path(path))
+        else:
+            store = TransactionStore(Path(path))
+        _STORES[key] = store
+    return store
+
+
+# Changes whenever the ledger does: the store's write counter covers every
+# write made in this process (categories, recurring posts and imports all go
+# through the store), the on-disk state covers other processes. Hashable, so
+# it can key caches of derived results.
+def ledger_version(path: Path) -> Tuple[Any, ...]:
+    store = get_store(path)
+    state = store.ledger_state()
+    return (id(store), store.writes, *(tuple(s) if s is not None else None for s in state))
+
+
+# users.json / budgets.json / recurrences.json go through these so the
+# SQLite backend can keep them in tables instead.
+def read_records(path: Path) -> list[dict]:
+    if storage_backend() == "sqlite":
+        import sqlite_store
+        if path.stem in sqlite_store.RECORD_KINDS:
+            return sqlite_store.read_records(sqlite_store.db_path_for(path), path.stem)
+    return read_json(path)
+
+
+def write_records(path: Path, data: list[dict], *, compact: bool = False) -> None:
+    if storage_backend() == "sqlite":
+        import sqlite_store
+        if path.stem in sqlite_store.RECORD_KINDS:
+            sqlite_store.write_records(sqlite_store.db_path_for(path), path.stem, data)
+            return
+    write_json(path, data, compact=compact)
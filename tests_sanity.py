@@ -3,12 +3,13 @@ from __future__ import annotations
 
 from pathlib import Path
 from decimal import Decimal
+import os
 import shutil
 import tempfile
 
 from users import validate_username, validate_currency, validate_pin, register_user, authenticate
-from transactions import parse_money, create_transaction
-from storage import read_json
+from transactions import parse_money, create_transaction, persist_transaction, parse_iso_date
+from storage import read_json, get_store, CSV_FIELDNAMES
 from backups import BackupSpec, create_backup, list_backups, verify_backup, restore_backup
 
 def test_validators():
@@ -51,6 +52,43 @@ def test_money_parse():
     except ValueError:
         pass
 
+def test_amount_cents():
+    from storage import amount_cents, ledger_row
+    from reports import balance_summary, cents_to_decimal
+
+    cases = {"12.50": 1250, "12.5": 1250, "7": 700, ".05": 5, " 3.10 ": 310, "1.005": 101,
+             "-2.00": -200, "1e2": 10000, "abc": None, "1.2.34": None, "NaN": None, "": None}
+    for text, cents in cases.items():
+        assert amount_cents(text) == cents, text
+    assert amount_cents(None) is None
+
+    rows = [ledger_row({"type": "income", "amount": a}) for a in ("0.10", "0.20", "1000", "x")]
+    rows.append({"type": "expense", "amount": "0.30"})  # plain dicts still work
+    s = balance_summary(rows)
+    assert (s["income"], s["expense"], s["net"]) == (Decimal("1000.30"), Decimal("0.30"), Decimal("1000.00"))
+    assert str(cents_to_decimal(123456)) == "1234.56"
+
+def test_report_bundle():
+    from reports import compute_report_bundle
+
+    rows = [{"type": "income", "amount": "100", "category": "Salary", "date": "2025-01-05"},
+            {"type": "expense", "amount": "20.50", "category": "Food", "date": "2025-01-09"},
+            {"type": "expense", "amount": "4.50", "category": "", "date": "2025-02-01"},
+            {"type": "expense", "amount": "bad", "category": "Food", "date": "2025-02-02"},
+            {"type": "expense", "amount": "1.00", "category": "Food", "date": "nope"}]
+    b = compute_report_bundle(iter(rows), ["balance", "by_category", "by_month", "chart"])
+    assert b["balance"] == {"income": Decimal("100"), "expense": Decimal("26"), "net": Decimal("74")}
+    assert b["by_category"] == [("Salary", Decimal("100")), ("Food", Decimal("21.50"))]
+    assert b["by_month"] == [("2025-01", Decimal("120.50")), ("2025-02", Decimal("4.50"))]
+    assert b["chart"][-1] == ("", Decimal("4.50"))
+    assert set(compute_report_bundle(rows, ["by_month"])) == {"by_month"}
+    try:
+        compute_report_bundle(rows, ["pie"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown report kind accepted")
+
 def test_user_and_backup_flow(tmpdir: Path):
     data_dir = tmpdir / "data"
     backups_dir = tmpdir / "backups"
@@ -80,13 +118,941 @@ def test_user_and_backup_flow(tmpdir: Path):
     assert read_json(data_dir2 / "users.json")[0]["name"] == "Tester"
     assert restored, "expected at least one restored file"
 
+def test_transaction_store_refresh(tmpdir: Path):
+    tx_csv = tmpdir / "transaction.csv"
+    store = get_store(tx_csv)
+    assert store.rows() == []
+
+    tx = create_transaction("U001", type="expense", amount="12.50", category="Food",
+                            date_str="2025-10-01", description="lunch", payment_method="Cash")
+    persist_transaction(tx_csv, tx)
+    assert [r["amount"] for r in store.rows()] == ["12.50"]
+
+    # Rows appended by someone else are picked up from the new bytes only.
+    with tx_csv.open("a", encoding="utf-8", newline="") as f:
+        f.write('T000099,U001,income,5.00,Gift,2025-10-02,"multi\nline",Cash\n')
+    rows = store.rows()
+    assert len(rows) == 2 and rows[1]["description"] == "multi\nline"
+
+    # A full rewrite of the file is detected and reparsed.
+    tx_csv.write_text(",".join(CSV_FIELDNAMES) + "\n", encoding="utf-8")
+    assert store.rows() == []
+
+def test_journal_edits_and_compaction(tmpdir: Path):
+    from transactions import edit_transaction, delete_transaction
+    from storage import TransactionStore
+
+    tx_csv = tmpdir / "transaction.csv"
+    for i in range(3):
+        tx = create_transaction("U001", type="expense", amount=f"{i + 1}.00", category="Food",
+                                date_str="2025-10-01", description="", payment_method="Cash")
+        persist_transaction(tx_csv, tx)
+    base = tx_csv.read_bytes()
+
+    assert edit_transaction(tx_csv, "T000002", lambda r: {**r, "amount": "20.00"})
+    assert delete_transaction(tx_csv, "T000003")
+    assert tx_csv.read_bytes() == base, "edits must not rewrite the ledger"
+
+    # A fresh reader (another process) merges the journal on load.
+    fresh = TransactionStore(tx_csv)
+    assert [(r["transaction_id"], r["amount"]) for r in fresh.rows()] == [("T000001", "1.00"), ("T000002", "20.00")]
+
+    store = get_store(tx_csv)
+    store.compact()
+    assert not store.journal_path.exists()
+    assert [r["amount"] for r in TransactionStore(tx_csv).rows()] == ["1.00", "20.00"]
+
+def test_offset_index(tmpdir: Path):
+    from transactions import edit_transaction, delete_transaction
+    from storage import TransactionStore
+
+    tx_csv = tmpdir / "transaction.csv"
+    for i in range(5):
+        tx = create_transaction("U001", type="expense", amount="10.00", category="Food",
+                                date_str="2025-10-01", description=f"row {i}", payment_method="Cash")
+        persist_transaction(tx_csv, tx)
+    size = tx_csv.stat().st_size
+
+    # Cold lookups are served from the index without loading the ledger.
+    cold = TransactionStore(tx_csv)
+    assert cold.get("T000004")["description"] == "row 3"
+    assert not cold._rows
+    assert cold.get("T000099") is None  # a miss is only certain after a full load
+
+    # Same-length edits are patched in place; the rest go to the journal.
+    assert edit_transaction(tx_csv, "T000002", lambda r: {**r, "amount": "12.34"})
+    assert tx_csv.stat().st_size == size and b"12.34" in tx_csv.read_bytes()
+    assert delete_transaction(tx_csv, "T000003")
+    fresh = TransactionStore(tx_csv)
+    assert fresh.get("T000002")["amount"] == "12.34"
+    assert fresh.get("T000003") is None
+
+    # IDs the index doesn't cover - far past any slot, or after a bare '"'
+    # that its record splitter reads differently from csv - come from the
+    # full load. A journal line still being written is not read yet.
+    with tx_csv.open("a", encoding="utf-8", newline="") as f:
+        f.write("T99999999999999,U001,expense,1.00,Food,2025-10-01,huge,Cash\n")
+        f.write("T900000000,U001,expense,1.00,Food,2025-10-01,big,Cash\n")
+        f.write('T000010,U001,expense,1.00,Food,2025-10-01,27" monitor,Cash\n')
+        f.write("T000011,U001,expense,1.00,Food,2025-10-01,after,Cash\n")
+    assert TransactionStore(tx_csv).update("T000011", {**TransactionStore(tx_csv).get("T000011"), "amount": "2.00"})
+    with (tmpdir / "transaction.csv.journal").open("a", encoding="utf-8") as f:
+        f.write('{"op": "del", "tid": "T0000')
+    for tid, desc in [("T99999999999999", "huge"), ("T900000000", "big"), ("T000010", '27" monitor')]:
+        assert TransactionStore(tx_csv).get(tid)["description"] == desc
+    assert TransactionStore(tx_csv).get("T000011")["amount"] == "2.00"
+    assert (tmpdir / "transaction.csv.idx").stat().st_size < 4096
+
+def test_in_place_edit_then_append(tmpdir: Path):
+    from reports import RollupCube
+    from budgets import SpendCounters, spend_counters
+    from transactions import edit_transaction
+    from storage import TransactionStore
+
+    tx_csv = tmpdir / "transaction.csv"
+    for amt in ("10.00", "20.00"):
+        persist_transaction(tx_csv, create_transaction(
+            "U001", type="expense", amount=amt, category="Food", date_str="2025-10-01",
+            description="", payment_method="Cash"))
+    cube = RollupCube(get_store(tx_csv))
+    cube.sync()
+    cube.save_snapshot()
+    other = TransactionStore(tx_csv)  # a second process
+    other.rows()
+
+    # Same length, so the CSV keeps its size and inode; an append follows.
+    size = tx_csv.stat().st_size
+    assert edit_transaction(tx_csv, "T000001", lambda r: {**r, "amount": "99.00"})
+    assert tx_csv.stat().st_size == size and b"99.00" in tx_csv.read_bytes()
+    spend_counters(tx_csv).save_snapshot()  # reflects the edit
+    persist_transaction(tx_csv, create_transaction(
+        "U001", type="expense", amount="1.00", category="Food", date_str="2025-10-02",
+        description="", payment_method="Cash"))
+
+    amounts = ["99.00", "20.00", "1.00"]
+    assert [r["amount"] for r in other.rows()] == amounts
+    assert [r["amount"] for r in TransactionStore(tx_csv).rows()] == amounts
+    fresh = RollupCube(TransactionStore(tx_csv))
+    fresh.load_snapshot()
+    fresh.sync()
+    built = RollupCube(TransactionStore(tx_csv))
+    built.sync()
+    assert fresh.cells("U001") == built.cells("U001")
+    assert sum(c[0] for (_, cat, _, _), c in fresh.cells("U001").items() if cat == "Food") == 12000
+
+    # A view saved after the edit has nothing but the append to catch up on.
+    counters = SpendCounters(TransactionStore(tx_csv))
+    counters.load_snapshot()
+    counters.rebuild = None  # tailing must not fall back to a rebuild
+    counters.sync()
+    assert counters.spent("U001", "2025-10", "Food") == 12000
+
+def test_batch_import(tmpdir: Path):
+    from import_export import import_transactions_batch
+
+    tx_csv = tmpdir / "transaction.csv"
+    src = tmpdir / "bank.csv"
+    src.write_text("date,amount,description\n"
+                   "2025-01-02,10.00,coffee\n"
+                   "2025-01-02,10.00,coffee\n"
+                   "2025-13-01,5.00,bad date\n"
+                   "2025-01-03,-4,refund\n"
+                   "2025-01-04,7.5,books\n", encoding="utf-8")
+    report = import_transactions_batch(tx_csv, "U001", src, chunk_size=2)
+    assert (report.added, report.skipped) == (2, 3)
+    assert [line for line, _ in report.rejections] == [3, 4, 5]
+    assert "duplicate" in report.rejections[0][1]
+    assert [r["transaction_id"] for r in get_store(tx_csv).rows()] == ["T000001", "T000002"]
+
+    again = import_transactions_batch(tx_csv, "U001", src)
+    assert again.added == 0 and again.skipped == 5
+
+def test_dedupe_index(tmpdir: Path):
+    from import_export import import_transactions_batch
+    from transactions import DedupeIndex, dedupe_index
+
+    tx_csv = tmpdir / "transaction.csv"
+    src = tmpdir / "bank.csv"
+    src.write_text("date,amount,description\n2025-01-02,10,coffee\n2025-01-03,4.50,bus\n", encoding="utf-8")
+    assert import_transactions_batch(tx_csv, "U001", src).added == 2
+    key = ("date", "amount", "description")
+    idx = dedupe_index(tx_csv, key)
+    assert idx.contains("U001", ("2025-01-02", "10.00", "coffee"))
+    assert not idx.contains("U002", ("2025-01-02", "10.00", "coffee"))
+
+    # Deletes reach the attached view; the row can be imported again.
+    assert get_store(tx_csv).delete("T000001")
+    assert not idx.contains("U001", ("2025-01-02", "10.00", "coffee"))
+    assert import_transactions_batch(tx_csv, "U001", src).added == 1
+
+    # A snapshot plus a later append: a fresh view only tails the new bytes.
+    idx.save_snapshot()
+    persist_transaction(tx_csv, create_transaction(
+        "U001", type="expense", amount="3", category="Food",
+        date_str="2025-01-05", description="tea", payment_method="Cash"))
+    fresh = DedupeIndex(get_store(tx_csv), key)
+    fresh.load_snapshot()
+    assert fresh.position != get_store(tx_csv).ledger_state()
+    fresh.sync()
+    assert fresh.contains("U001", ("2025-01-05", "3", "tea"))
+    assert fresh.contains("U001", ("2025-01-03", "4.5", "bus"))
+    assert fresh.dump() == dedupe_index(tx_csv, key).dump()
+
+    # Deleting a row the snapshot holds cancels it without touching the array.
+    fresh.load_snapshot()
+    fresh.remove({"user_id": "U001", "date": "2025-01-03", "amount": "4.50", "description": "bus"})
+    assert not fresh.contains("U001", ("2025-01-03", "4.5", "bus"))
+    assert len(fresh.dump()) == len(fresh._base.tobytes()) - 8
+
+def test_parallel_import_matches_serial(tmpdir: Path):
+    from import_export import import_transactions_batch
+
+    src = tmpdir / "bank.csv"
+    lines = ["date,amount,description"]
+    for i in range(300):
+        desc = f'"line {i}\nsecond, part"' if i % 7 == 0 else f"item {i % 250}"
+        amount = "oops" if i % 31 == 0 else f"{i}.00"
+        lines.append(f"2025-01-{i % 28 + 1:02d},{amount},{desc}")
+    src.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    serial = import_transactions_batch(tmpdir / "a.csv", "U001", src)
+    parallel = import_transactions_batch(tmpdir / "b.csv", "U001", src, workers=3)
+    assert serial.rejections == parallel.rejections
+    assert get_store(tmpdir / "a.csv").rows() == get_store(tmpdir / "b.csv").rows()
+
+def test_id_allocator(tmpdir: Path):
+    from transactions import next_transaction_id, reserve_transaction_ids
+
+    tx_csv = tmpdir / "transaction.csv"
+    tx_csv.write_text(",".join(CSV_FIELDNAMES) + "\n"
+                      "T000041,U001,expense,1.00,Food,2025-01-01,,Cash\n", encoding="utf-8")
+    # No counter yet: rebuilt from the ledger once, then handed out in blocks.
+    assert next_transaction_id(tx_csv) == "T000042"
+    assert reserve_transaction_ids(tx_csv, 3) == ["T000043", "T000044", "T000045"]
+    assert next_transaction_id(tx_csv) == "T000046"
+
+    seq = tmpdir / "transaction.csv.seq"
+    seq.write_text("garbage", encoding="utf-8")
+    assert next_transaction_id(tx_csv) == "T000042"
+
+def test_rollup_cube(tmpdir: Path):
+    from datetime import date
+    from categories import rename_category
+    from reports import (
+        RollupCube, ReportFilters, load_user_rows, balance_summary, totals_by_category, totals_by_month,
+        user_balance_summary, user_totals_by_category, user_totals_by_month,
+    )
+    from budgets import set_budget, spend_vs_budget
+    from transactions import edit_transaction, delete_transaction
+
+    tx_csv = tmpdir / "transaction.csv"
+    specs = [("income", "1000", "Salary", "2025-01-01"), ("expense", "12.5", "Food", "2025-01-03"),
+             ("expense", "40", "Fuel", "2025-02-10"), ("expense", "7.25", "Food", "2025-02-11"),
+             ("expense", "3", "Food", "2025-03-01")]
+    for t, amt, cat, d in specs:
+        persist_transaction(tx_csv, create_transaction(
+            "U001", type=t, amount=amt, category=cat, date_str=d, description="", payment_method="Cash"))
+    edit_transaction(tx_csv, "T000002", lambda r: {**r, "amount": "20.00"})
+    delete_transaction(tx_csv, "T000005")
+    rename_category(tx_csv, "U001", "Fuel", "Car")
+
+    def same(filters):
+        rows = load_user_rows(tx_csv, "U001", filters)
+        assert user_balance_summary(tx_csv, "U001", filters) == balance_summary(rows)
+        assert user_totals_by_category(tx_csv, "U001", filters) == totals_by_category(rows)
+        assert user_totals_by_month(tx_csv, "U001", filters) == totals_by_month(rows)
+
+    same(None)
+    same(ReportFilters(start=date(2025, 2, 1), end=date(2025, 2, 28), type="expense"))
+    same(ReportFilters(start=date(2025, 1, 2)))  # day-level: falls back to rows
+    assert user_totals_by_category(tx_csv, "U001")[:2] == [("Salary", Decimal("1000.00")), ("Car", Decimal("40.00"))]
+
+    budgets = tmpdir / "budgets.json"
+    set_budget(budgets, "U001", "2025-02", "Food", "5")
+    assert spend_vs_budget(tx_csv, budgets, "U001", "2025-02")[1] == ("Food", Decimal("7.25"), Decimal("5.00"), Decimal("-2.25"))
+
+    cube = get_store(tx_csv).views[(RollupCube, ())]
+    cube.save_snapshot()
+    fresh = RollupCube(get_store(tx_csv))
+    fresh.load_snapshot()
+    fresh.sync()
+    assert fresh.cells("U001") == cube.cells("U001")
+
+def test_columnar_engine(tmpdir: Path):
+    import columnar
+    from datetime import date
+    from reports import (
+        ReportFilters, load_user_rows, balance_summary, totals_by_category, totals_by_month,
+        user_balance_summary, user_totals_by_category, user_totals_by_month,
+    )
+    if not columnar.enabled():
+        return  # NumPy not installed: reports use the pure-Python path
+
+    tx_csv = tmpdir / "transaction.csv"
+    get_store(tx_csv).append([
+        {"transaction_id": f"T{i:06d}", "user_id": "U001" if i % 4 else "U002", "type": t,
+         "amount": amt, "category": cat, "date": d, "description": "", "payment_method": pm}
+        for i, (t, amt, cat, d, pm) in enumerate([
+            ("income", "1000.00", "Salary", "2025-01-01", "Bank Transfer"),
+            ("expense", "12.50", "Food", "2025-01-03", "Cash"),
+            ("expense", "40.00", "Fuel", "2025-02-10", "Cash"),
+            ("expense", "oops", "Food", "2025-02-11", "Cash"),
+            ("expense", "7.25", "", "2025-02-12", "Wallet"),
+            ("expense", "3.00", "Food", "not a date", "Cash"),
+            ("income", "0.10", "Gift", "2025-03-15", "Cash"),
+            ("expense", "9.99", "Food", "2025-03-20", "Debit Card"),
+        ], start=1)
+    ])
+    for f in (None, ReportFilters(start=date(2025, 1, 2)), ReportFilters(end=date(2025, 3, 16), type="expense"),
+              ReportFilters(start=date(2025, 1, 2), payment_method="Cash", category="Food"),
+              ReportFilters(start=date(2025, 1, 2), category="Nope")):
+        rows = load_user_rows(tx_csv, "U001", f)
+        frame = columnar.frame_for(tx_csv, "U001")
+        m = frame.mask(f)
+        assert user_balance_summary(tx_csv, "U001", f) == balance_summary(rows)
+        assert _ranked_eq(frame.category_cents(m), totals_by_category(rows))
+        assert sorted(frame.month_cents(m).items()) == [(k, int(v * 100)) for k, v in totals_by_month(rows)]
+        assert user_totals_by_category(tx_csv, "U001", f) == totals_by_category(rows)
+        assert user_totals_by_month(tx_csv, "U001", f) == totals_by_month(rows)
+
+    # Frames follow the ledger.
+    persist_transaction(tx_csv, create_transaction(
+        "U001", type="income", amount="5", category="Gift", date_str="2025-03-16", description="", payment_method="Cash"))
+    assert columnar.frame_for(tx_csv, "U001").size == 7
+
+    # A new store for the same ledger never gets the old store's frame, and
+    # only the most recently used frames are kept.
+    import storage
+    old = columnar.frame_for(tx_csv, "U001")
+    for key in [k for k in storage._STORES if k[1] == tx_csv.resolve()]:
+        del storage._STORES[key]
+    assert columnar.frame_for(tx_csv, "U001") is not old
+    for i in range(columnar.FRAME_CACHE_SIZE + 3):
+        columnar.frame_for(tx_csv, f"U9{i:02d}")
+    assert len(columnar._FRAMES) == columnar.FRAME_CACHE_SIZE
+
+
+def _ranked_eq(cents: dict, ranked: list) -> bool:
+    return {k: Decimal(v) / 100 for k, v in cents.items()} == dict(ranked)
+
+def test_report_query(tmpdir: Path):
+    from report_query import compile_query, parse_query, plan_query, run_query
+
+    tx_csv = tmpdir / "transaction.csv"
+    specs = [("income", "1000", "Salary", "2025-01-01", "Bank Transfer", "January pay"),
+             ("expense", "150", "Food", "2025-01-20", "Cash", "Big shop"),
+             ("expense", "99.99", "Rent", "2025-01-31", "Debit Card", ""),
+             ("expense", "120", "Rent", "2025-02-01", "Debit Card", "Refund pending"),
+             ("expense", "30", "Fun", "2025-02-14", "Cash", "cinema")]
+    for t, amt, cat, d, pm, desc in specs:
+        persist_transaction(tx_csv, create_transaction(
+            "U001", type=t, amount=amt, category=cat, date_str=d, description=desc, payment_method=pm))
+
+    def ids(expr):
+        return [r["transaction_id"][-1] for r in run_query(tx_csv, "U001", expr)]
+
+    assert ids("date>=2025-01 and category in (Food,Rent) and amount>100") == ["2", "4"]
+    assert ids("date<=2025-01 and type=expense") == ["2", "3"]
+    assert ids("date=2025-02 or description~PAY") == ["1", "4", "5"]
+    assert ids("amount>=99.99 and amount<150 and not method='Bank Transfer'") == ["3", "4"]
+    assert ids("(category=Fun or category=Food) and method=Cash and date>2025-01-20") == ["5"]
+    assert ids("description~refund") == ["4"]
+    assert ids("date in (2025-02-14, 2025-01-01)") == ["1", "5"]
+
+    plan = plan_query(parse_query("date>=2025-01-15 and date<2025-03 and category=Rent or amount>1"))
+    assert plan.date_lo is None and plan.category is None  # top level is an OR
+    plan = plan_query(parse_query("date>=2025-01 and date>=2025-01-15 and date<=2025-02 and category in (Rent)"))
+    assert (plan.date_lo, plan.date_hi, plan.category) == ("2025-01-15", "2025-02", "Rent")
+    assert compile_query("date>=2025")({"date": "bad"}) is False
+
+    for bad in ("", "colour=red", "date>=2025-1", "amount>lots", "category in (Food", "type=income and"):
+        try:
+            compile_query(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"accepted {bad!r}")
+
+def test_date_index(tmpdir: Path):
+    from datetime import date
+    from reports import ReportFilters, load_user_rows
+    from transactions import DateIndex, date_index, edit_transaction, delete_transaction, list_user_transactions
+
+    tx_csv = tmpdir / "transaction.csv"
+    for i, d in enumerate(["2025-03-02", "2024-12-31", "2025-01-15", "2025-01-15", "2025-02-28", "2025-01-01"]):
+        persist_transaction(tx_csv, create_transaction(
+            "U001" if i != 4 else "U002", type="expense", amount="1", category="Food",
+            date_str=d, description=str(i), payment_method="Cash"))
+
+    def tids(rows):
+        return [r["transaction_id"][-1] for r in rows]
+
+    assert tids(list_user_transactions(tx_csv, "U001")) == ["1", "4", "3", "6", "2"]
+    assert tids(list_user_transactions(tx_csv, "U001", newest_first=False)) == ["2", "6", "3", "4", "1"]
+    assert tids(date_index(tx_csv).between("U001", "2025-01", "2025-01")) == ["6", "3", "4"]
+    jan = ReportFilters(start=date(2025, 1, 2), end=date(2025, 1, 31))
+    assert tids(load_user_rows(tx_csv, "U001", jan)) == ["3", "4"]
+
+    edit_transaction(tx_csv, "T000003", lambda r: {**r, "date": "2024-06-01"})
+    delete_transaction(tx_csv, "T000001")
+    assert tids(list_user_transactions(tx_csv, "U001")) == ["4", "6", "2", "3"]
+
+    date_index(tx_csv).save_snapshot()
+    fresh = DateIndex(get_store(tx_csv))
+    fresh.load_snapshot()
+    fresh.sync()
+    assert fresh.newest_first("U001") == list_user_transactions(tx_csv, "U001")
+    assert tids(fresh.between("U002")) == ["5"]
+
+def test_running_balance(tmpdir: Path):
+    from datetime import date
+    from decimal import Decimal
+    from reports import RunningBalance, balance_as_of, balance_between, running_balance, running_balance_by_month
+    from transactions import edit_transaction, delete_transaction
+
+    tx_csv = tmpdir / "transaction.csv"
+    for t, amt, d in [("income", "100.00", "2025-01-05"), ("expense", "30.50", "2025-01-20"),
+                      ("expense", "20.00", "2025-02-03"), ("income", "50.00", "2024-12-31"),
+                      ("expense", "5.00", "2025-01-20")]:
+        persist_transaction(tx_csv, create_transaction(
+            "U001", type=t, amount=amt, category="Food", date_str=d, description="", payment_method="Cash"))
+
+    assert balance_as_of(tx_csv, "U001", date(2025, 1, 19)) == {
+        "income": Decimal("150.00"), "expense": Decimal("0.00"), "net": Decimal("150.00")}
+    assert balance_between(tx_csv, "U001", date(2025, 1, 1), date(2025, 1, 31))["net"] == Decimal("64.50")
+    assert balance_as_of(tx_csv, "U002", date(2030, 1, 1))["net"] == Decimal("0.00")
+    assert running_balance_by_month(tx_csv, "U001") == [
+        ("2024-12", Decimal("50.00")), ("2025-01", Decimal("114.50")), ("2025-02", Decimal("94.50"))]
+
+    # Writes before the tail invalidate the prefix sums from that day on.
+    edit_transaction(tx_csv, "T000004", lambda r: {**r, "date": "2025-02-10"})
+    delete_transaction(tx_csv, "T000005")
+    assert running_balance_by_month(tx_csv, "U001", start=date(2025, 1, 1)) == [
+        ("2025-01", Decimal("69.50")), ("2025-02", Decimal("99.50"))]
+
+    running_balance(tx_csv).save_snapshot()
+    fresh = RunningBalance(get_store(tx_csv))
+    fresh.load_snapshot()
+    fresh.sync()
+    assert fresh.series("U001") == running_balance(tx_csv).series("U001")
+    fresh.rebuild(list(get_store(tx_csv).rows()))
+    assert fresh.series("U001") == running_balance(tx_csv).series("U001")
+
+def test_report_cache(tmpdir: Path):
+    from datetime import date
+    from reports import REPORT_CACHE, ReportCache, ReportFilters, user_balance_summary, user_totals_by_category
+    from transactions import edit_transaction
+
+    tx_csv = tmpdir / "transaction.csv"
+    persist_transaction(tx_csv, create_transaction(
+        "U001", type="expense", amount="10", category="Food", date_str="2025-01-05", description="", payment_method="Cash"))
+    REPORT_CACHE.clear()
+    f = ReportFilters(start=date(2025, 1, 2))
+    first = user_totals_by_category(tx_csv, "U001", f)
+    first.append(("scribbled", Decimal("0")))
+    assert user_totals_by_category(tx_csv, "U001", filters=ReportFilters(start=date(2025, 1, 2))) == [("Food", Decimal("10.00"))]
+    assert (REPORT_CACHE.hits, REPORT_CACHE.misses) == (1, 1)
+
+    # Any write moves the ledger version, even one that keeps the file size.
+    edit_transaction(tx_csv, "T000001", lambda r: {**r, "amount": "12.00"})
+    assert user_totals_by_category(tx_csv, "U001", f) == [("Food", Decimal("12.00"))]
+    assert user_balance_summary(tx_csv, "U001")["expense"] == Decimal("12.00")
+    assert (REPORT_CACHE.hits, REPORT_CACHE.misses) == (1, 3)
+
+    lru = ReportCache(maxsize=2)
+    for k in ("a", "b", "a", "c", "b"):
+        lru.get_or_compute((k,), lambda: [k])
+    assert lru.stats() == {"hits": 1, "misses": 4, "size": 2, "maxsize": 2}
+
+def test_transaction_pages(tmpdir: Path):
+    from storage import TransactionStore
+    from transactions import (
+        DateIndex, date_index, list_user_transactions, list_user_transactions_page, transaction_cursor,
+    )
+
+    tx_csv = tmpdir / "transaction.csv"
+    for i in range(23):
+        persist_transaction(tx_csv, create_transaction(
+            "U001" if i % 5 else "U002", type="expense", amount="1", category="Food",
+            date_str=f"2025-01-{i % 9 + 1:02d}", description=str(i), payment_method="Cash"))
+
+    for newest in (True, False):
+        walked, after = [], None
+        while True:
+            page = list_user_transactions_page(tx_csv, "U001", after=after, limit=5, newest_first=newest)
+            if not page:
+                break
+            assert len(page) <= 5
+            walked += page
+            after = transaction_cursor(page[-1])
+        assert walked == list_user_transactions(tx_csv, "U001", newest_first=newest)
+    assert list_user_transactions_page(tx_csv, "U001", after=("2025-01-02", "T999999"), limit=2, newest_first=False)[0]["date"] == "2025-01-03"
+
+    # Fresh process: the page comes from the index snapshot plus lookups by ID.
+    date_index(tx_csv).save_snapshot()
+    cold = TransactionStore(tx_csv)
+    fresh = DateIndex(cold)
+    fresh.load_snapshot()
+    fresh.sync()
+    page = fresh.page("U001", None, 3)
+    assert [r["transaction_id"] for r in page] == ["T000018", "T000009", "T000017"]
+    assert not cold._loaded
+
+def test_parallel_scan(tmpdir: Path):
+    from datetime import date
+    from parallel_scan import scan_report_bundle
+    from reports import REPORT_KINDS, ReportFilters, compute_report_bundle, load_user_rows
+    from transactions import edit_transaction, delete_transaction
+
+    tx_csv = tmpdir / "transaction.csv"
+    cats = ["Food", "Rent", "", "Fun", "Food, \"Home\"\nstuff"]
+    get_store(tx_csv).append([
+        {"transaction_id": f"T{i:06d}", "user_id": f"U00{i % 3 + 1}", "type": ("income", "expense", "other")[i % 3 - 1],
+         "amount": "oops" if i % 17 == 0 else f"{i * 7 % 500}.{i % 100:02d}", "category": cats[i % 5],
+         "date": "bad" if i % 23 == 0 else f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "description": "", "payment_method": "Cash"}
+        for i in range(1, 400)
+    ])
+    edit_transaction(tx_csv, "T000004", lambda r: {**r, "amount": "123456.78", "category": "Rent"})
+    edit_transaction(tx_csv, "T000010", lambda r: {**r, "amount": "1.00"})
+    delete_transaction(tx_csv, "T000007")
+    delete_transaction(tx_csv, "T000013")
+
+    for f in (None, ReportFilters(start=date(2025, 3, 5), category="Food"), ReportFilters(type="expense")):
+        want = compute_report_bundle(load_user_rows(tx_csv, "U002", f), REPORT_KINDS)
+        for workers in (1, 3):
+            assert scan_report_bundle(tx_csv, "U002", REPORT_KINDS, f, workers=workers) == want
+
+    # An edited ID that appears twice in the file can't be replayed per range.
+    with tx_csv.open("a", encoding="utf-8", newline="") as fh:
+        fh.write("T000004,U002,expense,5.00,Food,2025-01-01,,Cash\r\n")
+    assert scan_report_bundle(tx_csv, "U002", ["by_category"], workers=2) == \
+        compute_report_bundle(load_user_rows(tx_csv, "U002"), ["by_category"])
+
+def test_file_lock(tmpdir: Path):
+    import subprocess
+    import sys
+    import time
+    from storage import _break_stale_lock, file_lock
+    from parallel_scan import scan_report_bundle
+    from reports import REPORT_KINDS, compute_report_bundle, load_user_rows
+
+    tx_csv = tmpdir / "transaction.csv"
+    persist_transaction(tx_csv, create_transaction(
+        "U001", type="expense", amount="5.00", category="Food", date_str="2025-10-01",
+        description="", payment_method="Cash"))
+    lock = tx_csv.with_name(tx_csv.name + ".lock")
+
+    # A lock left by a writer that died is broken at once, however fresh.
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    lock.write_text(str(dead.pid), encoding="ascii")
+    with file_lock(tx_csv, timeout=0.5):
+        pass
+    assert not lock.exists()
+
+    # A waiter that judged an older lock stale must not break the live one
+    # another waiter took in the meantime.
+    lock.write_text(str(os.getpid()), encoding="ascii")
+    _break_stale_lock(lock)
+    assert lock.read_text(encoding="ascii") == str(os.getpid())
+    assert [p.name for p in tmpdir.iterdir() if p.name.endswith(".stale")] == []
+    lock.unlink()
+
+    # A live owner keeps its lock however old it is, and reads don't wait on it.
+    lock.write_text(str(os.getpid()), encoding="ascii")
+    os.utime(lock, (time.time() - 3600, time.time() - 3600))
+    try:
+        with file_lock(tx_csv, timeout=0.1):
+            raise AssertionError("took a live lock")
+    except TimeoutError:
+        pass
+    assert lock.exists()
+    assert scan_report_bundle(tx_csv, "U001", REPORT_KINDS, workers=1) == \
+        compute_report_bundle(load_user_rows(tx_csv, "U001"), REPORT_KINDS)
+    lock.unlink()
+
+def test_category_ids(tmpdir: Path):
+    from categories import list_categories, merge_categories, migrate_category_ids, rename_category
+    from parallel_scan import scan_report_bundle
+    from reports import REPORT_KINDS, compute_report_bundle, load_user_rows, user_totals_by_category
+    from storage import TransactionStore, category_table_path
+    from transactions import edit_transaction, delete_transaction
+
+    tx_csv = tmpdir / "transaction.csv"
+    cats = ["Food", "Eats", "Rent", "", "Food, \"Home\""]
+    get_store(tx_csv).append([
+        {"transaction_id": f"T{i:06d}", "user_id": f"U00{i % 2 + 1}", "type": "expense", "amount": f"{i}.00",
+         "category": cats[i % 5], "date": f"2025-0{i % 3 + 1}-01", "description": "", "payment_method": "Cash"}
+        for i in range(1, 41)
+    ])
+    before = {r["transaction_id"]: dict(r) for r in get_store(tx_csv).rows()}
+    user_totals_by_category(tx_csv, "U001")  # attach the rollup view
+    other = TransactionStore(tx_csv)  # a second process
+    assert len(other.rows()) == 40
+
+    assert migrate_category_ids(tx_csv) == 40
+    assert migrate_category_ids(tx_csv) == 0
+    assert tx_csv.read_text(encoding="utf-8").splitlines()[0].split(",")[4] == "category_id"
+    assert {r["transaction_id"]: dict(r) for r in TransactionStore(tx_csv).rows()} == before
+
+    # Rename and merge leave the ledger bytes alone and stay per user.
+    raw = tx_csv.read_bytes()
+    n_food = sum(1 for r in before.values() if r["user_id"] == "U001" and r["category"] == "Food")
+    assert rename_category(tx_csv, "U001", "Food", "Groceries") == n_food
+    assert merge_categories(tx_csv, "U001", ["Eats", "Groceries"], "Groceries") > n_food
+    assert tx_csv.read_bytes() == raw
+    assert list_categories(tx_csv, "U001") == ["Food, \"Home\"", "Groceries", "Rent"]
+    assert "Food" in list_categories(tx_csv, "U002") and "Eats" in list_categories(tx_csv, "U002")
+    assert [c for c, _ in user_totals_by_category(tx_csv, "U001")] == \
+        [c for c, _ in compute_report_bundle(load_user_rows(tx_csv, "U001"), ["by_category"])["by_category"]]
+    assert {r["category"] for r in other.rows() if r["user_id"] == "U001"} == {"Groceries", "Rent", "Food, \"Home\"", ""}
+
+    # New rows with the old name get a fresh ID; edits journal the ID.
+    get_store(tx_csv).append([{**before["T000002"], "transaction_id": "T000041", "category": "Food"}])
+    edit_transaction(tx_csv, "T000004", lambda r: {**r, "category": "Eats"})
+    delete_transaction(tx_csv, "T000005")
+    fresh = TransactionStore(tx_csv)
+    assert fresh.get("T000041")["category"] == "Food"
+    assert fresh.get("T000004")["category"] == "Eats"
+    assert fresh.get("T000006")["category"] == "Groceries"
+    assert fresh.get("T000011")["category"] == "Eats"
+    assert {r["transaction_id"]: r["category"] for r in fresh.rows()} == \
+        {r["transaction_id"]: r["category"] for r in get_store(tx_csv).rows()}
+    for user in ("U001", "U002"):
+        assert scan_report_bundle(tx_csv, user, REPORT_KINDS, workers=2) == \
+            compute_report_bundle(load_user_rows(tx_csv, user), REPORT_KINDS)
+
+    get_store(tx_csv).compact()
+    assert "category_id" in tx_csv.read_text(encoding="utf-8").splitlines()[0]
+    assert sorted(list_categories(tx_csv, "U001")) == sorted(["Eats", "Food", "Food, \"Home\"", "Groceries", "Rent"])
+    assert category_table_path(tx_csv).exists()
+
+    # A backup carries the name table and a restore brings both back.
+    zp = create_backup(BackupSpec(backup_dir=tmpdir / "backups", files=[tx_csv, category_table_path(tx_csv)]))
+    restored_dir = tmpdir / "restored"
+    names = [p.name for p in restore_backup(zp, restored_dir, allowed=(tx_csv.name, category_table_path(tx_csv).name))]
+    assert sorted(names) == [tx_csv.name, category_table_path(tx_csv).name]
+    assert {r["transaction_id"]: r["category"] for r in TransactionStore(restored_dir / tx_csv.name).rows()} == \
+        {r["transaction_id"]: r["category"] for r in get_store(tx_csv).rows()}
+
+def test_category_catalog(tmpdir: Path):
+    from categories import (CategoryCatalog, category_catalog, category_stats, complete_category, merge_categories,
+                            migrate_category_ids, rename_category)
+    from storage import TransactionStore
+    from transactions import edit_transaction, delete_transaction
+
+    tx_csv = tmpdir / "transaction.csv"
+    cats = ["Food", "food court", "Fuel", "Rent", "", "Fun", "Food"]
+    get_store(tx_csv).append([
+        {"transaction_id": f"T{i:06d}", "user_id": f"U00{i % 2 + 1}", "type": "expense",
+         "amount": "x" if i % 13 == 0 else f"{i}.50", "category": cats[i % 7],
+         "date": "bad" if i % 11 == 0 else f"2025-{i % 12 + 1:02d}-01", "description": "", "payment_method": "Cash"}
+        for i in range(1, 61)
+    ])
+
+    def expected(user):
+        out = {}
+        for r in get_store(tx_csv).rows():
+            if r["user_id"] != user or not r["category"]:
+                continue
+            e = out.setdefault(r["category"], [0, Decimal("0"), None])
+            e[0] += 1
+            if r["amount"] != "x":
+                e[1] += Decimal(r["amount"])
+            if r["date"] != "bad":
+                e[2] = max(e[2] or "", r["date"])
+        return [(c, *out[c]) for c in sorted(out, key=str.lower)]
+
+    def check():
+        for user in ("U001", "U002"):
+            got = [(s.category, s.count, s.total, s.last_used) for s in category_stats(tx_csv, user)]
+            assert got == expected(user), (got, expected(user))
+
+    check()
+    edit_transaction(tx_csv, "T000002", lambda r: {**r, "category": "Fuel", "amount": "1000.00", "date": "2026-01-05"})
+    delete_transaction(tx_csv, "T000006")
+    rename_category(tx_csv, "U001", "Rent", "Housing")
+    merge_categories(tx_csv, "U001", ["Fun", "food court"], "Food")
+    check()
+    assert [s.category for s in category_stats(tx_csv, "U001")] == ["Food", "Fuel", "Housing"]
+    assert next(s for s in category_stats(tx_csv, "U001") if s.category == "Fuel").last_used == "2026-01-05"
+
+    # Most used first, then most recently used; prefix matching ignores case.
+    ranked = sorted(expected("U002"), key=lambda e: e[3] or "", reverse=True)
+    ranked.sort(key=lambda e: e[1], reverse=True)
+    assert complete_category(tx_csv, "U002", "") == [e[0] for e in ranked]
+    assert complete_category(tx_csv, "U002", "FOO") == [e[0] for e in ranked if e[0].lower().startswith("foo")]
+    assert sorted(complete_category(tx_csv, "U002", "foo")) == ["Food", "food court"]
+    assert complete_category(tx_csv, "U002", "f", limit=1) == [ranked[0][0]]
+    assert complete_category(tx_csv, "U002", "x") == []
+
+    # Renames on a category-ID ledger reach the catalog too, and a new
+    # process picks it up from the snapshot.
+    migrate_category_ids(tx_csv)
+    rename_category(tx_csv, "U002", "Fuel", "Gas")
+    check()
+    category_catalog(tx_csv).save_snapshot()
+    fresh = CategoryCatalog(TransactionStore(tx_csv))
+    fresh.load_snapshot()
+    assert fresh.position == fresh.store.ledger_state()
+    assert fresh.stats("U002") == category_stats(tx_csv, "U002")
+
+def test_spend_analytics():
+    import math
+    import random
+    from spend_analytics import QuantileSketch, TopK, spend_analytics
+
+    rnd = random.Random(3)
+    values = [int(rnd.lognormvariate(7, 1.5)) + 1 for _ in range(20000)]
+    sketch, halves = QuantileSketch(), [QuantileSketch(), QuantileSketch()]
+    for i, v in enumerate(values):
+        sketch.add(v)
+        halves[i % 2].add(v)
+    halves[0].merge(halves[1])
+    ordered = sorted(values)
+    for q in (0.0, 0.5, 0.9, 0.99, 1.0):
+        exact = ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+        assert abs(sketch.quantile(q) - exact) <= exact * 0.01 + 1, (q, sketch.quantile(q), exact)
+        assert halves[0].quantile(q) == sketch.quantile(q)
+    assert len(sketch.buckets) < 1000 and QuantileSketch().quantile(0.5) is None
+
+    top = TopK(3)
+    for i, v in enumerate([5, 9, 1, 9, 7, 3]):
+        top.push(v, {"i": str(i)})
+    assert [(c, r["i"]) for c, r in top.items()] == [(9, "1"), (9, "3"), (7, "4")]
+
+    rows = [{"category": "Food", "type": "expense", "amount": a, "date": d, "description": str(i)}
+            for i, (a, d) in enumerate([("10.00", "2025-01-02"), ("30.00", "2025-01-09"), ("20.00", "2025-01-20"),
+                                        ("5.00", "2025-02-01"), ("bad", "2025-02-02")])]
+    rows.append({"category": "Salary", "type": "income", "amount": "900.00", "date": "2025-01-31"})
+    out = spend_analytics(rows, k=2)
+    assert out["quantiles"][0][:2] == ("Food", 4) and out["quantiles"][1][:2] == ("Salary", 1)
+    assert abs(out["quantiles"][0][2][0] - Decimal("10.00")) <= Decimal("0.10")
+    assert out["quantiles"][1][2] == [Decimal("900.00")] * 3
+    p50, p90, p99 = spend_analytics(rows[:2])["quantiles"][0][2]
+    assert abs(p50 - Decimal("10.00")) <= Decimal("0.10") and p90 == p99 == Decimal("30.00")
+    assert [(m, [str(a) for a, _ in top]) for m, top in out["top_expenses"]] == [
+        ("2025-01", ["30.00", "20.00"]), ("2025-02", ["5.00"])]
+
+def test_pivot(tmpdir: Path):
+    import csv as _csv
+    from datetime import date
+    from pivot import render_pivot, user_pivot, write_pivot_csv
+    from reports import ReportFilters, load_user_rows, totals_by_category, totals_by_month
+
+    tx_csv = tmpdir / "transaction.csv"
+    get_store(tx_csv).append([
+        {"transaction_id": f"T{i:06d}", "user_id": "U001", "type": "expense" if i % 4 else "income",
+         "amount": "x" if i % 19 == 0 else f"{i * 3 % 90}.{i % 100:02d}", "category": ["Food", "Rent", "", "Fun"][i % 4],
+         "date": "bad" if i % 29 == 0 else f"{2023 + i % 3}-{i % 12 + 1:02d}-{i % 27 + 1:02d}",
+         "description": "", "payment_method": "Cash"}
+        for i in range(1, 300)
+    ])
+    for f in (None, ReportFilters(type="expense"), ReportFilters(start=date(2024, 2, 14))):
+        # Rows without a month or a category have no cell.
+        rows = [r for r in load_user_rows(tx_csv, "U001", f) if r["date"] != "bad" and r["category"]]
+        pv = user_pivot(tx_csv, "U001", f)
+        by_cat = [(c, Decimal(t).scaleb(-2)) for c, _, t in pv.rows()]
+        assert by_cat == totals_by_category(rows)
+        months = {m: Decimal(t).scaleb(-2) for m, t in zip(pv.months, pv.col_totals)}
+        by_month = dict(totals_by_month(rows))
+        assert all(t == by_month.get(m, 0) for m, t in months.items()) and set(by_month) <= set(months)
+        assert pv.total == sum(pv.row_totals) == sum(pv.col_totals)
+
+    pv = user_pivot(tx_csv, "U001")
+    assert pv.months[0] == "2023-01" and pv.months[-1] == "2025-12" and len(pv.months) == 36
+    lines = list(render_pivot(pv))
+    assert len({len(line) for line in lines}) == 1 and len(lines) == len(pv.categories) + 4
+    out = tmpdir / "pivot.csv"
+    assert write_pivot_csv(pv, out) == len(pv.categories)
+    with out.open(encoding="utf-8", newline="") as fh:
+        table = list(_csv.reader(fh))
+    assert table[0][1:-1] == pv.months and table[1][0] == pv.categories[0]
+    assert Decimal(table[-1][-1]) == Decimal(pv.total).scaleb(-2)
+
+def test_budget_alerts(tmpdir: Path):
+    from budgets import SpendCounters, budget_status, set_budget, spend_counters, spend_vs_budget
+    from transactions import edit_transaction, delete_transaction
+
+    tx_csv, budgets = tmpdir / "transaction.csv", tmpdir / "budgets.json"
+    set_budget(budgets, "U001", "2025-03", "Food", "50")
+    assert budget_status(tx_csv, budgets, "U001", "2025-03", "Food").actual == Decimal("0.00")
+    for amt, d, t in [("20", "2025-03-01", "expense"), ("25.50", "2025-03-09", "expense"),
+                      ("100", "2025-03-10", "income"), ("9", "2025-04-01", "expense")]:
+        persist_transaction(tx_csv, create_transaction(
+            "U001", type=t, amount=amt, category="Food", date_str=d, description="", payment_method="Cash"))
+    st = budget_status(tx_csv, budgets, "U001", "2025-03", "Food")
+    assert (st.actual, st.budget, st.delta) == (Decimal("45.50"), Decimal("50.00"), Decimal("4.50"))
+    assert budget_status(tx_csv, budgets, "U001", "2025-04", "Food") is None  # no budget set
+
+    edit_transaction(tx_csv, "T000001", lambda r: {**r, "amount": "30.00"})
+    delete_transaction(tx_csv, "T000004")
+    assert budget_status(tx_csv, budgets, "U001", "2025-03", "Food").delta == Decimal("-5.50")
+    assert spend_vs_budget(tx_csv, budgets, "U001", "2025-03") == [("Food", Decimal("55.50"), Decimal("50.00"), Decimal("-5.50"))]
+    assert spend_counters(tx_csv).month("U001", "2025-04") == {}
+
+    spend_counters(tx_csv).save_snapshot()
+    fresh = SpendCounters(get_store(tx_csv))
+    fresh.load_snapshot()
+    fresh.sync()
+    assert fresh.spent("U001", "2025-03", "Food") == 5550
+
+def test_budget_range(tmpdir: Path):
+    from budgets import set_budget, spend_vs_budget, spend_vs_budget_range
+
+    tx_csv, budgets = tmpdir / "transaction.csv", tmpdir / "budgets.json"
+    for month, cat, amt in [("2024-11", "Food", "40"), ("2025-01", "Food", "50"), ("2025-01", "Rent", "900"),
+                            ("2025-02", "Food", "60")]:
+        set_budget(budgets, "U001", month, cat, amt)
+    for amt, cat, d, t in [("20", "Food", "2024-12-24", "expense"), ("55", "Food", "2025-01-09", "expense"),
+                           ("900", "Rent", "2025-01-01", "expense"), ("300", "Salary", "2025-02-01", "income"),
+                           ("12", "Fun", "2025-02-14", "expense")]:
+        persist_transaction(tx_csv, create_transaction(
+            "U001", type=t, amount=amt, category=cat, date_str=d, description="", payment_method="Cash"))
+
+    grid = spend_vs_budget_range(tx_csv, budgets, "U001", "2024-11", "2025-02")
+    assert list(grid) == ["2024-11", "2024-12", "2025-01", "2025-02"]
+    for month, rows in grid.items():
+        assert rows == spend_vs_budget(tx_csv, budgets, "U001", month)
+    assert grid["2024-12"] == [("Food", Decimal("20.00"), Decimal("0"), Decimal("-20.00"))]
+    assert grid["2025-01"][0] == ("Food", Decimal("55.00"), Decimal("50.00"), Decimal("-5.00"))
+    incomes = spend_vs_budget_range(tx_csv, budgets, "U001", "2025-01", "2025-02", type_filter="income")
+    assert incomes["2025-02"][0] == ("Salary", Decimal("300.00"), Decimal("0"), Decimal("-300.00"))
+    for bad in (("2025-02", "2025-01"), ("2025-13", "2025-12")):
+        try:
+            spend_vs_budget_range(tx_csv, budgets, "U001", *bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+def test_budget_store(tmpdir: Path):
+    from budgets import budget_index, copy_budgets_forward, get_budget, get_budgets, set_budget, set_budgets_bulk
+
+    budgets = tmpdir / "budgets.json"
+    budgets.write_text('[{"user_id": "U001", "month": "2025-01", "category": "Food", "amount": "oops"}]',
+                       encoding="utf-8")
+    set_budget(budgets, "U001", "2025-01", "Food", "100")
+    set_budgets_bulk(budgets, "U001", [("2025-01", "Rent", "900"), ("2025-01", "Food", "120"),
+                                       ("2025-02", "Food", "80")])
+    set_budget(budgets, "U002", "2025-01", "Food", "5")
+    assert get_budget(budgets, "U001", "2025-01", "Food") == Decimal("120.00")
+    assert get_budget(budgets, "U001", "2025-03", "Food") is None
+    assert sorted(b.category for b in get_budgets(budgets, "U001", "2025-01")) == ["Food", "Rent"]
+    assert len(get_budgets(budgets, "U001")) == 3
+
+    # A bad entry rejects the whole batch; the compact file keeps the
+    # malformed record it could not parse.
+    try:
+        set_budgets_bulk(budgets, "U001", [("2025-04", "Food", "1"), ("2025-13", "Food", "1")])
+        assert False
+    except ValueError:
+        pass
+    assert get_budgets(budgets, "U001", "2025-04") == []
+    text = budgets.read_text(encoding="utf-8")
+    assert "\n" not in text and '"oops"' in text
+
+    copied = copy_budgets_forward(budgets, "U001", "2025-01", 12)
+    assert len(copied) == 24
+    assert get_budget(budgets, "U001", "2025-02", "Food") == Decimal("120.00")
+    assert get_budget(budgets, "U001", "2026-01", "Rent") == Decimal("900.00")
+    assert get_budget(budgets, "U001", "2026-02", "Rent") is None
+    assert copy_budgets_forward(budgets, "U001", "2030-01", 3) == []
+
+    # Another writer replaces the file: the index notices and reloads.
+    index = budget_index(budgets)
+    budgets.write_text('[{"user_id": "U001", "month": "2025-01", "category": "Gym", "amount": "30.00"}]',
+                       encoding="utf-8")
+    assert [b.category for b in index.items("U001")] == ["Gym"]
+
+def test_sqlite_backend(tmpdir: Path):
+    import sqlite_store
+    from reports import ReportFilters, load_user_rows
+    from transactions import edit_transaction, delete_transaction
+
+    tx_csv = tmpdir / "transaction.csv"
+    tx_csv.write_text(",".join(CSV_FIELDNAMES) + "\n"
+                      "T000001,U001,expense,10.00,Food,2025-01-05,,Cash\n"
+                      "T000002,U001,income,99.00,Salary,2025-02-01,,Bank Transfer\n", encoding="utf-8")
+    (tmpdir / "users.json").write_text('[{"user_id": "U001", "name": "Demo"}]', encoding="utf-8")
+
+    os.environ["PFM_STORAGE"] = "sqlite"
+    try:
+        counts = sqlite_store.migrate_from_files(tmpdir)
+        assert counts["transactions"] == 2 and counts["users"] == 1
+        rows = load_user_rows(tx_csv, "U001", ReportFilters(start=parse_iso_date("2025-02-01")))
+        assert [r["transaction_id"] for r in rows] == ["T000002"]
+        assert edit_transaction(tx_csv, "T000001", lambda r: {**r, "amount": "11.00"})
+        assert delete_transaction(tx_csv, "T000002")
+        assert [r["amount"] for r in get_store(tx_csv).rows()] == ["11.00"]
+
+        # Budgets and users live in the same database but not in the ledger.
+        state = get_store(tx_csv).ledger_state()
+        sqlite_store.upsert_budgets(tmpdir / sqlite_store.DB_FILENAME,
+                                    [{"user_id": "U001", "month": "2025-01", "category": "Food", "amount": "50"}])
+        sqlite_store.write_records(tmpdir / sqlite_store.DB_FILENAME, "users", [{"user_id": "U001", "name": "Demo"}])
+        assert get_store(tx_csv).ledger_state() == state
+    finally:
+        del os.environ["PFM_STORAGE"]
+        sqlite_store.close_all()
+
 def run_all():
     print("Running sanity tests…")
     test_validators()
     test_money_parse()
+    test_amount_cents()
+    test_report_bundle()
+    test_spend_analytics()
 
     with tempfile.TemporaryDirectory() as td:
         test_user_and_backup_flow(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_transaction_store_refresh(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_journal_edits_and_compaction(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_offset_index(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_in_place_edit_then_append(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_batch_import(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_dedupe_index(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_rollup_cube(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_columnar_engine(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_report_query(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_date_index(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_running_balance(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_report_cache(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_transaction_pages(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_parallel_scan(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_file_lock(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_category_ids(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_category_catalog(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_pivot(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_budget_alerts(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_budget_range(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_budget_store(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_parallel_import_matches_serial(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_id_allocator(Path(td))
+    with tempfile.TemporaryDirectory() as td:
+        test_sqlite_backend(Path(td))
 
     print("✅ All sanity tests passed.")
 
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Iterable, Tuple
 from datetime import date
 
-from storage import read_transactions_csv, append_transactions_csv
+from storage import LedgerView, get_store, get_view
 from logutil import get_logger
 from typing import Callable
-import csv
 
 LOGGER = get_logger(__name__)
 
@@ -88,19 +92,39 @@ def parse_iso_date(d: str) -> date:
     except ValueError:
         raise ValueError("Date must be in ISO format YYYY-MM-DD.")
     
+ISO_DAY_MEMO_LIMIT = 1 << 16
+_ISO_DAYS: Dict[Any, Optional[str]] = {}
+
+# A row's date as canonical "YYYY-MM-DD", or None when parse_iso_date would
+# reject it. Each distinct string is parsed once; after that, date filters
+# are plain string compares (ISO dates order lexically).
+def iso_day(s: Any) -> Optional[str]:
+    try:
+        return _ISO_DAYS[s]
+    except KeyError:
+        pass
+    try:
+        day: Optional[str] = parse_iso_date(s).isoformat()
+    except (ValueError, AttributeError):
+        day = None
+    if len(_ISO_DAYS) >= ISO_DAY_MEMO_LIMIT:
+        _ISO_DAYS.clear()
+    _ISO_DAYS[s] = day
+    return day
+
+
+# IDs come from the store's persistent counter; bulk writers reserve a block at once.
+def reserve_transaction_ids(tx_path: Path, count: int) -> List[str]:
+     return [f"T{n:06d}" for n in get_store(tx_path).allocate_ids(count)]
+
+
 def next_transaction_id(tx_path: Path) -> str:
-     rows = read_transactions_csv(tx_path)
-     max_num = 0
-     for r in rows:
-        tid = r.get("transaction_id", "")
-        if tid.startswith("T") and tid[1:].isdigit():
-            max_num = max(max_num, int(tid[1:]))
-     return f"T{(max_num + 1):06d}"
+     return reserve_transaction_ids(tx_path, 1)[0]
 
 
 def persist_transaction(tx_path: Path, tx: NewTransaction, *, tx_id: Optional[str] = None) -> str:
      tid = tx_id or next_transaction_id(tx_path)
-     append_transactions_csv(tx_path, [{
+     get_store(tx_path).append([{
         "transaction_id": tid,
         "user_id": tx.user_id,
         "type": tx.type,
@@ -153,31 +177,245 @@ def create_transaction(
     )
 
 
+class DedupeIndex(LedgerView):
+    # Hashes of (user_id, *key fields) for every ledger row, so imports and
+    # recurring posts can ask "is this already there?" without scanning the
+    # ledger. A multiset: deleting one of two identical rows keeps the other.
+    # Snapshot is a sorted array of 8-byte hashes; it is searched in place
+    # with bisect, and only changes since then live in a Counter (negative
+    # counts cancel snapshot entries), so loading costs no per-row work.
+
+    SUFFIX = ".dedupe"
+    BINARY = True
+
+    def reset(self) -> None:
+        self._base = array("Q")
+        self._delta: Counter[int] = Counter()
+
+    def rebuild(self, rows: List[Dict[str, str]]) -> None:
+        self._base = array("Q", sorted(self._row_hash(r) for r in rows))
+        self._delta = Counter()
+
+    def key_hash(self, user_id: str, values: Iterable[str]) -> int:
+        parts = [user_id]
+        for field, v in zip(self.params, values):
+            if field == "amount":
+                # "2500", "2500.0" and "2500.00" are the same amount.
+                try:
+                    v = str(Decimal(v).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+                except (InvalidOperation, ValueError):
+                    pass
+            parts.append(v)
+        digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _row_hash(self, row: Dict[str, str]) -> int:
+        return self.key_hash(row.get("user_id", ""), (row.get(k, "") for k in self.params))
+
+    def _count(self, h: int) -> int:
+        return bisect_right(self._base, h) - bisect_left(self._base, h) + self._delta[h]
+
+    def _bump(self, h: int, n: int) -> None:
+        self._delta[h] += n
+        if not self._delta[h]:
+            del self._delta[h]
+
+    def add(self, row: Dict[str, str]) -> None:
+        self._bump(self._row_hash(row), 1)
+
+    def remove(self, row: Dict[str, str]) -> None:
+        h = self._row_hash(row)
+        if self._count(h) > 0:
+            self._bump(h, -1)
+
+    def __contains__(self, h: int) -> bool:
+        return self._count(h) > 0
+
+    def contains(self, user_id: str, values: Iterable[str]) -> bool:
+        return self.key_hash(user_id, values) in self
+
+    def dump(self) -> bytes:
+        if not self._delta:
+            return self._base.tobytes()
+        drop = {h: -n for h, n in self._delta.items() if n < 0}
+        extra = sorted(h for h, n in self._delta.items() if n > 0 for _ in range(n))
+        out = array("Q")
+        for h in heapq.merge(self._base, extra):
+            if drop.get(h):
+                drop[h] -= 1
+            else:
+                out.append(h)
+        return out.tobytes()
+
+    def load(self, data: bytes) -> None:
+        self._base = array("Q")
+        self._base.frombytes(data)
+        self._delta = Counter()
+
+
+def dedupe_index(tx_path: Path, key: Tuple[str, ...]) -> DedupeIndex:
+    return get_view(tx_path, DedupeIndex, tuple(key))
+
+
+class DateIndex(LedgerView):
+    # Each user's rows ordered by (date, transaction_id), so a date range is
+    # two bisects and a slice, and newest-first is a reversed walk. Valid dates
+    # are keyed in canonical ISO form, anything else by its raw text (callers
+    # still apply their own date check to a slice). The snapshot keeps only
+    # the keys; rows are re-attached from the store the first time a user is
+    # queried, which is a scan but not a sort.
+
+    SUFFIX = ".dates"
+
+    def reset(self) -> None:
+        self._keys: Dict[str, List[Tuple[str, str]]] = {}
+        self._rows: Dict[str, List[Dict[str, str]]] = {}
+
+    @staticmethod
+    def _key(row: Dict[str, str]) -> Tuple[str, str]:
+        d = row.get("date") or ""
+        return iso_day(d) or d, row.get("transaction_id") or ""
+
+    def rebuild(self, rows: List[Dict[str, str]]) -> None:
+        self.reset()
+        by_user: Dict[str, List[Tuple[Tuple[str, str], Dict[str, str]]]] = {}
+        for r in rows:
+            by_user.setdefault(r.get("user_id", ""), []).append((self._key(r), r))
+        for user_id, pairs in by_user.items():
+            pairs.sort(key=lambda p: p[0])  # stable: ledger order within a key
+            self._keys[user_id] = [k for k, _ in pairs]
+            self._rows[user_id] = [r for _, r in pairs]
+
+    def add(self, row: Dict[str, str]) -> None:
+        user_id, key = row.get("user_id", ""), self._key(row)
+        keys = self._keys.setdefault(user_id, [])
+        i = bisect_right(keys, key)
+        keys.insert(i, key)
+        rows = self._rows.get(user_id)
+        if rows is not None:
+            rows.insert(i, row)
+        elif len(keys) == 1:
+            self._rows[user_id] = [row]
+
+    def remove(self, row: Dict[str, str]) -> None:
+        user_id, key = row.get("user_id", ""), self._key(row)
+        keys = self._keys.get(user_id, [])
+        lo, hi = bisect_left(keys, key), bisect_right(keys, key)
+        if lo == hi:
+            return
+        at = lo
+        rows = self._rows.get(user_id)
+        if rows is not None:
+            # The store hands over the very row object it dropped; SQLite only
+            # an equal copy.
+            at = next((i for i in range(lo, hi) if rows[i] is row), None)
+            if at is None:
+                at = next((i for i in range(lo, hi) if rows[i] == row), lo)
+            del rows[at]
+        del keys[at]
+
+    def _user_rows(self, user_id: str) -> List[Dict[str, str]]:
+        rows = self._rows.get(user_id)
+        if rows is not None:
+            return rows
+        keys = self._keys.get(user_id, [])
+        pool: Dict[Tuple[str, str], List[Dict[str, str]]] = {}
+        for r in self.store.rows():
+            if r.get("user_id", "") == user_id:
+                pool.setdefault(self._key(r), []).append(r)
+        try:
+            rows = [pool[k].pop(0) for k in keys]
+        except (KeyError, IndexError):
+            rows = None
+        if rows is None or any(pool.values()):
+            LOGGER.warning("Date index for %s disagrees with the ledger; rebuilding", user_id)
+            self.rebuild(self.store.rows())
+            self.dirty = True
+            return self._rows.get(user_id, [])
+        self._rows[user_id] = rows
+        return rows
+
+    # Rows whose date key starts within [lo, hi]; both are ISO prefixes
+    # ("2025", "2025-03", "2025-03-14") and either may be None.
+    def between(self, user_id: str, lo: Optional[str] = None, hi: Optional[str] = None) -> List[Dict[str, str]]:
+        keys = self._keys.get(user_id, [])
+        i = bisect_left(keys, (lo,)) if lo is not None else 0
+        j = bisect_right(keys, (hi + "\U0010ffff",)) if hi is not None else len(keys)
+        return self._user_rows(user_id)[i:j] if i < j else []
+
+    def newest_first(self, user_id: str) -> List[Dict[str, str]]:
+        return self._user_rows(user_id)[::-1]
+
+    # Up to `limit` rows strictly past the `after` key, walking in the given
+    # direction. Rows are fetched by ID when they aren't attached yet, so a
+    # fresh process with a current snapshot reads one page, not the ledger.
+    def page(self, user_id: str, after: Optional[Tuple[str, str]], limit: int,
+             newest_first: bool = True) -> List[Dict[str, str]]:
+        keys = self._keys.get(user_id, [])
+        if newest_first:
+            j = bisect_left(keys, after) if after is not None else len(keys)
+            i = max(0, j - limit)
+        else:
+            i = bisect_right(keys, after) if after is not None else 0
+            j = min(len(keys), i + limit)
+        if i >= j:
+            return []
+        rows = self._rows.get(user_id)
+        if rows is None:
+            fetched = [self.store.get(t) for _, t in keys[i:j]]
+            if all(r is not None and self._key(r) == k for r, k in zip(fetched, keys[i:j])):
+                rows, i, j = fetched, 0, j - i
+            else:
+                rows = self._user_rows(user_id)
+        out = rows[i:j]
+        return out[::-1] if newest_first else out
+
+    def dump(self) -> Any:
+        return {u: [list(k) for k in keys] for u, keys in self._keys.items()}
+
+    def load(self, data: Any) -> None:
+        self._keys = {u: [(d, t) for d, t in keys] for u, keys in data.items()}
+        self._rows = {}
+
+
+def date_index(tx_path: Path) -> DateIndex:
+    return get_view(tx_path, DateIndex)
+
+
 def list_user_transactions(tx_path: Path, user_id: str, *, newest_first: bool = True) -> List[Dict[str, Any]]:
-    rows = read_transactions_csv(tx_path)
-    mine = [r for r in rows if r.get("user_id") == user_id]
-    mine.sort(key=lambda r: (r.get("date", ""), r.get("transaction_id", "")), reverse=newest_first)
-    return mine
+    index = date_index(tx_path)
+    return index.newest_first(user_id) if newest_first else index.between(user_id)
 
 
+# Where a listing page ends; pass it as `after` to get the next one.
+def transaction_cursor(row: Dict[str, str]) -> Tuple[str, str]:
+    return DateIndex._key(row)
+
+
+# Keyset pagination over the date index: one page of the user's rows ordered
+# by (date, transaction_id), starting just past the `after` cursor.
+def list_user_transactions_page(
+    tx_path: Path,
+    user_id: str,
+    *,
+    after: Optional[Tuple[str, str]] = None,
+    limit: int = 50,
+    newest_first: bool = True,
+) -> List[Dict[str, Any]]:
+    if limit <= 0:
+        raise ValueError("Page size must be positive.")
+    if after is not None:
+        d, tid = after
+        after = (iso_day(d) or d, tid)
+    return date_index(tx_path).page(user_id, after, limit, newest_first)
+
 
 
-def _rewrite_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
-  
-    from storage import CSV_FIELDNAMES
-    with path.open("w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
 
 def get_transaction_by_id(tx_path: Path, tid: str) -> Dict[str, str] | None:
 
-    rows = read_transactions_csv(tx_path)
-    for r in rows:
-        if r.get("transaction_id") == tid:
-            return r
-    return None
+    row = get_store(tx_path).get(tid)
+    return dict(row) if row is not None else None
 
 def edit_transaction(
     tx_path: Path,
@@ -185,25 +423,15 @@ def edit_transaction(
     updater: Callable[[Dict[str, str]], Dict[str, str] | None]
 ) -> bool:
 
-    rows = read_transactions_csv(tx_path)
-    changed = False
-    for i, r in enumerate(rows):
-        if r.get("transaction_id") == tid:
-            new_row = updater(dict(r))
-            if new_row is None:
-                return False
-            rows[i] = new_row
-            changed = True
-            break
-    if changed:
-        _rewrite_csv(tx_path, rows)
-    return changed
+    store = get_store(tx_path)
+    row = store.get(tid)
+    if row is None:
+        return False
+    new_row = updater(dict(row))
+    if new_row is None:
+        return False
+    return store.update(tid, new_row)
 
 def delete_transaction(tx_path: Path, tid: str) -> bool:
 
-    rows = read_transactions_csv(tx_path)
-    new_rows = [r for r in rows if r.get("transaction_id") != tid]
-    if len(new_rows) == len(rows):
-        return False
-    _rewrite_csv(tx_path, new_rows)
-    return True
\ No newline at end of file
+    return get_store(tx_path).delete(tid)
\ No newline at end of file
@@ -8,7 +8,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
-from storage import read_json, write_json
+from storage import read_records, write_records
 from logutil import get_logger
 LOGGER = get_logger(__name__)
 
@@ -52,10 +52,10 @@ def validate_pin(pin: str) -> str:
       
 
 def load_users(path: Path)-> List[Dict[str,Any]]:
-    return read_json(path)
+    return read_records(path)
 
 def save_users(path:Path, users: List[Dict[str,Any]]) -> None:
-    write_json(path, users)
+    write_records(path, users)
 
 def find_user_by_name(users: List[Dict[str, Any]], name: str) -> Optional[Dict[str, Any]]:
     for u in users: